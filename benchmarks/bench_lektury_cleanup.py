@@ -0,0 +1,118 @@
+# benchmarks/bench_lektury_cleanup.py
+#
+# Porównuje czyszczenie treści lektury (<div id="book-text">): dawna implementacja
+# z get_text() wołanym osobno dla każdego elementu (legacy_cleanup, kopia poprzedniej wersji)
+# kontra LekturyParser.remove_unwanted_elements, który liczy tekst każdego węzła raz.
+# Najpierw sprawdza, że drzewo po czyszczeniu i wynik extract_content() są identyczne,
+# potem mierzy czas.
+#
+#   python benchmarks/bench_lektury_cleanup.py [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from bench_links import load_fixture
+from crawler.lektury_parser import LekturyParser
+
+FIXTURES = {
+    'lektury_book.html': 'https://wolnelektury.pl/katalog/lektura/pan-tadeusz.html',
+}
+
+
+def legacy_cleanup(book_text_div):
+    for toc in book_text_div.find_all(class_='table_of_contents'):
+        toc.decompose()
+
+    for editorial_note in book_text_div.find_all('div', class_='editorial'):
+        editorial_note.decompose()
+
+    unwanted_phrases = [
+        "Informacja o zmianach we",
+        "Spis treści",
+    ]
+    for p in book_text_div.find_all(['p', 'div']):
+        text = p.get_text(strip=True)
+        if any(text.startswith(phrase) for phrase in unwanted_phrases):
+            p.decompose()
+
+    for footnote in book_text_div.find_all('div', class_='footnotes'):
+        footnote.decompose()
+
+    for ed_footnote in book_text_div.find_all(['p', 'div']):
+        text = ed_footnote.get_text(strip=True)
+        if '[przypis edytorski]' in text:
+            ed_footnote.decompose()
+
+    for element in book_text_div.find_all():
+        if not element.get_text(strip=True):
+            element.decompose()
+
+    for theme_begin in book_text_div.find_all('a', class_='theme-begin'):
+        theme_begin.decompose()
+
+    unwanted_ids = ['themes', 'nota_red', 'wltoc', 'settings', 'info']
+    for uid in unwanted_ids:
+        for div_to_remove in book_text_div.find_all('div', id=uid):
+            div_to_remove.decompose()
+
+
+def book_text(html):
+    return BeautifulSoup(html, 'html.parser').find('div', id='book-text')
+
+
+def check_parity(parser, html, base_url):
+    problems = []
+    legacy_div, new_div = book_text(html), book_text(html)
+    legacy_cleanup(legacy_div)
+    parser.remove_unwanted_elements(new_div)
+    if str(legacy_div) != str(new_div):
+        problems.append('drzewo po czyszczeniu różni się od dawnej implementacji')
+
+    legacy_text = parser.clean_text(legacy_div.get_text(separator='\n', strip=True)).strip()
+    text, _ = parser.extract_content(BeautifulSoup(html, 'html.parser'), base_url)
+    if text != legacy_text:
+        problems.append('wynik extract_content() różni się od dawnej implementacji')
+    return problems
+
+
+def measure(cleanup, html, repeat):
+    # Samo czyszczenie, bez parsowania HTML
+    divs = [book_text(html) for _ in range(repeat)]
+    start = time.perf_counter()
+    for div in divs:
+        cleanup(div)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark czyszczenia treści lektur.")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Liczba powtórzeń pomiaru czasu")
+    args = arg_parser.parse_args()
+
+    parser = LekturyParser('benchmark')
+    failed = False
+    for name, base_url in FIXTURES.items():
+        html = load_fixture(name)
+        print(f"{name} ({len(html) / 1024:.0f} KiB)")
+        problems = check_parity(parser, html, base_url)
+        if problems:
+            failed = True
+            for problem in problems:
+                print(f"  NIEZGODNOŚĆ: {problem}")
+            continue
+
+        legacy_time = measure(legacy_cleanup, html, args.repeat)
+        new_time = measure(parser.remove_unwanted_elements, html, args.repeat)
+        print(f"  get_text() dla każdego elementu: {legacy_time * 1000:8.1f} ms")
+        print(f"  tekst liczony raz (od liści):    {new_time * 1000:8.1f} ms ({legacy_time / new_time:.1f}x szybciej)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/bench_links.py
+#
+# Porównuje zbieranie linków ze stron katalogu WolneLektury: pełne drzewo BeautifulSoup
+# kontra skaner strumieniowy (crawler/link_scanner.py). Najpierw sprawdza, że obie drogi
+# dają te same linki, potem mierzy czas i szczytowe zużycie pamięci.
+#
+#   python benchmarks/bench_links.py [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from crawler.document import anchor_table
+from crawler.link_scanner import scan_links
+from crawler.lektury_parser import LekturyParser
+
+# Syntetyczne imitacje stron WolneLektury i Wikipedii, nie zapisane strony (zob. fixtures/README.md)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = {
+    'lektury_katalog.html': 'https://wolnelektury.pl/katalog/',
+    'lektury_lektura.html': 'https://wolnelektury.pl/katalog/lektura/pan-tadeusz/',
+}
+EXTRACTORS = ['extract_katalog_links', 'extract_all_katalog_links', 'extract_online_links']
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def tree_links(parser, html, base_url):
+    soup = BeautifulSoup(html, 'html.parser')
+    return {name: sorted(getattr(parser, name)(soup, base_url)) for name in EXTRACTORS}
+
+
+def scanner_links(parser, html, base_url):
+    document = parser.document(html, base_url)
+    return {name: sorted(getattr(parser, name)(document, base_url)) for name in EXTRACTORS}
+
+
+def check_parity(parser, html, base_url):
+    problems = []
+    tree_anchors = anchor_table(BeautifulSoup(html, 'html.parser'))
+    scanned_anchors, has_book_text = scan_links(html, stop_at=('div', 'book-text'))
+    if has_book_text:
+        problems.append('skaner zatrzymał się na <div id="book-text">')
+    if tree_anchors != scanned_anchors:
+        for tree_anchor, scanned_anchor in zip(tree_anchors, scanned_anchors):
+            if tree_anchor != scanned_anchor:
+                problems.append(f'pierwsza różnica linków: {tree_anchor} != {scanned_anchor}')
+                break
+        else:
+            problems.append(f'liczba linków: {len(tree_anchors)} != {len(scanned_anchors)}')
+
+    expected, actual = tree_links(parser, html, base_url), scanner_links(parser, html, base_url)
+    for name in EXTRACTORS:
+        if expected[name] != actual[name]:
+            problems.append(f'{name}: {len(expected[name])} != {len(actual[name])} linków')
+    return problems, expected
+
+
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark zbierania linków ze stron katalogu.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Liczba powtórzeń pomiaru czasu")
+    args = arg_parser.parse_args()
+
+    parser = LekturyParser('benchmark')
+    failed = False
+    for name, base_url in FIXTURES.items():
+        html = load_fixture(name)
+        problems, expected = check_parity(parser, html, base_url)
+        counts = ', '.join(f'{extractor}={len(links)}' for extractor, links in expected.items())
+        print(f"{name} ({len(html) / 1024:.0f} KiB): {counts}")
+        if problems:
+            failed = True
+            for problem in problems:
+                print(f"  NIEZGODNOŚĆ: {problem}")
+            continue
+
+        tree_time, tree_peak = measure(lambda: tree_links(parser, html, base_url), args.repeat)
+        scan_time, scan_peak = measure(lambda: scanner_links(parser, html, base_url), args.repeat)
+        print(f"  drzewo BeautifulSoup: {tree_time * 1000:8.1f} ms, pamięć {tree_peak / 1024:8.0f} KiB")
+        print(f"  skaner strumieniowy:  {scan_time * 1000:8.1f} ms, pamięć {scan_peak / 1024:8.0f} KiB "
+              f"({tree_time / scan_time:.1f}x szybciej, {tree_peak / scan_peak:.1f}x mniej pamięci)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# benchmarks/bench_text.py
+#
+# Przepustowość (MB/s) normalizacji tekstu: dawne wersje (kopie poniżej) kontra
+# crawler/text_normalizer.py. Najpierw sprawdza, że wyniki są identyczne, także dla tekstu
+# z losowymi znakami sterującymi i białymi znakami Unicode, potem mierzy czas.
+#
+#   python benchmarks/bench_text.py [--repeat N]
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from bench_links import load_fixture
+from crawler.lektury_parser import LekturyParser
+from crawler.wiki_parser import WikiParser
+from crawler.text_normalizer import printable_lines
+
+NOISE = ['\x00', '\x07', '\t', '\r', '\x0b', '\x0c', '\x1c', '\x85', '\xa0', '\xad', '\u200b',
+         '\u2028', '\u3000', '\ufeff', ' ', '  ', '\n', '\n\n', '.', '..\n', '[12]', '. ']
+
+
+def legacy_storage_text(text):
+    text = ''.join(c for c in text if c.isprintable() or c == '\n')
+    lines = [line.rstrip() for line in text.splitlines()]
+    return '\n'.join(lines)
+
+
+def legacy_lektury_clean_text(text):
+    text = re.sub(r'\[\d+\]', '', text)
+    start_index = text.find('<p class="paragraph"')
+    if start_index != -1:
+        text = text[start_index:]
+    text = re.sub(r'^[.]+\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.replace('. ', '.\n')
+    return text
+
+
+def legacy_wiki_extract_data(content_div, base_url, soup):
+    def clean_text(text):
+        text = re.sub(r'\s+', ' ', text).strip()
+        return text
+
+    metadata = {}
+    metadata['URL'] = base_url
+    title_tag = soup.find('h1', id='firstHeading')
+    metadata['Title'] = clean_text(title_tag.get_text()) if title_tag else ''
+    last_modified = soup.find('li', id='footer-info-lastmod')
+    metadata['Date'] = ''
+    if last_modified:
+        date_match = re.search(r'ostatnio edytowano (.+)\.', last_modified.get_text())
+        if date_match:
+            metadata['Date'] = clean_text(date_match.group(1))
+    metadata['Author'] = ''
+    metadata['Categories'] = [clean_text(cat_link.get_text()) for cat_link in soup.select('#mw-normal-catlinks ul li a')]
+    metadata['Keywords'] = []
+    html_tag = soup.find('html')
+    metadata['Language'] = html_tag.get('lang', 'pl') if html_tag else 'pl'
+    metadata['Content-Type'] = 'Artykuł'
+
+    content_text = ''
+    for element in content_div.find_all(['p', 'h2', 'h3', 'h4', 'h5', 'h6'], recursive=True):
+        if element.name in ['h2', 'h3', 'h4', 'h5', 'h6']:
+            heading_text = clean_text(element.get_text())
+            if heading_text:
+                content_text += f"\n\n### {heading_text}\n\n"
+        elif element.name == 'p':
+            paragraph_text = clean_text(element.get_text())
+            if paragraph_text:
+                content_text += f"{paragraph_text}\n\n"
+    return content_text.strip(), metadata
+
+
+def noisy_samples(count=2000, seed=1):
+    rng = random.Random(seed)
+    alphabet = NOISE + ['Zażółć', 'gęślą', 'jaźń', 'a', 'B']
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+def load_texts():
+    book = BeautifulSoup(load_fixture('lektury_book.html'), 'html.parser')
+    book_text = book.find('div', id='book-text').get_text(separator='\n', strip=True)
+    # Tekst przed zapisem: zdania w liniach, w kilkudziesięciu z nich znaki sterujące
+    stored_text = legacy_lektury_clean_text(book_text)
+    stored_text = stored_text.replace('ojczyzno', 'ojczyzno\xad', 30).replace('tylko', 'tylko\x07 ', 30)
+    wiki = BeautifulSoup(load_fixture('wiki_article.html'), 'html.parser')
+    return book_text, stored_text, wiki
+
+
+def check_parity(cases):
+    problems = []
+    for name, legacy, new, inputs in cases:
+        for value in inputs:
+            if legacy(value) != new(value):
+                problems.append(f'{name}: różny wynik dla {value!r:.80}')
+                break
+    return problems
+
+
+def throughput(func, value, size, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(value)
+    elapsed = (time.perf_counter() - start) / repeat
+    return size / elapsed / 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark normalizacji tekstu.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Liczba powtórzeń pomiaru czasu")
+    args = arg_parser.parse_args()
+
+    lektury, wiki = LekturyParser('benchmark'), WikiParser('benchmark')
+    book_text, stored_text, wiki_soup = load_texts()
+    content_div = wiki_soup.find('div', id='mw-content-text')
+    wiki_size = len(content_div.get_text().encode('utf-8'))
+
+    def extract_data(extract):
+        return lambda div: extract(div, 'https://pl.wikipedia.org/wiki/Test', wiki_soup)
+
+    noisy = noisy_samples()
+    cases = [
+        ('Storage.save', legacy_storage_text, printable_lines, noisy + [stored_text]),
+        ('LekturyParser.clean_text', legacy_lektury_clean_text, lektury.clean_text, noisy + [book_text]),
+        ('WikiParser.extract_data', extract_data(legacy_wiki_extract_data), extract_data(wiki.extract_data),
+         [content_div]),
+    ]
+    problems = check_parity(cases)
+    if problems:
+        for problem in problems:
+            print(f"NIEZGODNOŚĆ: {problem}")
+        return 1
+
+    runs = [
+        ('Storage.save', stored_text, len(stored_text.encode('utf-8'))),
+        ('LekturyParser.clean_text', book_text, len(book_text.encode('utf-8'))),
+        ('WikiParser.extract_data', content_div, wiki_size),
+    ]
+    for (name, legacy, new, _), (_, value, size) in zip(cases, runs):
+        before = throughput(legacy, value, size, args.repeat)
+        after = throughput(new, value, size, args.repeat)
+        print(f"{name:26} {size / 1e6:6.2f} MB: {before:8.1f} MB/s -> {after:8.1f} MB/s ({after / before:.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
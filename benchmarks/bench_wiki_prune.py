@@ -0,0 +1,120 @@
+# benchmarks/bench_wiki_prune.py
+#
+# Porównuje czyszczenie artykułu Wikipedii: dawne osobne przebiegi find_all() dla każdej
+# reguły (legacy_prune, kopia poprzedniej implementacji) kontra jedno przejście
+# WikiParser.remove_unwanted_elements. Najpierw sprawdza, że drzewo po czyszczeniu
+# i wynik parse() są identyczne, potem mierzy czas.
+#
+#   python benchmarks/bench_wiki_prune.py [--repeat N]
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup, Comment
+from bench_links import load_fixture
+from crawler.wiki_parser import WikiParser
+
+FIXTURES = {
+    'wiki_article.html': 'https://pl.wikipedia.org/wiki/Literatura_polska',
+}
+
+
+def legacy_prune(soup):
+    for element in soup(["script", "style"]):
+        element.decompose()
+
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    for ref in soup.find_all('sup', class_='reference'):
+        ref.decompose()
+
+    unwanted_classes = [
+        'navbox', 'vertical-navbox', 'infobox', 'metadata', 'ambox',
+        'hatnote', 'mbox-small', 'sistersitebox', 'thumb', 'gallery',
+        'reflist', 'portal', 'noprint', 'stub', 'mw-editsection', 'toc'
+    ]
+    for class_name in unwanted_classes:
+        for element in soup.find_all(class_=class_name):
+            element.decompose()
+
+    unwanted_sections = [
+        'Przypisy', 'Bibliografia', 'Linki zewnętrzne', 'Uwagi',
+        'Zobacz też', 'Źródła', 'Literatura', 'Galeria', 'Nagrody'
+    ]
+    for heading in soup.find_all(['h2', 'h3', 'h4', 'h5', 'h6']):
+        heading_text = heading.get_text().strip()
+        heading_text = re.sub(r'\[.*?\]', '', heading_text)
+        if heading_text in unwanted_sections:
+            next_node = heading.find_next_sibling()
+            while next_node and not next_node.name in ['h2', 'h3', 'h4', 'h5', 'h6']:
+                to_remove = next_node
+                next_node = next_node.find_next_sibling()
+                to_remove.decompose()
+            heading.decompose()
+
+    if catlinks := soup.find('div', id='catlinks'):
+        catlinks.decompose()
+    if footer := soup.find('footer', id='footer'):
+        footer.decompose()
+    if siteNotice := soup.find('div', id='siteNotice'):
+        siteNotice.decompose()
+
+
+def check_parity(parser, html, base_url):
+    problems = []
+    legacy_soup = BeautifulSoup(html, 'html.parser')
+    legacy_prune(legacy_soup)
+    soup = BeautifulSoup(html, 'html.parser')
+    parser.remove_unwanted_elements(soup)
+    if str(legacy_soup) != str(soup):
+        problems.append('drzewo po czyszczeniu różni się od dawnej implementacji')
+
+    content_div = legacy_soup.find('div', id='mw-content-text')
+    expected = parser.extract_data(content_div, base_url, legacy_soup)
+    if parser.parse(html, base_url, is_start_url=False) != (expected, 'text'):
+        problems.append('wynik parse() różni się od dawnej implementacji')
+    return problems
+
+
+def measure(prune, html, repeat):
+    # Samo czyszczenie, bez parsowania HTML
+    soups = [BeautifulSoup(html, 'html.parser') for _ in range(repeat)]
+    start = time.perf_counter()
+    for soup in soups:
+        prune(soup)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark czyszczenia artykułów Wikipedii.")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Liczba powtórzeń pomiaru czasu")
+    args = arg_parser.parse_args()
+
+    parser = WikiParser('benchmark')
+    failed = False
+    for name, base_url in FIXTURES.items():
+        html = load_fixture(name)
+        print(f"{name} ({len(html) / 1024:.0f} KiB)")
+        problems = check_parity(parser, html, base_url)
+        if problems:
+            failed = True
+            for problem in problems:
+                print(f"  NIEZGODNOŚĆ: {problem}")
+            continue
+
+        legacy_time = measure(legacy_prune, html, args.repeat)
+        new_time = measure(parser.remove_unwanted_elements, html, args.repeat)
+        print(f"  osobne przebiegi: {legacy_time * 1000:8.1f} ms")
+        print(f"  jedno przejście:  {new_time * 1000:8.1f} ms ({legacy_time / new_time:.1f}x szybciej)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
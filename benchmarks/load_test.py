@@ -0,0 +1,196 @@
+# benchmarks/load_test.py
+#
+# Test obciążeniowy całego crawla: uruchamia atrapę serwisów (benchmarks/synthetic_site.py)
+# w osobnym procesie i puszcza na nią WebCrawler z START_URLS podmienionymi na lokalne adresy
+# i danymi w katalogu tymczasowym. Raport: strony/s, p50/p99 czasu pobrania (z histogramu
+# metryk, więc w przybliżeniu), odpowiedzi według statusu, ponowienia i szczytowy RSS crawlera.
+# Z --workers N crawl jest rozproszony: koordynator w tym procesie i N lokalnych workerów
+# (metryki workerów scalane są u koordynatora); z --sites K hostów do podziału jest więcej.
+#
+#   python benchmarks/load_test.py [--books 500] [--max-pages 1000] [--concurrency 16]
+#                                  [--host-interval 0.01] [--error-503 0.05] [--output wynik.json]
+#   python benchmarks/load_test.py --workers 4 --sites 8
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_site import add_arguments, server_arguments, site_urls
+from crawler.crawler import WebCrawler
+from crawler.distributed import Coordinator, run_worker
+from crawler.metrics import metrics
+from modules.logger import console_handler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SITE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synthetic_site.py')
+
+
+def start_site(args):
+    process = subprocess.Popen([sys.executable, SITE_SCRIPT] + server_arguments(args), stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            # Port Wikipedii otwierany jest jako ostatni
+            with socket.create_connection(('127.0.0.1', args.port + args.sites), timeout=0.5):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Atrapa serwisów nie wystartowała na portach {args.port}-{args.port + args.sites}")
+
+
+def peak_rss(who=None):
+    # Bajty; ru_maxrss to KiB na Linuksie i bajty na macOS. Dla RUSAGE_CHILDREN: największy z procesów potomnych
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def crawl_targets(args):
+    # START_URL-e i aliasy hostów atrapy (parsery wybierane są po nazwie hosta)
+    lektury, wiki = site_urls(args)
+    aliases = {url.split('/')[2]: 'wolnelektury.pl' for url in lektury}
+    aliases[wiki.split('/')[2]] = 'wikipedia.org'
+    return lektury + [wiki], aliases
+
+
+def statuses():
+    by_status = {}
+    for entry in metrics.to_json()['counters'].get('fetch_responses', []):
+        status = entry['labels']['status']
+        by_status[status] = by_status.get(status, 0) + entry['value']
+    return by_status
+
+
+def run_crawl(args, data_dir):
+    # Tryb jednoprocesowy: WebCrawler przechodzi dwa pierwsze START_URL-e (WolneLektury i Wikipedię)
+    start_urls, aliases = crawl_targets(args)
+    crawler = WebCrawler(parse_workers=args.parse_workers, data_dir=data_dir,
+                         start_urls=[start_urls[0], start_urls[-1]], host_aliases=aliases,
+                         max_pages=args.max_pages, extracted_pages_max=args.extracted_max,
+                         concurrency=args.concurrency, host_interval=args.host_interval)
+    started = time.perf_counter()
+    crawler.start_crawling()
+    elapsed = time.perf_counter() - started
+    if not crawler.saved_count:
+        raise RuntimeError("Crawl nie zapisał żadnego tekstu")
+    return summarize(elapsed, metrics.total('phase_pages'), crawler.saved_count, crawler.skipped_count)
+
+
+def quiet_worker(address, data_dir, parse_workers):
+    console_handler.setLevel(logging.WARNING)
+    run_worker(address, data_dir=data_dir, parse_workers=parse_workers)
+
+
+def run_distributed(args, data_dir):
+    start_urls, aliases = crawl_targets(args)
+    address = ('127.0.0.1', free_port())
+    coordinator = Coordinator(address, start_urls=start_urls, data_dir=data_dir, host_aliases=aliases,
+                              max_pages=args.max_pages, concurrency=args.concurrency,
+                              host_interval=args.host_interval)
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=quiet_worker, args=(address, data_dir, args.parse_workers))
+               for _ in range(args.workers)]
+    for process in workers:
+        process.start()
+    started = time.perf_counter()
+    try:
+        coordinator.run()
+    finally:
+        for process in workers:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill()
+    elapsed = time.perf_counter() - started
+    report = summarize(elapsed, coordinator.pages, coordinator.saved_count, coordinator.skipped_count)
+    rss = peak_rss(resource.RUSAGE_CHILDREN) if resource else None
+    report['worker_peak_rss_mb'] = round(rss / 2 ** 20, 1) if rss else None
+    return report
+
+
+def summarize(elapsed, pages, saved, skipped):
+    p50, p99 = metrics.quantile('fetch_seconds', 0.5), metrics.quantile('fetch_seconds', 0.99)
+    rss = peak_rss()
+    return {
+        'elapsed': round(elapsed, 3),
+        'pages': pages,
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else 0.0,
+        'saved': saved,
+        'skipped': skipped,
+        'responses': statuses(),
+        'retries': metrics.total('fetch_retries'),
+        'fetch_p50': round(p50, 4) if p50 is not None else None,
+        'fetch_p99': round(p99, 4) if p99 is not None else None,
+        'peak_rss_mb': round(rss / 2 ** 20, 1) if rss else None,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Test obciążeniowy crawla na lokalnej atrapie serwisów.")
+    add_arguments(arg_parser)
+    group = arg_parser.add_argument_group('crawler')
+    group.add_argument('--max-pages', type=int, default=1000, help="Limit zapisanych tekstów (MAX_PAGES)")
+    group.add_argument('--extracted-max', type=int, default=500,
+                       help="Limit zebranych linków z każdego START_URL (EXTRACTED_PAGES_MAX)")
+    group.add_argument('--concurrency', type=int, default=16, help="Równoległe żądania (CONCURRENCY)")
+    group.add_argument('--host-interval', type=float, default=0.01,
+                       help="Minimalny odstęp między żądaniami do hosta (HOST_MIN_INTERVAL)")
+    group.add_argument('--parse-workers', type=int, default=0, help="Procesy parsujące (0 = w tym procesie)")
+    group.add_argument('--workers', type=int, default=0,
+                       help="Crawl rozproszony z tyloma lokalnymi workerami (0 = jeden WebCrawler)")
+    group.add_argument('--keep-data', action='store_true', help="Nie usuwaj katalogu danych crawla")
+    group.add_argument('--output', help="Zapisz wynik (z parametrami) do pliku JSON")
+    args = arg_parser.parse_args()
+
+    console_handler.setLevel(logging.WARNING)  # Pełny log i tak trafia do crawler.log
+    site = start_site(args)
+    data_dir = tempfile.mkdtemp(prefix='load-test-')
+    try:
+        report = run_distributed(args, data_dir) if args.workers else run_crawl(args, data_dir)
+    finally:
+        site.terminate()
+        site.wait()
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"Czas: {report['elapsed']:.1f} s, strony: {report['pages']} ({report['pages_per_sec']:.1f}/s), "
+          f"zapisane teksty: {report['saved']}, pominięte: {report['skipped']}")
+    print(f"Pobranie: p50 {report['fetch_p50']} s, p99 {report['fetch_p99']} s, ponowienia: {report['retries']}")
+    print(f"Odpowiedzi: {report['responses']}")
+    print(f"Szczytowy RSS: {report['peak_rss_mb']} MB")
+    if args.workers:
+        print(f"Szczytowy RSS workera: {report['worker_peak_rss_mb']} MB")
+    if args.keep_data:
+        print(f"Dane crawla: {data_dir}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'parameters': vars(args), 'report': report}, file, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# benchmarks/suite.py
+#
+# Zestaw powtarzalnych pomiarów na stronach z benchmarks/fixtures (bez sieci; to syntetyczne
+# imitacje, nie zapisane strony serwisów - zob. benchmarks/fixtures/README.md):
+# parsowanie WikiParser/LekturyParser (strony/s i MB/s), Storage.save dla obu backendów,
+# generate_filename i operacje URLManager. Wyniki trafiają do pliku JSON; z --compare
+# porównujemy je z zapisanym wcześniej wynikiem (baseline) i zgłaszamy regresje.
+#
+#   python benchmarks/suite.py [--only TEKST] [--min-time S] [--rounds N] [--output PLIK]
+#   python benchmarks/suite.py --compare benchmarks/results/baseline.json [--threshold 0.1]
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_links import load_fixture
+from crawler.lektury_parser import LekturyParser
+from crawler.wiki_parser import WikiParser
+from crawler.storage import Storage
+from crawler.url_manager import URLManager
+from modules.logger import logger
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# (nazwa pomiaru, plik, klasa parsera, URL strony, czy START_URL)
+PARSE_CASES = [
+    ('parse:wiki_article', 'wiki_article.html', WikiParser, 'https://pl.wikipedia.org/wiki/Język_polski', False),
+    ('parse:lektury_katalog', 'lektury_katalog.html', LekturyParser, 'https://wolnelektury.pl/katalog/', True),
+    ('parse:lektury_lektura', 'lektury_lektura.html', LekturyParser,
+     'https://wolnelektury.pl/katalog/lektura/pan-tadeusz/', False),
+    ('parse:lektury_book', 'lektury_book.html', LekturyParser,
+     'https://wolnelektury.pl/media/book/html/pan-tadeusz.html', False),
+]
+FILENAME_URLS = [
+    'https://pl.wikipedia.org/wiki/J%C4%99zyk_polski',
+    'https://pl.wikipedia.org/wiki/Pan_Tadeusz_(poemat)',
+    'https://wolnelektury.pl/katalog/lektura/pan-tadeusz/',
+    'https://wolnelektury.pl/media/book/html/pan-tadeusz.html',
+    'https://lektury.gov.pl/katalog/lektura/lalka-tom-pierwszy.html',
+    'https://example.com/some/path/page.php',
+]
+URL_MANAGER_BATCH = 1000  # URL-i przechodzących przez URLManager w jednej operacji
+
+
+def measure(operation, min_time, rounds):
+    # Liczba wywołań w rundzie dobrana tak, by runda trwała co najmniej min_time / rounds;
+    # wynikiem jest najlepsza runda (najmniej zakłóceń od reszty systemu)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / rounds / 4 or number >= 1 << 20:
+            break
+        number *= 2
+    number = max(1, int(number * (min_time / rounds) / max(elapsed, 1e-9)))
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def result(seconds, unit, items=1, size=None):
+    # items: ile jednostek (stron, URL-i, tekstów) obsługuje jedno wywołanie; size: bajty na wywołanie
+    return {
+        'unit': unit,
+        'per_sec': round(items / seconds, 2),
+        'mb_per_sec': round(size / seconds / 2 ** 20, 2) if size else None,
+        'ms_per_op': round(seconds * 1000, 4),
+    }
+
+
+def bench_parsers(min_time, rounds):
+    for name, fixture, parser_class, url, is_start_url in PARSE_CASES:
+        html = load_fixture(fixture)
+        parser = parser_class('benchmark')
+
+        def parse():
+            parser.parse(parser.document(html, url), url, is_start_url=is_start_url)
+
+        yield name, lambda: result(measure(parse, min_time, rounds), 'pages', size=len(html.encode('utf-8')))
+
+
+def bench_storage(min_time, rounds):
+    # Zapis tekstu z artykułu Wikipedii pod kolejnymi nowymi adresami (bez wykrywania duplikatów)
+    url = PARSE_CASES[0][3]
+    parser = WikiParser('benchmark')
+    (text, metadata), _ = parser.parse(parser.document(load_fixture('wiki_article.html'), url), url,
+                                       is_start_url=False)
+    size = len(text.encode('utf-8'))
+    for backend in ('files', 'shards'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            storage = Storage(backend=backend, data_dir=data_dir)
+            counter = itertools.count()
+
+            def save():
+                storage.save(text, metadata, f"https://pl.wikipedia.org/wiki/Bench_{next(counter)}")
+
+            yield f'storage_save:{backend}', lambda: result(measure(save, min_time, rounds), 'texts', size=size)
+            storage.close()
+
+
+def bench_generate_filename(min_time, rounds):
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = Storage(data_dir=data_dir)
+        metadata = {}
+
+        def generate():
+            for url in FILENAME_URLS:
+                storage.generate_filename(url, metadata)
+
+        yield 'generate_filename', lambda: result(measure(generate, min_time, rounds), 'urls',
+                                                  items=len(FILENAME_URLS))
+        storage.close()
+
+
+def bench_url_manager(min_time, rounds):
+    # Jedna operacja: nowy URLManager, dodanie paczki linków, pobranie wszystkich i oznaczenie jako odwiedzone
+    origin = 'https://wolnelektury.pl/katalog/'
+    urls = [f'https://wolnelektury.pl/katalog/lektura/tytul-{i}/' for i in range(URL_MANAGER_BATCH)]
+
+    def cycle():
+        manager = URLManager([origin], extracted_pages_max=len(urls))
+        manager.add_extracted_url(origin, urls)
+        while manager.has_urls():
+            url, _ = manager.get_next_url()
+            manager.mark_visited(url)
+
+    yield 'url_manager', lambda: result(measure(cycle, min_time, rounds), 'urls', items=len(urls) + 1)
+
+
+BENCHMARKS = [bench_parsers, bench_storage, bench_generate_filename, bench_url_manager]
+
+
+def run(only, min_time, rounds):
+    # Każdy benchmark zwraca (nazwa, pomiar); pomiar uruchamiamy od razu, póki trwa jego przygotowanie
+    results = {}
+    for bench in BENCHMARKS:
+        for name, run_measurement in bench(min_time, rounds):
+            if only and only not in name:
+                continue
+            values = results[name] = run_measurement()
+            mb = f", {values['mb_per_sec']:8.2f} MB/s" if values['mb_per_sec'] is not None else ''
+            print(f"{name:<26}{values['per_sec']:>12.1f} {values['unit']}/s{mb}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Regresja: przepustowość spadła o więcej niż threshold (ułamek) względem baseline
+    regressions = []
+    print(f"\nPorównanie z baseline ({baseline.get('created', '?')}), próg {threshold:.0%}:")
+    for name, values in results.items():
+        base = baseline['results'].get(name)
+        if not base:
+            print(f"{name:<26}  brak w baseline")
+            continue
+        change = values['per_sec'] / base['per_sec'] - 1
+        if change < -threshold:
+            status = 'REGRESJA'
+            regressions.append(name)
+        elif change > threshold:
+            status = 'szybciej'
+        else:
+            status = 'bez zmian'
+        print(f"{name:<26}{base['per_sec']:>12.1f} -> {values['per_sec']:>12.1f} ({change:+7.1%})  {status}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline'owy zestaw benchmarków parserów i zapisu.")
+    arg_parser.add_argument('--only', help="Uruchom tylko pomiary zawierające ten tekst w nazwie")
+    arg_parser.add_argument('--min-time', type=float, default=2.0, help="Łączny czas pomiaru (s) jednego przypadku")
+    arg_parser.add_argument('--rounds', type=int, default=5, help="Liczba rund; liczy się najlepsza")
+    arg_parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'),
+                            help="Plik JSON z wynikami")
+    arg_parser.add_argument('--compare', metavar='BASELINE', help="Plik JSON z wcześniejszym wynikiem")
+    arg_parser.add_argument('--threshold', type=float, default=0.10,
+                            help="Spadek przepustowości (ułamek) uznawany za regresję")
+    args = arg_parser.parse_args()
+
+    # Parsery logują każdą stronę; mierzymy kod, a nie zapis logów
+    logger.setLevel(logging.WARNING)
+    results = run(args.only, args.min_time, args.rounds)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'min_time': args.min_time,
+        'rounds': args.rounds,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\nWyniki zapisano w {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegresje: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
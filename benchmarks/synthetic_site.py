@@ -0,0 +1,229 @@
+# benchmarks/synthetic_site.py
+#
+# Lokalna atrapa WolneLektury i Wikipedii do testów obciążeniowych crawla (bez prawdziwych
+# serwisów). Serwery HTTP: --sites kopii WolneLektury na portach PORT..PORT+SITES-1 (osobne hosty,
+# np. do crawla rozproszonego) i Wikipedia na PORT+SITES.
+# Graf linków jest syntetyczny i powtarzalny (--seed); rozmiar stron, opóźnienia, błędy
+# (429/503/timeout) i robots.txt ustawia się opcjami. Uruchamiany przez benchmarks/load_test.py,
+# ale działa też samodzielnie:
+#
+#   python benchmarks/synthetic_site.py [--port 8800] [--books 200] [--latency 0.05] [--error-503 0.02]
+#
+# WolneLektury: /katalog/ -> /katalog/lektura/bN/ -> /katalog/lektura/bN.html (treść lektury)
+# Wikipedia:    /wiki/A0 (START_URL) -> /wiki/AN
+# Treść stron zależy też od numeru kopii, więc kopie nie są dla crawla duplikatami.
+
+import argparse
+import hashlib
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ('lektura rozdział słowo zdanie wiersz poeta miasto rzeka dom las pole droga czas rok dzień '
+         'noc światło cień morze góra dziecko matka ojciec brat siostra król wojna pokój serce ręka '
+         'oko głos pieśń księga historia język naród ziemia niebo wiatr ogień woda kamień drzewo').split()
+
+
+def add_arguments(arg_parser):
+    # Wspólne z load_test.py: te same opcje trafiają do serwera uruchamianego w osobnym procesie
+    group = arg_parser.add_argument_group('atrapa serwisów')
+    group.add_argument('--port', type=int, default=8800, help="Port pierwszej kopii WolneLektury")
+    group.add_argument('--sites', type=int, default=1, help="Liczba kopii WolneLektury (Wikipedia: PORT+SITES)")
+    group.add_argument('--seed', type=int, default=1, help="Ziarno grafu linków i treści")
+    group.add_argument('--books', type=int, default=200, help="Liczba lektur w katalogu")
+    group.add_argument('--related', type=int, default=5, help="Linki do innych lektur na stronie lektury")
+    group.add_argument('--book-paragraphs', type=int, default=200, help="Średnia liczba akapitów lektury")
+    group.add_argument('--articles', type=int, default=500, help="Liczba artykułów Wikipedii")
+    group.add_argument('--article-links', type=int, default=50, help="Linki w jednym artykule")
+    group.add_argument('--article-paragraphs', type=int, default=30, help="Średnia liczba akapitów artykułu")
+    group.add_argument('--latency', type=float, default=0.05, help="Stałe opóźnienie odpowiedzi (s)")
+    group.add_argument('--jitter', type=float, default=0.05, help="Losowe dodatkowe opóźnienie, do tylu sekund")
+    group.add_argument('--error-429', type=float, default=0.0, help="Odsetek odpowiedzi 429")
+    group.add_argument('--error-503', type=float, default=0.0, help="Odsetek odpowiedzi 503")
+    group.add_argument('--timeouts', type=float, default=0.0, help="Odsetek żądań bez odpowiedzi przez --hang s")
+    group.add_argument('--hang', type=float, default=15.0, help="Czas (s) wstrzymania odpowiedzi przy timeoucie")
+    group.add_argument('--retry-after', type=int, help="Nagłówek Retry-After (s) dla 429/503")
+    group.add_argument('--disallow', action='append', default=[], metavar='ŚCIEŻKA',
+                       help="Reguła Disallow w robots.txt (można podać wielokrotnie)")
+    group.add_argument('--crawl-delay', type=float, help="Crawl-delay w robots.txt")
+    return group
+
+
+def server_arguments(args):
+    # Odtwarza linię poleceń serwera z opcji sparsowanych przez add_arguments
+    argv = []
+    for name in ('port', 'sites', 'seed', 'books', 'related', 'book_paragraphs', 'articles', 'article_links',
+                 'article_paragraphs', 'latency', 'jitter', 'error_429', 'error_503', 'timeouts', 'hang',
+                 'retry_after', 'crawl_delay'):
+        value = getattr(args, name)
+        if value is not None:
+            argv += ['--' + name.replace('_', '-'), str(value)]
+    for path in args.disallow:
+        argv += ['--disallow', path]
+    return argv
+
+
+def sentences(rng, count):
+    return ' '.join(' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + '.'
+                    for _ in range(count))
+
+
+def page_rng(args, site, kind, number):
+    # Ta sama strona ma zawsze tę samą treść, więc i ten sam ETag (zob. Handler.do_GET)
+    return random.Random(f'{args.seed}:{site}:{kind}:{number}')
+
+
+def site_urls(args):
+    # (START_URL-e kopii WolneLektury, START_URL Wikipedii)
+    lektury = [f'http://127.0.0.1:{args.port + i}/katalog/' for i in range(args.sites)]
+    return lektury, f'http://127.0.0.1:{args.port + args.sites}/wiki/A0'
+
+
+def catalog_page(args):
+    links = ''.join(f'<li><a href="/katalog/lektura/b{i}/">Lektura {i}</a></li>' for i in range(args.books))
+    return (f'<html lang="pl"><head><meta charset="utf-8"><title>Katalog</title></head><body>'
+            f'<a href="/katalog/motyw/">Motywy</a><a href="/katalog/autor/">Autorzy</a><ul>{links}</ul></body></html>')
+
+
+def lektura_page(args, site, number):
+    rng = page_rng(args, site, 'lektura', number)
+    related = ''.join(f'<a href="/katalog/lektura/b{rng.randrange(args.books)}/">Zobacz też</a>'
+                      for _ in range(args.related))
+    return (f'<html lang="pl"><head><meta charset="utf-8"><title>Lektura {number}</title></head><body>'
+            f'<h1>Lektura {number}</h1><p>{sentences(rng, 3)}</p>'
+            f'<a class="l-button l-button--media l-button--media--full" href="/katalog/lektura/b{number}.html">'
+            f'<i class="icon-eye"></i> Czytaj online</a>{related}</body></html>')
+
+
+def book_page(args, site, number):
+    rng = page_rng(args, site, 'book', number)
+    count = max(1, int(args.book_paragraphs * rng.uniform(0.5, 1.5)))
+    paragraphs = ''.join(f'<p class="paragraph">{sentences(rng, 3)}</p>\n' for _ in range(count))
+    return (f'<html lang="pl"><head><meta charset="utf-8"><title>Lektura {number}</title></head><body>'
+            f'<h1 class="chapter-title">Lektura {number}</h1><a class="author" href="/katalog/autor/a/">Autor</a>'
+            f'<div id="book-text"><div id="wltoc">Spis treści</div>{paragraphs}'
+            f'<div class="footnotes"><p>[1] przypis</p></div></div></body></html>')
+
+
+def article_page(args, site, number):
+    rng = page_rng(args, site, 'article', number)
+    links = ' '.join(f'<a href="/wiki/A{rng.randrange(args.articles)}">Artykuł</a>' for _ in range(args.article_links))
+    count = max(1, int(args.article_paragraphs * rng.uniform(0.5, 1.5)))
+    sections = ''.join(f'<h2>Sekcja {i}<span class="mw-editsection">[edytuj]</span></h2><p>{sentences(rng, 4)}</p>'
+                       for i in range(count))
+    return (f'<html lang="pl"><head><meta charset="utf-8"><title>A{number}</title></head><body>'
+            f'<h1 id="firstHeading">Artykuł {number}</h1><div id="mw-content-text">'
+            f'<p>{sentences(rng, 2)} <sup class="reference">[1]</sup> {links}</p>{sections}'
+            f'<h2>Przypisy</h2><ol><li>przypis</li></ol></div>'
+            f'<div id="catlinks"><div id="mw-normal-catlinks"><ul><li><a href="/wiki/Kategoria:K">K</a></li></ul></div></div>'
+            f'<footer><li id="footer-info-lastmod">Tę stronę ostatnio edytowano 10 mar 2021, 14:50.</li></footer>'
+            f'</body></html>')
+
+
+def robots_txt(args):
+    lines = ['User-agent: *'] + [f'Disallow: {path}' for path in args.disallow]
+    if args.crawl_delay is not None:
+        lines.append(f'Crawl-delay: {args.crawl_delay:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def route(args, site, path):
+    # Treść strony albo None (404)
+    if site != 'wiki':
+        if path == '/katalog/':
+            return catalog_page(args)
+        if path.startswith('/katalog/lektura/b'):
+            name = path[len('/katalog/lektura/b'):]
+            if name.endswith('.html') and name[:-5].isdigit() and int(name[:-5]) < args.books:
+                return book_page(args, site, int(name[:-5]))
+            if name.endswith('/') and name[:-1].isdigit() and int(name[:-1]) < args.books:
+                return lektura_page(args, site, int(name[:-1]))
+    elif path.startswith('/wiki/A') and path[7:].isdigit() and int(path[7:]) < args.articles:
+        return article_page(args, site, int(path[7:]))
+    return None
+
+
+def make_handler(args, site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Połączenia keep-alive, jak w prawdziwych serwisach
+
+        def do_GET(self):
+            if self.path == '/robots.txt':
+                self.respond(200, robots_txt(args), 'text/plain; charset=utf-8')
+                return
+            time.sleep(args.latency + random.uniform(0, args.jitter))
+            roll = random.random()
+            if roll < args.error_429:
+                self.respond(429, 'Too Many Requests', 'text/plain', retry=True)
+                return
+            if roll < args.error_429 + args.error_503:
+                self.respond(503, 'Service Unavailable', 'text/plain', retry=True)
+                return
+            if roll < args.error_429 + args.error_503 + args.timeouts:
+                time.sleep(args.hang)  # Klient zwykle wcześniej zrezygnuje (REQUEST_TIMEOUT)
+            body = route(args, site, self.path)
+            if body is None:
+                self.respond(404, 'Not Found', 'text/plain')
+                return
+            # Stały ETag strony i 304 na If-None-Match: crawl ćwiczy rewalidację cache HTTP
+            etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:16] + '"'
+            if etag in self.headers.get('If-None-Match', ''):
+                self.respond(304, '', None, etag=etag)
+            else:
+                self.respond(200, body, 'text/html; charset=utf-8', etag=etag)
+
+        def respond(self, status, body, content_type, retry=False, etag=None):
+            data = body.encode('utf-8')
+            try:
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                if status == 304:
+                    self.end_headers()  # Odpowiedź 304 nie ma treści
+                    return
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                if retry and args.retry_after is not None:
+                    self.send_header('Retry-After', str(args.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Klient zrezygnował (timeout)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(args):
+    servers = []
+    sites = [f'lektury{i}' for i in range(args.sites)] + ['wiki']
+    for offset, site in enumerate(sites):
+        server = ThreadingHTTPServer(('127.0.0.1', args.port + offset), make_handler(args, site))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Lokalna atrapa WolneLektury i Wikipedii.")
+    add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    servers = serve(args)
+    lektury, wiki = site_urls(args)
+    print(f"WolneLektury: {', '.join(lektury)}; Wikipedia: {wiki}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    for server in servers:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
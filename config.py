@@ -6,4 +6,103 @@ START_URLS = ['https://wolnelektury.pl/katalog/',
 MAX_PAGES = 5
 EXTRACTED_PAGES_MAX = 5  # Maksymalna liczba linków ekstraktowanych z każdego START_URL
 USER_AGENT = 'MyCrawler/1.0 (+https://yourwebsite.com)'
- 
\ No newline at end of file
+ 
+# Silnik pobierania (asyncio)
+CONCURRENCY = 8  # Maksymalna liczba równoległych żądań HTTP (łącznie)
+PER_HOST_CONCURRENCY = 2  # Maksymalna liczba równoległych żądań do jednego hosta
+HOST_MIN_INTERVAL = 1.0  # Minimalny odstęp (s) między startami żądań do tego samego hosta (pułap tempa)
+REQUEST_TIMEOUT = 10  # Timeout (s) pojedynczego żądania
+FETCH_MAX_BYTES = 32 * 1024 * 1024  # Maksymalny rozmiar treści strony; większe odpowiedzi są przerywane
+FETCH_CHUNK_SIZE = 64 * 1024  # Rozmiar porcji przy czytaniu treści
+CHARSET_SNIFF_BYTES = 4096  # Początek dokumentu przeszukiwany pod kątem <meta charset>
+CHARSET_DETECT_BYTES = 64 * 1024  # Prefiks do wykrywania kodowania, gdy brak go w nagłówkach i <meta>
+
+# Wspólna sesja HTTP
+POOL_CONNECTIONS = 10  # Liczba hostów, dla których trzymamy pule połączeń keep-alive
+POOL_MAXSIZE = PER_HOST_CONCURRENCY + 1  # Rozmiar puli połączeń na host (+1 na robots.txt)
+DNS_CACHE_TTL = 300  # Czas (s) przechowywania wyników DNS; 0 wyłącza cache
+
+# Dyskowy cache HTTP (data/http_cache)
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Limit rozmiaru cache; po przekroczeniu usuwamy najdawniej używane (LRU)
+HTTP_CACHE_FRESHNESS = {  # Sufiks hosta -> czas (s), przez który wpis jest świeży bez rewalidacji
+    'wolnelektury.pl': 24 * 3600,
+    'lektury.gov.pl': 24 * 3600,
+    'wikipedia.org': 3600,
+}
+HTTP_CACHE_SKIP_REPARSE = True  # Przy treści z cache (304) używaj zapisanego wyniku parsowania
+
+# Checkpointy crawla (data/crawl_journal.jsonl, wznawianie przez --resume)
+CHECKPOINT_FLUSH_EVERY = 50  # Zrzut dziennika na dysk co tyle zdarzeń...
+CHECKPOINT_FLUSH_INTERVAL = 10.0  # ...lub co tyle sekund
+
+# Kolejka URL-i (frontier)
+FRONTIER_MEMORY_LIMIT = 200000  # Liczba URL-i trzymanych w pamięci; nadmiar trafia do pliku SQLite w data/
+
+# Zbiory odwiedzonych URL-i: 'exact' (set), 'hash' (64-bitowe skróty) lub 'bloom' (filtr Blooma)
+SEEN_SET_BACKEND = 'hash'
+SEEN_SET_CAPACITY = 100000  # Początkowa pojemność (zbiory rosną automatycznie)
+SEEN_SET_FPR = 0.001  # Dopuszczalny odsetek fałszywych trafień dla 'bloom'
+
+# Kanonizacja URL-i
+HOST_ALIASES = {  # Hosty-lustra sprowadzane do jednego hosta kanonicznego
+    'www.wolnelektury.pl': 'wolnelektury.pl',
+    'lektury.gov.pl': 'wolnelektury.pl',
+}
+
+# Parsowanie stron w osobnych procesach (równolegle z pobieraniem)
+PARSE_WORKERS = 0  # Liczba procesów parsujących; 0 = parsowanie w głównym procesie, None = liczba rdzeni CPU
+
+# Zapis tekstów: 'files' (jeden plik .txt na stronę w data/) lub 'shards' (pliki-shardy w data/corpus z indeksem)
+STORAGE_BACKEND = 'files'
+SHARD_MAX_BYTES = 64 * 1024 * 1024  # Maksymalny rozmiar jednego sharda
+SHARD_COMPRESSION = True  # Kompresja zlib każdego rekordu osobno (odczyt pojedynczego tekstu bez rozpakowywania sharda)
+
+# Manifest zapisanych tekstów i linków (data/manifest.sqlite3)
+MANIFEST_BATCH_SIZE = 100  # Liczba zmian zatwierdzanych w jednej transakcji
+
+# Wykrywanie duplikatów treści przed zapisem (odciski w manifeście)
+CONTENT_DEDUP = True
+SIMHASH_SHINGLE = 3  # Długość n-gramów słów w SimHash
+SIMHASH_DISTANCE = 3  # Maksymalna liczba różnych bitów dla prawie-duplikatu (musi być < 4)
+SIMHASH_MIN_WORDS = 50  # Krótsze teksty porównujemy tylko dokładnym skrótem
+
+# Archiwum surowych odpowiedzi (data/archive/*.warc.gz) do ponownego parsowania bez sieci (--reparse)
+ARCHIVE_ENABLED = False
+ARCHIVE_MAX_BYTES = 1024 * 1024 * 1024  # Maksymalny rozmiar jednego pliku archiwum
+
+# robots.txt (data/robots.sqlite3)
+ROBOTS_TTL = 24 * 3600  # Czas (s) ważności zapisanego robots.txt
+ROBOTS_TIMEOUT = 5  # Timeout (s) pobierania robots.txt
+ROBOTS_MAX_CRAWL_DELAY = 30  # Górny limit (s) dla Crawl-delay/Request-rate z robots.txt
+
+# Adaptacyjne tempo per host (AIMD), ponawianie i bezpiecznik
+LIMITER_MIN_RATE = 0.05  # Dolna granica tempa (req/s) po zwolnieniach
+LIMITER_MAX_RATE = 100.0  # Górna granica tempa (req/s), także gdy HOST_MIN_INTERVAL = 0
+LIMITER_INCREASE = 0.1  # Wzrost tempa po każdej udanej odpowiedzi, jako ułamek pułapu hosta (z HOST_MIN_INTERVAL)
+LIMITER_DECREASE = 0.5  # Mnożnik tempa po 429/503, timeoucie lub wolnej odpowiedzi...
+LIMITER_DECREASE_INTERVAL = 2.0  # ...stosowany najwyżej raz na tyle sekund (seria błędów to jedno zwolnienie)
+LIMITER_SLOW_RESPONSE = 5.0  # Odpowiedź wolniejsza niż tyle sekund oznacza przeciążony host
+FETCH_RETRIES = 3  # Ponowienia po błędach przejściowych (timeout, połączenie, 429, 5xx); URL wraca wtedy do kolejki
+RETRY_BASE_DELAY = 1.0  # Pierwsze opóźnienie (s) ponowienia; kolejne rosną dwukrotnie (z losowym rozrzutem)
+RETRY_MAX_DELAY = 60.0  # Maksymalne opóźnienie (s) ponowienia, także z Retry-After
+BREAKER_FAILURES = 5  # Tyle błędów przejściowych z rzędu wstrzymuje host...
+BREAKER_COOLDOWN = 60.0  # ...na tyle sekund (przy kolejnych seriach dwukrotnie dłużej)
+
+# Metryki crawla (data/metrics.json i data/metrics.prom)
+METRICS_ENABLED = True
+METRICS_FLUSH_INTERVAL = 10  # Co ile sekund zapisywać metryki na dysk
+METRICS_PORT = None  # Port lokalnego endpointu HTTP z metrykami (None - bez serwera)
+METRICS_HISTORY = 720  # Liczba zapamiętanych próbek wartości chwilowych (np. rozmiaru kolejek)
+
+# Profilowanie (--profile): raport w data/profile
+PROFILE_TOP_N = 20  # Liczba najdroższych funkcji i miejsc alokacji w raporcie
+PROFILE_MIN_SECONDS = 0.0001  # Krótsze fragmenty stosów pomijamy w plikach .collapsed
+
+# Crawl rozproszony (--coordinator / --worker)
+DIST_AUTHKEY = b'webcrawler'  # Domyślny sekret koordynatora i workerów - dozwolony tylko na adresie lokalnym
+DIST_AUTHKEY_ENV = 'WEBCRAWLER_AUTHKEY'  # Zmienna środowiskowa z sekretem (albo --authkey)
+DIST_BATCH_SIZE = 16  # Maksymalna liczba URL-i w paczce dla workera
+DIST_POLL_INTERVAL = 0.2  # Co ile sekund koordynator sprawdza nowe połączenia i czekających workerów
+DIST_VIRTUAL_NODES = 64  # Punkty workera na pierścieniu spójnego haszowania
+DIST_CONNECT_TIMEOUT = 30  # Jak długo (s) worker próbuje połączyć się z koordynatorem
@@ -0,0 +1,140 @@
+# crawler/archive.py
+
+import gzip
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from modules.logger import logger
+from config import ARCHIVE_MAX_BYTES
+
+# Nagłówki odpowiedzi, których nie zapisujemy: treść w archiwum jest już rozpakowana i w całości
+SKIPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+# Rozszerzenie WARC: kodowanie znaków użyte przy pobieraniu, aby ponowne parsowanie widziało ten sam tekst
+ENCODING_FIELD = 'WebCrawler-Encoding'
+# Rozszerzenie WARC: skąd pochodzi treść, gdy nie z odpowiedzi 200 (np. 'http-cache', 'revalidated-304')
+SOURCE_FIELD = 'WebCrawler-Source'
+
+
+class ArchiveRecord:
+    def __init__(self, url, status, headers, body, encoding, date):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+        self.date = date
+
+    @property
+    def text(self):
+        # Jak response.text w requests: znaki spoza kodowania zastępowane
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class WarcWriter:
+    # Archiwum odpowiedzi w formacie zbliżonym do WARC/1.0: rekordy 'response' (linia statusu,
+    # nagłówki, treść), każdy jako osobny człon gzip, dopisywane do plików .warc.gz o ograniczonym
+    # rozmiarze. Każde uruchomienie zaczyna nowy plik, więc urwany zapis psuje tylko koniec starego.
+    def __init__(self, archive_dir, max_bytes=ARCHIVE_MAX_BYTES):
+        self.archive_dir = archive_dir
+        os.makedirs(archive_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.prefix = f"crawl-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self.part = 0
+        self.file = None
+        self.lock = threading.Lock()
+
+    def _open(self):
+        path = os.path.join(self.archive_dir, f'{self.prefix}-{self.part:05d}.warc.gz')
+        self.file = open(path, 'ab')
+        logger.info(f"Archiwum odpowiedzi: {path}")
+
+    def write_response(self, url, status, reason, headers, body, encoding=None, source=None):
+        http_lines = [f'HTTP/1.1 {status} {reason or ""}'.rstrip()]
+        http_lines += [f'{name}: {value}' for name, value in headers.items() if name.lower() not in SKIPPED_HEADERS]
+        block = ('\r\n'.join(http_lines) + '\r\n\r\n').encode('utf-8') + body
+
+        warc_fields = [
+            'WARC/1.0',
+            'WARC-Type: response',
+            f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>',
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f'WARC-Target-URI: {url}',
+            'Content-Type: application/http;msgtype=response',
+            f'Content-Length: {len(block)}',
+        ]
+        if encoding:
+            warc_fields.append(f'{ENCODING_FIELD}: {encoding}')
+        if source:
+            warc_fields.append(f'{SOURCE_FIELD}: {source}')
+        record = ('\r\n'.join(warc_fields) + '\r\n\r\n').encode('utf-8') + block + b'\r\n\r\n'
+        data = gzip.compress(record, compresslevel=6)
+
+        with self.lock:
+            if self.file is None:
+                self._open()
+            elif self.file.tell() and self.file.tell() + len(data) > self.max_bytes:
+                self.file.close()
+                self.part += 1
+                self._open()
+            self.file.write(data)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def _read_header_block(stream):
+    # Linie 'Nazwa: wartość' do pustej linii; None na końcu pliku
+    first = stream.readline()
+    while first in (b'\r\n', b'\n'):
+        first = stream.readline()
+    if not first:
+        return None, None
+    fields = {}
+    while True:
+        line = stream.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('utf-8', errors='replace').partition(':')
+        fields[name.strip()] = value.strip()
+    return first.decode('utf-8', errors='replace').strip(), fields
+
+
+def read_records(path):
+    # Rekordy 'response' z jednego pliku. Urwany ostatni rekord (awaria w trakcie zapisu) kończy odczyt.
+    with gzip.open(path, 'rb') as stream:
+        try:
+            while True:
+                version, fields = _read_header_block(stream)
+                if version is None:
+                    return
+                length = int(fields.get('Content-Length', 0))
+                block = stream.read(length)
+                if len(block) < length:
+                    raise EOFError
+                if fields.get('WARC-Type') != 'response':
+                    continue
+                head, _, body = block.partition(b'\r\n\r\n')
+                status_line, *header_lines = head.decode('utf-8', errors='replace').split('\r\n')
+                parts = status_line.split(' ', 2)
+                status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+                headers = dict(line.split(': ', 1) for line in header_lines if ': ' in line)
+                yield ArchiveRecord(fields.get('WARC-Target-URI'), status, headers, body,
+                                    fields.get(ENCODING_FIELD), fields.get('WARC-Date'))
+        except (EOFError, OSError, ValueError) as e:
+            # ValueError: uszkodzony nagłówek rekordu (np. Content-Length), dalszej części pliku nie da się podzielić
+            logger.warning(f"Archiwum {path} jest niekompletne ({str(e) or 'urwany rekord'}), pomijam resztę pliku.")
+
+
+def iter_archive(archive_dir):
+    # Wszystkie rekordy w kolejności zapisu (nazwy plików zaczynają się od daty uruchomienia)
+    if not os.path.isdir(archive_dir):
+        return
+    for name in sorted(os.listdir(archive_dir)):
+        if name.endswith('.warc.gz'):
+            yield from read_records(os.path.join(archive_dir, name))
@@ -0,0 +1,48 @@
+# crawler/canonical.py
+
+import re
+from urllib.parse import urlsplit, urlunsplit, quote
+from config import HOST_ALIASES
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+PERCENT_RUN = re.compile(r'(?:%[0-9A-Fa-f]{2})+')
+KEEP_ENCODED = set('/?#%')  # Znaki, których zdekodowanie zmieniłoby znaczenie ścieżki
+
+
+def _decode_percent_run(match):
+    raw = bytes.fromhex(match.group(0).replace('%', ''))
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return match.group(0).upper()
+    return ''.join(
+        quote(ch, safe='') if ch in KEEP_ENCODED or ch.isspace() or not ch.isprintable() else ch
+        for ch in text
+    )
+
+
+def normalize_path(path):
+    # 'J%C4%99zyk_polski' i 'Język_polski' dają tę samą, zdekodowaną postać
+    if '%' in path:
+        path = PERCENT_RUN.sub(_decode_percent_run, path)
+    return path or '/'
+
+
+def canonicalize_url(url, aliases=HOST_ALIASES):
+    # Reguły ogólne: małe litery w schemacie i hoście, bez domyślnego portu i fragmentu (#),
+    # hosty-lustra zamienione na host kanoniczny, ujednolicone kodowanie procentowe ścieżki
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+
+    host = (parts.hostname or '').rstrip('.')
+    host = aliases.get(host, host)
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+    return urlunsplit((scheme, netloc, normalize_path(parts.path), parts.query, ''))
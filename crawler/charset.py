@@ -0,0 +1,55 @@
+# crawler/charset.py
+
+import codecs
+import re
+from requests.compat import chardet
+from config import CHARSET_SNIFF_BYTES, CHARSET_DETECT_BYTES
+
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# <meta charset="..."> albo <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+def is_html(content_type):
+    # Brak nagłówka traktujemy jak HTML (tak było dotąd)
+    if not content_type:
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_TYPES
+
+
+def known_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def detect_encoding(content_type, body):
+    # Kolejność: BOM, charset z Content-Type, <meta> z początku dokumentu, a dopiero na końcu
+    # wykrywanie statystyczne na ograniczonym prefiksie (zamiast apparent_encoding na całej treści)
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return encoding
+    match = HEADER_CHARSET.search(content_type or '')
+    if match and known_encoding(match.group(1)):
+        return known_encoding(match.group(1))
+    match = META_CHARSET.search(body[:CHARSET_SNIFF_BYTES])
+    if match and known_encoding(match.group(1).decode('ascii', errors='ignore')):
+        return known_encoding(match.group(1).decode('ascii'))
+    try:
+        # Poprawny UTF-8 w całości (sprawdzenie w C, o rzędy wielkości tańsze niż wykrywanie)
+        body.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    # Wykrywanie na oknie wokół pierwszego bajtu spoza ASCII - sam początek strony bywa czystym ASCII
+    first = NON_ASCII.search(body)
+    start = max(first.start() - 1024, 0) if first else 0
+    return (chardet.detect(body[start:start + CHARSET_DETECT_BYTES]) or {}).get('encoding') or 'utf-8'
@@ -0,0 +1,135 @@
+# crawler/checkpoint.py
+
+import json
+import os
+import time
+from crawler.seen_set import create_seen_set
+from modules.logger import logger
+from config import CHECKPOINT_FLUSH_EVERY, CHECKPOINT_FLUSH_INTERVAL
+
+
+class CrawlState:
+    # Stan odtworzony z dziennika: odwiedzone URL-e, operacje na kolejkach, liczniki, ukończone fazy
+    def __init__(self):
+        self.done = create_seen_set()
+        self.explored = create_seen_set()  # URL-e przetworzone w fazach zbierania linków
+        self.pushes = {}  # nazwa kolejki -> lista (urls, priorytet) w kolejności dodania
+        self.finished_phases = set()
+        self.counters = {}
+        self.extracted_counts = {}
+        self.finished = False
+
+    def queue(self, name):
+        return [url for urls, priority in self.pushes.get(name, []) for url in urls]
+
+    def apply(self, event):
+        kind = event['e']
+        if kind == 'done':
+            for url in event['u']:
+                self.done.add(url)
+        elif kind == 'explored':
+            for url in event['u']:
+                self.explored.add(url)
+        elif kind == 'push':
+            self.pushes.setdefault(event['q'], []).append((event['u'], event.get('p', 0)))
+        elif kind == 'phase':
+            self.finished_phases.add(event['p'])
+        elif kind == 'counters':
+            self.counters = event['c']
+            self.extracted_counts = event['x']
+        elif kind == 'finished':
+            self.finished = True
+
+
+class CrawlJournal:
+    # Dziennik typu append-only (JSON lines). Każdy zapis to kilka nowych linii, więc koszt
+    # checkpointu nie rośnie z rozmiarem crawla. Bufor jest zrzucany (flush + fsync) co
+    # CHECKPOINT_FLUSH_EVERY zdarzeń lub co CHECKPOINT_FLUSH_INTERVAL sekund.
+    def __init__(self, path, snapshot=None, flush_every=CHECKPOINT_FLUSH_EVERY,
+                 flush_interval=CHECKPOINT_FLUSH_INTERVAL, before_flush=None):
+        self.path = path
+        self.snapshot = snapshot  # Funkcja zwracająca (liczniki, extracted_counts)
+        # Wołane przed każdym zrzutem, np. zatwierdzenie manifestu: URL oznaczony w dzienniku
+        # jako przetworzony ma wtedy na pewno swój wpis w manifeście
+        self.before_flush = before_flush
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.file = None
+
+    def open(self, resume=False):
+        state = None
+        if resume:
+            state = self.load()
+            if state is None:
+                logger.info("Brak dziennika przerwanego crawla. Zaczynam od początku.")
+            elif state.finished:
+                logger.info("Poprzedni crawl zakończył się poprawnie. Zaczynam od początku.")
+                state = None
+            else:
+                logger.info(f"Wznawiam crawl: {len(state.done)} odwiedzonych URL-i, "
+                            f"{len(state.explored)} zbadanych przy zbieraniu linków, "
+                            f"ukończone fazy: {', '.join(sorted(state.finished_phases)) or 'brak'}.")
+        self.file = open(self.path, 'a' if state else 'w', encoding='utf-8')
+        return state
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        state = CrawlState()
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Niedokończona ostatnia linia po awarii
+                    logger.warning("Pominięto uszkodzony wpis dziennika crawla.")
+                    break
+                state.apply(event)
+        return state
+
+    def record(self, kind, **fields):
+        if self.file is None:
+            return  # Dziennik nieotwarty (np. worker crawla rozproszonego) - nic nie zapisujemy
+        fields['e'] = kind
+        self.buffer.append(fields)
+        if len(self.buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def push(self, queue, urls, priority=0):
+        if urls:
+            self.record('push', q=queue, u=list(urls), p=priority)
+
+    def done(self, url):
+        self.record('done', u=[url])
+
+    def explored(self, url):
+        self.record('explored', u=[url])
+
+    def phase_finished(self, name):
+        self.record('phase', p=name)
+        self.flush()
+
+    def flush(self, tail=()):
+        if self.file is None:
+            return
+        if self.before_flush:
+            self.before_flush()
+        if self.snapshot:
+            counters, extracted_counts = self.snapshot()
+            self.buffer.append({'e': 'counters', 'c': counters, 'x': extracted_counts})
+        self.buffer.extend(tail)
+        lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in self.buffer)
+        self.file.write(lines)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def close(self, finished=True):
+        if self.file is None:
+            return
+        self.flush(tail=[{'e': 'finished'}] if finished else ())
+        self.file.close()
+        self.file = None
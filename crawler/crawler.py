@@ -1,39 +1,94 @@
 import re
-import requests
 import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from contextlib import nullcontext
 from urllib.parse import urlparse
 from crawler.wiki_parser import WikiParser
 from crawler.lektury_parser import LekturyParser
 from crawler.storage import Storage
 from crawler.robots import RobotsHandler
+from crawler.fetcher import AsyncFetcher, log_fetch_failure
+from crawler.transport import HttpTransport
+from crawler.http_cache import HttpCache
+from crawler.checkpoint import CrawlJournal
+from crawler.frontier import Frontier, PRIORITY_NORMAL, PRIORITY_HIGH
+from crawler.seen_set import create_seen_set
+from crawler.canonical import canonicalize_url
+from crawler.document import ParsedDocument
+from crawler.parse_pool import ParsePool
+from crawler.archive import WarcWriter
+from crawler.reparse import reparse_archive
+from crawler.metrics import metrics, MetricsExporter
+from crawler.profiler import Profiler
 from modules.logger import logger
-from config import USER_AGENT, MAX_PAGES, EXTRACTED_PAGES_MAX, START_URLS
+from config import USER_AGENT, MAX_PAGES, EXTRACTED_PAGES_MAX, START_URLS, CONCURRENCY, HOST_MIN_INTERVAL
+from config import HTTP_CACHE_ENABLED, HTTP_CACHE_SKIP_REPARSE, PARSE_WORKERS, ARCHIVE_ENABLED
+from config import METRICS_ENABLED, METRICS_PORT
 import os
-from bs4 import BeautifulSoup
 
 class WebCrawler:
-    def __init__(self):
-        self.storage = Storage()
-        self.robots_handler = RobotsHandler()
+    def __init__(self, resume=False, parse_workers=PARSE_WORKERS, metrics_port=METRICS_PORT, profile=False,
+                 start_urls=START_URLS, data_dir=None, host_aliases=None, max_pages=MAX_PAGES,
+                 extracted_pages_max=EXTRACTED_PAGES_MAX, concurrency=CONCURRENCY, host_interval=HOST_MIN_INTERVAL):
+        # start_urls, data_dir, host_aliases i limity pozwalają uruchomić crawl np. na lokalnej
+        # atrapie serwisów (benchmarks/load_test.py); host_aliases: host -> domena wybierająca parser
+        self.storage = Storage(data_dir=data_dir)
+        self.host_aliases = host_aliases or {}
+        self.max_pages = max_pages
+        self.extracted_pages_max = extracted_pages_max
+        self.transport = HttpTransport(USER_AGENT)
+        self.robots_handler = RobotsHandler(self.transport, os.path.join(self.storage.data_dir, 'robots.sqlite3'))
+        self.http_cache = None
+        if HTTP_CACHE_ENABLED:
+            self.http_cache = HttpCache(os.path.join(self.storage.data_dir, 'http_cache'))
+        self.archive = WarcWriter(self.archive_dir) if ARCHIVE_ENABLED else None
+        self.fetcher = AsyncFetcher(self.transport, concurrency=concurrency, min_interval=host_interval,
+                                    cache=self.http_cache, archive=self.archive,
+                                    host_delay=self.robots_handler.crawl_delay)
         self.parsers = {
-            'wolnelektury.pl': LekturyParser(USER_AGENT),
-            'lektury.gov.pl': LekturyParser(USER_AGENT),
-            'wikipedia.org': WikiParser(USER_AGENT),
+            'wolnelektury.pl': LekturyParser(USER_AGENT, self.fetcher),
+            'lektury.gov.pl': LekturyParser(USER_AGENT, self.fetcher),
+            'wikipedia.org': WikiParser(USER_AGENT, self.fetcher),
         }
-        self.visited = set()
+        # Profilowanie (--profile) obejmuje tylko ten proces, więc parsowanie zostaje w nim
+        self.profiler = Profiler(os.path.join(self.storage.data_dir, 'profile')) if profile else None
+        if self.profiler and parse_workers != 0:
+            logger.info("Tryb profilowania: parsowanie w głównym procesie, bez puli procesów.")
+            parse_workers = 0
+        # Opcjonalna pula procesów parsujących (PARSE_WORKERS = 0 - parsowanie w tym procesie)
+        self.parse_pool = ParsePool(self.parsers, parse_workers) if parse_workers != 0 else None
+        self.visited = create_seen_set()
+        # URL-e pobrane w fazach zbierania linków (gather). Osobno od visited, bo zebrane tam
+        # strony z tekstem faza pobierania ma jeszcze pobrać i zapisać
+        self.explored = create_seen_set()
         self.page_count = 0
 
         self.collected_links_wolnelektury = []
         self.collected_links_wikipedia = []
         self.collected_links_file = []  # Linki przetworzone w fazie plikowej
 
-        self.wolnelektury_start = START_URLS[0]
-        self.wikipedia_start = START_URLS[1]
+        self.wolnelektury_start = self.canonicalize(start_urls[0])
+        self.wikipedia_start = self.canonicalize(start_urls[1])
 
         self.start_time = time.time()
         self.skipped_count = 0
         self.saved_count = 0
         self.ignored_count = 0  # Nowe pole: liczba ignorowanych linków
+        self.duplicate_count = 0  # Teksty pominięte jako (prawie) identyczne z już zapisanymi
+        self.extracted_counts = {}  # Liczba zebranych tekstów per START_URL
+
+        # Dziennik crawla (checkpointy) i stan odtworzony przy --resume
+        self.resume = resume
+        self.journal = CrawlJournal(os.path.join(self.storage.data_dir, 'crawl_journal.jsonl'),
+                                    snapshot=self.checkpoint_snapshot, before_flush=self.storage.flush)
+        self.resumed_state = None
+        self.finished_phases = set()
+        self.current_phase = None  # Etykieta phase metryk; poza run_phase ustawiają ją reparse i worker
+
+        # Metryki zapisywane okresowo do data/metrics.json i data/metrics.prom
+        self.metrics_exporter = None
+        if METRICS_ENABLED:
+            self.metrics_exporter = MetricsExporter(self.storage.data_dir, port=metrics_port)
 
         self.ignored_paths = [
             '/katalog/daisy/',
@@ -44,6 +99,22 @@ class WebCrawler:
             '/katalog/audiobooki/'
         ]
 
+    @property
+    def archive_dir(self):
+        return os.path.join(self.storage.data_dir, 'archive')
+
+    def reparse(self, archive_dir=None):
+        # Tryb offline: korpus z archiwum odpowiedzi zamiast z sieci
+        self.current_phase = 'reparse'
+        try:
+            return reparse_archive(self, archive_dir or self.archive_dir)
+        finally:
+            if self.parse_pool:
+                self.parse_pool.close()
+            if self.http_cache:
+                self.http_cache.close()
+            self.storage.close()
+
     def is_ignored_link(self, url):
         parsed = urlparse(url)
         for ipath in self.ignored_paths:
@@ -52,48 +123,305 @@ class WebCrawler:
         return False
 
     def fetch(self, url):
-        try:
-            headers = {'User-Agent': USER_AGENT}
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                response.encoding = response.apparent_encoding
-                return response.text
+        return self.fetch_many([url]).get(url)
+
+    def fetch_many(self, urls):
+        results = self.fetch_results(urls)
+        return {url: (results[url].text if url in results else None) for url in urls}
+
+    def fetch_results(self, urls):
+        # Zwraca tylko udane odpowiedzi; błędy są logowane i liczone jako pominięte
+        results = {}
+        for url, result in self.fetcher.fetch_many(urls).items():
+            if result.ok:
+                results[url] = result
             else:
-                logger.warning(f"HTTP error {response.status_code} while fetching {url}")
+                log_fetch_failure(result)
                 self.skipped_count += 1
-                return None
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {url}: {e}")
+        return results
+
+    def seen(self, explore):
+        return self.explored if explore else self.visited
+
+    def mark_done(self, url, explore):
+        if explore:
+            self.journal.explored(url)
+        else:
+            self.journal.done(url)
+
+    def admit_url(self, url, explore=False):
+        # Wspólne sprawdzenia przed pobraniem: ignorowane, odwiedzone, robots.txt
+        if self.is_ignored_link(url):
+            self.ignored_count += 1
+            return False
+
+        seen = self.seen(explore)
+        if url in seen:
+            return False
+
+        seen.add(url)
+
+        if not self.robots_handler.can_fetch(url, USER_AGENT):
+            logger.info(f"Access denied by robots.txt: {url}")
+            self.skipped_count += 1
+            self.mark_done(url, explore)
+            return False
+        return True
+
+    def fetch_and_parse(self, frontier, start_url=None, budget=None, explore=False):
+        # Okno pobierania: w toku jest do CONCURRENCY żądań (i nie więcej, niż zwraca budget(),
+        # np. brakująca liczba tekstów), a na miejsce każdej pobranej strony od razu startuje kolejny
+        # URL z kolejki - najwolniejsza strona nie wstrzymuje pozostałych. Wyniki przychodzą
+        # w kolejności pobrania, a faza może w trakcie dokładać URL-e do kolejki. Z pulą procesów
+        # strona trafia do parsowania zaraz po pobraniu, równolegle z pobieraniem reszty.
+        # Błąd przejściowy (429, 503, timeout) albo wstrzymany host nie blokuje okna: URL wraca do
+        # kolejki na czas podany przez fetcher i nie jest oznaczany w dzienniku jako przetworzony.
+        # explore=True w fazach zbierania linków: URL-e liczą się jako zbadane (explored), nie odwiedzone.
+        parsing = {}  # url -> Future z wynikiem z puli
+        pending = {}  # Future pobrania -> url
+        attempts = {}  # url odłożony do ponowienia -> liczba wykonanych żądań
+
+        def start_parsing(result):
+            parser = self.get_parser(urlparse(result.url).netloc)
+            if not (result.ok and parser) or self.reuses_parse(result):
+                return
+            parsing[result.url] = self.parse_pool.submit(parser, result.text, result.url, result.url == start_url)
+
+        try:
+            while True:
+                window = self.fetcher.concurrency if budget is None else min(self.fetcher.concurrency, budget())
+                while frontier and len(pending) < window:
+                    url = frontier.pop()
+                    if url is None:
+                        break  # W kolejce są tylko URL-e odłożone na później
+                    # Odłożony URL był już przyjęty (i jest w odwiedzonych)
+                    if url in attempts or self.admit_url(url, explore):
+                        pending[self.fetcher.submit(url, start_parsing if self.parse_pool else None,
+                                                    attempts.get(url, 0))] = url
+                metrics.set('frontier_size', len(frontier), queue=frontier.name)
+                if not pending:
+                    if not frontier or window <= 0:
+                        return
+                    time.sleep(frontier.ready_in())
+                    continue
+                # Przy wolnym miejscu w oknie budzimy się też wtedy, gdy nadejdzie czas odłożonego URL-a
+                timeout = frontier.ready_in() if len(pending) < window else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    result = future.result()
+                    if result.retry_at is not None:
+                        attempts[url] = result.attempts
+                        frontier.defer(url, result.retry_at)
+                        continue
+                    attempts.pop(url, None)
+                    if not result.ok:
+                        log_fetch_failure(result)
+                        self.skipped_count += 1
+                    yield from self.parse_fetched(url, result, parsing, start_url, explore)
+        finally:
+            # Faza przerwała pobieranie (np. osiągnięty limit) - niepotrzebne żądania i parsowania anulujemy
+            for future in pending:
+                future.cancel()
+            for future in parsing.values():
+                future.cancel()
+
+    def parse_fetched(self, url, result, parsing, start_url, explore=False):
+        # Dla pobranej strony zero albo jeden wynik (url, dokument, parser, wynik parsowania)
+        content = result.text if result.ok else None
+        if not content:
+            logger.warning(f"No content fetched for URL: {url}")
+            self.mark_done(url, explore)
+            return
+
+        domain = urlparse(url).netloc
+        parser = self.get_parser(domain)
+        if not parser:
+            logger.warning(f"No parser available for domain: {domain}")
+            self.skipped_count += 1
+            self.mark_done(url, explore)
+            return
+
+        is_start_url = (url == start_url)
+        if url in parsing:
+            parse_result, anchors, elapsed = parsing.pop(url).result()
+            self.observe_parse(parser, is_start_url, parse_result, elapsed)
+            document = ParsedDocument.from_anchors(url, anchors)
+            self.store_parse(parser, url, is_start_url, parse_result, anchors)
+        else:
+            document, parse_result = self.parse_content(parser, content, url, is_start_url,
+                                                        result.not_modified)
+        if not parse_result:
+            logger.warning(f"Parser returned None for URL: {url}")
             self.skipped_count += 1
-            return None
+            self.mark_done(url, explore)
+            return
+
+        metrics.inc('phase_pages', phase=self.current_phase)
+        yield url, document, parser, parse_result
+        # Wracamy tu dopiero po obsłużeniu wyniku przez fazę, więc URL jest faktycznie przetworzony
+        self.mark_done(url, explore)
+
+    def parse_cache_key(self, parser, is_start_url):
+        return f"{type(parser).__name__}:{parser.cache_version}:{is_start_url}"
+
+    def reuses_parse(self, result):
+        # Strona bez zmian od ostatniego pobrania: wynik parsowania może pochodzić z cache
+        return bool(self.http_cache and HTTP_CACHE_SKIP_REPARSE and result.not_modified)
+
+    def store_parse(self, parser, url, is_start_url, parse_result, anchors):
+        if self.http_cache and HTTP_CACHE_SKIP_REPARSE and parse_result:
+            self.http_cache.store_parsed(url, self.parse_cache_key(parser, is_start_url), (parse_result, anchors))
+
+    def parse_content(self, parser, content, url, is_start_url, not_modified=False):
+        # Zwraca (dokument, wynik parsowania); tablica linków dokumentu służy potem do szukania
+        # dodatkowych linków, więc strona nie jest parsowana drugi raz
+        if self.http_cache and HTTP_CACHE_SKIP_REPARSE and not_modified:
+            # Bierzemy zapisany wynik parsowania i linki
+            cached = self.http_cache.load_parsed(url, self.parse_cache_key(parser, is_start_url))
+            if cached is not None:
+                logger.debug(f"Użyto zapisanego wyniku parsowania dla {url}")
+                parse_result, anchors = cached
+                return ParsedDocument.from_anchors(url, anchors), parse_result
+
+        started = time.perf_counter()
+        with self.profile_parser(parser, 'parse'):
+            document = parser.document(content, url)
+            parse_result = parser.parse(document, url, is_start_url=is_start_url)
+        self.observe_parse(parser, is_start_url, parse_result, time.perf_counter() - started)
+        self.store_parse(parser, url, is_start_url, parse_result, document.anchors)
+        return document, parse_result
+
+    def observe_parse(self, parser, is_start_url, parse_result, elapsed):
+        # Typ strony według wyniku parsera: start_url / fallback_urls / text
+        page_type = parse_result[1] if parse_result else 'none'
+        metrics.observe('parse_seconds', elapsed, parser=type(parser).__name__, page_type=page_type)
+
+    def profile_parser(self, parser, method):
+        return self.profiler.parser_call(parser, method) if self.profiler else nullcontext()
+
+    def canonicalize(self, url):
+        # Linki z parserów są już kanoniczne; tu sprowadzamy do tej postaci START_URLS i linki z pliku
+        url = canonicalize_url(url)
+        parser = self.get_parser(urlparse(url).netloc)
+        return parser.canonicalize_url(url) if parser else url
 
     def get_parser(self, domain):
+        domain = self.host_aliases.get(domain, domain)
         if re.match(r'.*\.wikipedia\.org$', domain):
             return self.parsers.get('wikipedia.org')
         return self.parsers.get(domain)
 
-    def start_crawling(self):
+    def run_phases(self):
         # Faza 1: WolneLektury
-        self.gather_links_from_domain(self.wolnelektury_start, 'wolnelektury')
+        self.run_phase('gather:wolnelektury', self.gather_links_from_domain, self.wolnelektury_start, 'wolnelektury')
         if not self.collected_links_wolnelektury:
             logger.warning("Nie zebrano żadnych linków z WolneLektury.")
         else:
-            self.download_and_save_phase(self.collected_links_wolnelektury, "WolneLektury")
+            self.run_phase('download:wolnelektury', self.download_and_save_phase,
+                           self.collected_links_wolnelektury, "WolneLektury", 'wolnelektury')
 
         # Faza 2: Wikipedia
-        self.gather_links_from_domain(self.wikipedia_start, 'wikipedia')
+        self.run_phase('gather:wikipedia', self.gather_links_from_domain, self.wikipedia_start, 'wikipedia')
         if not self.collected_links_wikipedia:
             logger.warning("Nie zebrano żadnych linków z Wikipedii.")
         else:
-            self.download_and_save_phase(self.collected_links_wikipedia, "Wikipedia")
+            self.run_phase('download:wikipedia', self.download_and_save_phase,
+                           self.collected_links_wikipedia, "Wikipedia", 'wikipedia')
 
         # Faza 3: Linki z pliku
-        self.process_links_from_file()
+        self.run_phase('file', self.process_links_from_file)
+
+    def checkpoint_snapshot(self):
+        counters = {
+            'page_count': self.page_count,
+            'skipped_count': self.skipped_count,
+            'saved_count': self.saved_count,
+            'ignored_count': self.ignored_count,
+            'duplicate_count': self.duplicate_count,
+        }
+        return counters, self.extracted_counts
+
+    def restore_checkpoint(self):
+        state = self.journal.open(resume=self.resume)
+        if not state:
+            return
+        self.resumed_state = state
+        self.visited = state.done
+        self.explored = state.explored
+        self.finished_phases = set(state.finished_phases)
+        for name, value in state.counters.items():
+            setattr(self, name, value)
+        self.extracted_counts = dict(state.extracted_counts)
+        self.collected_links_wolnelektury = state.queue('collected:wolnelektury')
+        self.collected_links_wikipedia = state.queue('collected:wikipedia')
+        self.collected_links_file = state.queue('collected:file')
+
+    def open_frontier(self, name, seed=(), explore=False):
+        frontier = Frontier(name, spill_dir=self.storage.data_dir)
+        seen = self.seen(explore)
+        # Przy wznawianiu najpierw odtwarzamy wpisy z dziennika (zachowują swój priorytet),
+        # potem dokładamy resztę; URL-e już przetworzone pomijamy
+        if self.resumed_state:
+            for urls, priority in self.resumed_state.pushes.get(name, []):
+                frontier.extend([url for url in urls if url not in seen], priority)
+        frontier.extend([url for url in seed if url not in seen])
+        self.robots_handler.prefetch(seed, USER_AGENT)
+        metrics.set('frontier_size', len(frontier), queue=name)
+        return frontier
+
+    def enqueue(self, frontier, urls, priority=PRIORITY_NORMAL):
+        added = frontier.extend(urls, priority)
+        self.journal.push(frontier.name, added, priority)
+        # robots.txt nowych hostów pobieramy od razu, równolegle, a nie po jednym przy sprawdzaniu URL-i
+        self.robots_handler.prefetch(added, USER_AGENT)
+        metrics.set('frontier_size', len(frontier), queue=frontier.name)
+        return added
+
+    def run_phase(self, name, phase, *args):
+        if name in self.finished_phases:
+            logger.info(f"Faza {name} została ukończona przed przerwaniem crawla. Pomijam.")
+            return
+        self.current_phase = name
+        started = time.perf_counter()
+        with self.profiler.phase(name) if self.profiler else nullcontext():
+            phase(*args)
+        elapsed = time.perf_counter() - started
+        pages = metrics.value('phase_pages', phase=name)
+        metrics.set('phase_seconds', round(elapsed, 3), phase=name)
+        logger.info(f"Faza {name}: {pages} stron w {elapsed:.1f} s ({pages / elapsed if elapsed else 0:.2f} stron/s)")
+        self.journal.phase_finished(name)
+
+    def start_crawling(self):
+        self.restore_checkpoint()
+        completed = False
+        if self.metrics_exporter:
+            self.metrics_exporter.start()
+        try:
+            self.run_phases()
+            completed = True
+        finally:
+            # Przy przerwaniu zrzucamy bufor dziennika bez znacznika końca, aby dało się wznowić
+            self.journal.close(finished=completed)
+            self.storage.flush()
+            self.fetcher.close()
+            self.robots_handler.close()
+            if self.http_cache:
+                self.http_cache.close()
+            if self.archive:
+                self.archive.close()
+            if self.parse_pool:
+                self.parse_pool.close()
+            if self.metrics_exporter:
+                self.metrics_exporter.stop()
+            if self.profiler:
+                self.profiler.write_reports()
+                self.profiler.close()
 
         all_links = set(self.collected_links_wolnelektury + self.collected_links_wikipedia + self.collected_links_file)
         self.storage.save_all_collected_links(all_links)
 
-        # Pobranie statystyk z storage (zakładamy, że takie metody istnieją)
+        # Statystyki z manifestu (zapytania, bez przeglądania plików)
         overall_saved_texts = self.storage.get_saved_texts_count()
         overall_collected_links_count = self.storage.get_all_collected_links_count()
 
@@ -113,85 +441,65 @@ class WebCrawler:
         logger.info(f"Ilość pominiętych linków: {self.skipped_count}")
         logger.info(f"Ilość odwiedzonych linków: {visited_count}")
         logger.info(f"Ilość ignorowanych stron: {self.ignored_count}")
+        logger.info(f"Ilość pominiętych duplikatów treści: {self.duplicate_count}")
         logger.info(f"Ilość nowo zapisanych linków do all_collected_links: {newly_saved_links_count}")
         logger.info(f"Ilość nowo zapisanych tekstów do plików txt: {self.saved_count}")
         logger.info(f"Ilość ogólnie zapisanych już tekstów: {overall_saved_texts}")
         logger.info(f"Ilość ogólnie zapisanych już linków w all_collected_links: {overall_collected_links_count}")
         logger.info(f"Ilość linków w all_collected_links, które jeszcze nie zostały zapisane do txt: {not_saved_links_count}")
+        self.storage.close()
 
     def gather_links_from_domain(self, start_url, domain_type):
-        links_to_explore = [start_url]
-        collected = 0
-
-        while links_to_explore and collected < EXTRACTED_PAGES_MAX:
-            url = links_to_explore.pop(0)
-
-            if self.is_ignored_link(url):
-                self.ignored_count += 1
-                continue
-
-            if url in self.visited:
-                continue
-
-            self.visited.add(url)
-
-            domain = urlparse(url).netloc
-            if not self.robots_handler.can_fetch(url, USER_AGENT):
-                logger.info(f"Access denied by robots.txt: {url}")
-                self.skipped_count += 1
-                continue
-
-            content = self.fetch(url)
-            if not content:
-                logger.warning(f"No content fetched for URL: {url}")
-                continue
-
-            parser = self.get_parser(domain)
-            if not parser:
-                logger.warning(f"No parser available for domain: {domain}")
-                self.skipped_count += 1
-                continue
-
-            parse_result = parser.parse(content, url, is_start_url=(url == start_url))
-            if not parse_result:
-                logger.warning(f"Parser returned None for URL: {url}")
-                self.skipped_count += 1
-                continue
-
-            data, data_type = parse_result
+        frontier = self.open_frontier(f'gather:{domain_type}', [start_url], explore=True)
+        collected = self.extracted_counts.get(start_url, 0)
 
+        pages = self.fetch_and_parse(frontier, start_url, explore=True) if collected < self.extracted_pages_max else ()
+        for url, document, parser, (data, data_type) in pages:
             if data_type == 'start_url':
                 related_links, (text, metadata) = data
+                new_links = []
                 for link in related_links:
-                    if not self.is_ignored_link(link) and link not in self.visited:
-                        links_to_explore.append(link)
+                    if not self.is_ignored_link(link) and link not in self.explored:
+                        new_links.append(link)
+                self.enqueue(frontier, new_links)
 
             elif data_type == 'fallback_urls':
+                new_links = []
                 for link in data:
                     if self.is_ignored_link(link):
                         self.ignored_count += 1
                         continue
-                    if link not in self.visited:
-                        links_to_explore.append(link)
+                    if link not in self.explored:
+                        new_links.append(link)
+                self.enqueue(frontier, new_links)
 
             elif data_type == 'text':
                 if domain_type == 'wolnelektury':
                     self.collected_links_wolnelektury.append(url)
                 else:
                     self.collected_links_wikipedia.append(url)
+                self.journal.push(f'collected:{domain_type}', [url])
                 collected += 1
+                self.extracted_counts[start_url] = collected
+                if collected >= self.extracted_pages_max:
+                    break
             else:
                 logger.info(f"URL: {url} zwrócił nieoczekiwany typ danych: {data_type}. Ignoruję.")
                 self.skipped_count += 1
 
-            time.sleep(1)
+        frontier.close()
+        # Zebrane linki do tekstów trafiają też do extracted_links.txt (faza plikowa, kolejne crawle)
+        if domain_type == 'wolnelektury':
+            self.storage.save_links(self.collected_links_wolnelektury)
+        else:
+            self.storage.save_links(self.collected_links_wikipedia)
 
-    def get_additional_links_from_content(self, url, content, parser):
-        soup = BeautifulSoup(content, 'html.parser')
+    def get_additional_links_from_content(self, url, document, parser):
+        # Wszystkie extract_* korzystają z tablicy linków zbudowanej przy parsowaniu strony
         additional_links = []
 
         if hasattr(parser, 'extract_online_links'):
-            online = parser.extract_online_links(soup, url)
+            online = parser.extract_online_links(document, url)
             for link in online:
                 if self.is_ignored_link(link):
                     self.ignored_count += 1
@@ -199,7 +507,7 @@ class WebCrawler:
                     additional_links.append(link)
 
         if hasattr(parser, 'extract_katalog_links'):
-            katalog = parser.extract_katalog_links(soup, url)
+            katalog = parser.extract_katalog_links(document, url)
             for link in katalog:
                 if self.is_ignored_link(link):
                     self.ignored_count += 1
@@ -207,7 +515,7 @@ class WebCrawler:
                     additional_links.append(link)
 
         if hasattr(parser, 'extract_all_katalog_links'):
-            all_kat = parser.extract_all_katalog_links(soup, url)
+            all_kat = parser.extract_all_katalog_links(document, url)
             for link in all_kat:
                 if self.is_ignored_link(link):
                     self.ignored_count += 1
@@ -215,7 +523,7 @@ class WebCrawler:
                     additional_links.append(link)
 
         if hasattr(parser, 'extract_related_links'):
-            fallback = parser.extract_related_links(soup, url)
+            fallback = parser.extract_related_links(document, url)
             for link in fallback:
                 if self.is_ignored_link(link):
                     self.ignored_count += 1
@@ -224,80 +532,22 @@ class WebCrawler:
 
         return list(set(additional_links))
 
-    def download_and_save_phase(self, links, source_name):
+    def download_and_save_phase(self, links, source_name, queue_name):
         logger.info(f"Rozpoczynam pobieranie i zapisywanie treści z {len(links)} zebranych linków ({source_name}).")
-        index = 0
-        while index < len(links):
-            if self.page_count >= MAX_PAGES:
-                logger.info("Osiągnięto limit MAX_PAGES. Kończę przetwarzanie tekstów.")
-                break
-
-            url = links[index]
-
-            if self.is_ignored_link(url):
-                self.ignored_count += 1
-                index += 1
-                continue
-
-            if url in self.visited:
-                index += 1
-                continue
-
-            self.visited.add(url)
-
-            if not self.robots_handler.can_fetch(url, USER_AGENT):
-                logger.info(f"Access denied by robots.txt: {url}")
-                self.skipped_count += 1
-                index += 1
-                continue
-
-            content = self.fetch(url)
-            if not content:
-                logger.warning(f"No content fetched for URL: {url}")
-                index += 1
-                continue
-
-            domain = urlparse(url).netloc
-            parser = self.get_parser(domain)
-            if not parser:
-                logger.warning(f"No parser available for domain: {domain}")
-                self.skipped_count += 1
-                index += 1
-                continue
-
-            parse_result = parser.parse(content, url, is_start_url=False)
-            if not parse_result:
-                logger.warning(f"Parser zwrócił None dla URL: {url}")
-                self.skipped_count += 1
-                index += 1
-                continue
-
-            data, data_type = parse_result
-            if data_type == 'text' and data:
-                text, metadata = data
-                if self.storage.is_already_saved(url, metadata):
-                    logger.info(f"SKIP: Tekst dla linku {url} został już zapisany.")
-                    self.skipped_count += 1
-                    additional_links = self.get_additional_links_from_content(url, content, parser)
-                    if additional_links:
-                        links[index+1:index+1] = additional_links
-                        logger.info(f"Dodano {len(additional_links)} dodatkowych linków z pomijanego linku.")
-                    else:
-                        logger.info("Brak dodatkowych linków do wyekstrahowania z pomijanego linku.")
-                    index += 1
-                    continue
-                self.storage.save(text, metadata, url)
-                self.page_count += 1
-                self.saved_count += 1
-                logger.debug(f"Inkrementowano page_count: teraz {self.page_count}")
-            else:
-                logger.info(f"URL: {url} nie zawiera tekstu do zapisania (data_type={data_type}). Ignoruję.")
-                self.skipped_count += 1
-
-            index += 1
-            time.sleep(1)
-
-        if self.page_count < MAX_PAGES:
+        frontier = self.open_frontier(f'download:{queue_name}', links)
+        for url, document, parser, parse_result in self.fetch_and_parse(frontier, budget=self.remaining_pages):
+            additional_links = self.save_page(url, document, parser, parse_result)
+            if additional_links:
+                # Dodatkowe linki mają pierwszeństwo przed resztą zebranych linków
+                added = self.enqueue(frontier, additional_links, PRIORITY_HIGH)
+                links.extend(added)
+                self.journal.push(f'collected:{queue_name}', added)
+                self.storage.save_links(added)
+        if self.page_count >= self.max_pages:
+            logger.info("Osiągnięto limit MAX_PAGES. Kończę przetwarzanie tekstów.")
+        frontier.close()
+
+        if self.page_count < self.max_pages:
             logger.info("Nie udało się osiągnąć MAX_PAGES, pomimo prób dodawania nowych linków z pomijanych stron.")
 
     def process_links_from_file(self):
@@ -307,89 +557,57 @@ class WebCrawler:
             return
 
         with open(links_file, 'r', encoding='utf-8') as f:
-            file_links = [line.strip() for line in f if line.strip()]
-
-        index = 0
-        while index < len(file_links):
-            if self.page_count >= MAX_PAGES:
-                logger.info("Osiągnięto limit MAX_PAGES w fazie plikowej. Kończę przetwarzanie.")
-                break
-
-            url = file_links[index]
-
-            if not url or self.is_ignored_link(url):
-                if self.is_ignored_link(url):
-                    self.ignored_count += 1
-                index += 1
-                continue
-
-            if url in self.visited:
-                index += 1
-                continue
-
-            self.visited.add(url)
-            domain = urlparse(url).netloc
-
-            if not self.robots_handler.can_fetch(url, USER_AGENT):
-                logger.info(f"Access denied by robots.txt: {url}")
-                self.skipped_count += 1
-                index += 1
-                continue
-
-            content = self.fetch(url)
-            if not content:
-                logger.warning(f"No content fetched for URL: {url}")
-                index += 1
-                continue
-
-            parser = self.get_parser(domain)
-            if not parser:
-                logger.warning(f"No parser available for domain: {domain}")
-                self.skipped_count += 1
-                index += 1
-                continue
-
-            parse_result = parser.parse(content, url, is_start_url=False)
-            if not parse_result:
-                logger.warning(f"Parser zwrócił None dla URL: {url}")
-                self.skipped_count += 1
-                index += 1
-                continue
+            file_links = [self.canonicalize(line.strip()) for line in f if line.strip()]
+        frontier = self.open_frontier('file', file_links)
+        for url, document, parser, parse_result in self.fetch_and_parse(frontier, budget=self.remaining_pages):
+            additional_links = self.save_page(url, document, parser, parse_result,
+                                              saved_links=self.collected_links_file)
+            if additional_links:
+                self.enqueue(frontier, additional_links, PRIORITY_HIGH)
+        if self.page_count >= self.max_pages:
+            logger.info("Osiągnięto limit MAX_PAGES w fazie plikowej. Kończę przetwarzanie.")
+        frontier.close()
+
+        if self.page_count < self.max_pages:
+            logger.info("Nie udało się osiągnąć MAX_PAGES w fazie plikowej, pomimo prób dodawania nowych linków z pomijanych stron.")
 
-            data, data_type = parse_result
-            if data_type == 'text' and data:
-                text, metadata = data
-                if self.storage.is_already_saved(url, metadata):
+    def remaining_pages(self):
+        # Budżet okna pobierania w fazach zapisu: więcej stron w toku i tak nie zmieści się w MAX_PAGES
+        return self.max_pages - self.page_count
+
+    def save_page(self, url, document, parser, parse_result, saved_links=None):
+        # Zapis tekstu strony; zwraca dodatkowe linki z pominiętej strony (już zapisanej lub duplikatu)
+        data, data_type = parse_result
+        if data_type == 'text' and data:
+            text, metadata = data
+            already_saved = self.storage.is_already_saved(url, metadata)
+            # Ta sama treść pod innym adresem (lustro, wariant .html, przekierowanie Wikipedii)
+            duplicate_of, fingerprint = (None, None) if already_saved else self.storage.find_duplicate(text)
+            if already_saved or duplicate_of:
+                if already_saved:
                     logger.info(f"SKIP: Tekst dla linku {url} został już zapisany.")
-                    self.skipped_count += 1
-                    additional_links = self.get_additional_links_from_content(url, content, parser)
-                    # Filtrujemy ignorowane i odwiedzone
-                    additional_links = [l for l in additional_links if not self.is_ignored_link(l) and l not in self.visited]
-                    if additional_links:
-                        links_to_add = []
-                        for lnk in additional_links:
-                            if self.is_ignored_link(lnk):
-                                self.ignored_count += 1
-                            elif lnk not in self.visited:
-                                links_to_add.append(lnk)
-                        if links_to_add:
-                            file_links[index+1:index+1] = links_to_add
-                            logger.info(f"Dodano {len(links_to_add)} dodatkowych linków z pomijanego linku.")
-                    else:
-                        logger.info("Brak dodatkowych linków do wyekstrahowania z pomijanego linku.")
-                    index += 1
-                    continue
-                self.storage.save(text, metadata, url)
-                self.page_count += 1
-                self.saved_count += 1
-                self.collected_links_file.append(url)
-                logger.debug(f"Inkrementowano page_count: teraz {self.page_count}")
-            else:
-                logger.info(f"URL: {url} nie zawiera tekstu do zapisania (data_type={data_type}). Ignoruję.")
+                else:
+                    logger.info(f"SKIP: Tekst dla linku {url} jest duplikatem zapisanego tekstu {duplicate_of}.")
+                    self.duplicate_count += 1
                 self.skipped_count += 1
-
-            index += 1
-            time.sleep(1)
-
-        if self.page_count < MAX_PAGES:
-            logger.info("Nie udało się osiągnąć MAX_PAGES w fazie plikowej, pomimo prób dodawania nowych linków z pomijanych stron.")
+                with self.profile_parser(parser, 'extract_links'):
+                    additional_links = self.get_additional_links_from_content(url, document, parser)
+                if additional_links:
+                    logger.info(f"Dodano {len(additional_links)} dodatkowych linków z pomijanego linku.")
+                else:
+                    logger.info("Brak dodatkowych linków do wyekstrahowania z pomijanego linku.")
+                return additional_links
+            if not self.storage.save(text, metadata, url, fingerprint):
+                self.skipped_count += 1
+                return []
+            metrics.inc('phase_saved', phase=self.current_phase)
+            self.page_count += 1
+            self.saved_count += 1
+            if saved_links is not None:
+                saved_links.append(url)
+                self.journal.push('collected:file', [url])
+            logger.debug(f"Inkrementowano page_count: teraz {self.page_count}")
+        else:
+            logger.info(f"URL: {url} nie zawiera tekstu do zapisania (data_type={data_type}). Ignoruję.")
+            self.skipped_count += 1
+        return []
@@ -0,0 +1,384 @@
+# crawler/distributed.py
+
+import bisect
+import ipaddress
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+from urllib.parse import urlparse
+from crawler.canonical import canonicalize_url
+from crawler.crawler import WebCrawler
+from crawler.fingerprints import FingerprintIndex, hash64
+from crawler.frontier import Frontier
+from crawler.metrics import metrics, MetricsExporter
+from crawler.seen_set import create_seen_set
+from crawler.storage import Storage
+from modules.logger import logger
+from config import USER_AGENT, START_URLS, MAX_PAGES, CONCURRENCY, HOST_MIN_INTERVAL, METRICS_ENABLED
+from config import DIST_AUTHKEY, DIST_AUTHKEY_ENV, DIST_BATCH_SIZE, DIST_POLL_INTERVAL, DIST_VIRTUAL_NODES, DIST_CONNECT_TIMEOUT
+
+
+def parse_address(value, default_host='127.0.0.1'):
+    # 'host:port' albo samo 'port'
+    host, _, port = value.rpartition(':')
+    return host or default_host, int(port)
+
+
+def resolve_authkey(authkey=None):
+    # Sekret z --authkey, ze zmiennej DIST_AUTHKEY_ENV albo domyślny DIST_AUTHKEY
+    authkey = authkey or os.environ.get(DIST_AUTHKEY_ENV)
+    if not authkey:
+        return DIST_AUTHKEY
+    return authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # Nazwa hosta albo '' (wszystkie interfejsy)
+
+
+class HashRing:
+    # Spójne haszowanie: każdy worker ma DIST_VIRTUAL_NODES punktów na okręgu, host należy do
+    # pierwszego punktu za swoim skrótem. Dołączenie lub odejście workera przenosi tylko ~1/N hostów.
+    def __init__(self, replicas=DIST_VIRTUAL_NODES):
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}  # punkt -> worker
+
+    def __len__(self):
+        return len(set(self.owners.values()))
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = hash64(f'{node}#{i}'.encode('utf-8'))
+            bisect.insort(self.points, point)
+            self.owners[point] = node
+
+    def remove(self, node):
+        self.points = [point for point in self.points if self.owners[point] != node]
+        self.owners = {point: owner for point, owner in self.owners.items() if owner != node}
+
+    def node_for(self, key):
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, hash64(key.encode('utf-8'))) % len(self.points)
+        return self.owners[self.points[index]]
+
+
+class Coordinator:
+    # Wspólny frontier (kolejka per host), zbiór odwiedzonych i Storage dla workerów, które mogą
+    # działać na wielu maszynach. Hosty są rozdzielone spójnym haszowaniem, a host z paczką w toku
+    # zostaje przy swoim workerze do jej zwrotu, więc tempo hosta pilnuje zawsze jeden worker.
+    # Wszystkie wiadomości obsługuje jeden wątek (Storage i manifest SQLite bez blokad).
+    def __init__(self, address, start_urls=START_URLS, data_dir=None, host_aliases=None, max_pages=MAX_PAGES,
+                 authkey=None, batch_size=DIST_BATCH_SIZE, concurrency=CONCURRENCY,
+                 host_interval=HOST_MIN_INTERVAL):
+        self.address = address
+        self.authkey = resolve_authkey(authkey)
+        # Połączenie z poprawnym sekretem może przysłać dowolny obiekt do odpiklowania, więc znanego
+        # wszystkim domyślnego sekretu nie wystawiamy poza maszynę
+        if self.authkey == DIST_AUTHKEY and not is_loopback(address[0]):
+            raise ValueError(f"Koordynator na adresie {address[0] or '*'} wymaga własnego sekretu "
+                             f"(--authkey albo zmienna {DIST_AUTHKEY_ENV}); domyślny działa tylko na 127.0.0.1.")
+        self.storage = Storage(data_dir=data_dir)
+        self.max_pages = max_pages
+        self.batch_size = batch_size
+        # Ustawienia przekazywane workerom przy rejestracji
+        self.settings = {
+            'start_urls': list(start_urls),
+            'host_aliases': dict(host_aliases or {}),
+            'concurrency': concurrency,
+            'host_interval': host_interval,
+        }
+        self.ring = HashRing()
+        self.queues = {}  # host -> deque URL-i
+        self.queued = 0
+        self.start_urls = set()
+        self.seen = create_seen_set()
+        self.leases = {}  # host -> worker z paczką tego hosta w toku
+        self.in_flight = {}  # worker -> paczka [(url, czy START_URL)]
+        self.connections = {}  # połączenie -> worker (None przed rejestracją)
+        self.waiting = set()  # Połączenia czekające na paczkę
+        self.next_worker = 1
+        self.new_connections = queue.Queue()
+        self.collected_links = []
+        self.saved_count = 0
+        self.skipped_count = 0
+        self.duplicate_count = 0
+        self.pages = 0
+        self.stopping = False
+        self.metrics_exporter = MetricsExporter(self.storage.data_dir) if METRICS_ENABLED else None
+
+    def add_urls(self, urls, is_start=False):
+        for url in urls:
+            if url in self.seen:
+                continue
+            self.seen.add(url)
+            if is_start:
+                self.start_urls.add(url)
+            self.queues.setdefault(urlparse(url).netloc, deque()).append(url)
+            self.queued += 1
+
+    def run(self, seed=None):
+        seed = seed if seed is not None else self.settings['start_urls']
+        self.add_urls([canonicalize_url(url) for url in seed], is_start=True)
+        listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, args=(listener,), name='coordinator-accept', daemon=True).start()
+        logger.info(f"Koordynator nasłuchuje na {self.address[0]}:{self.address[1]}")
+        if self.metrics_exporter:
+            self.metrics_exporter.start()
+        started = time.time()
+        try:
+            while not (self.stopping and not self.connections):
+                while not self.new_connections.empty():
+                    self.connections[self.new_connections.get()] = None
+                for conn in wait(list(self.connections), timeout=DIST_POLL_INTERVAL):
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        self.drop(conn)
+                        continue
+                    self.handle(conn, message)
+                self.serve_waiting()
+                metrics.set('frontier_size', self.queued, queue='distributed')
+        finally:
+            listener.close()
+            if self.metrics_exporter:
+                self.metrics_exporter.stop()
+            self.storage.save_all_collected_links(set(self.collected_links))
+            self.storage.flush()
+        self.report(time.time() - started)
+        self.storage.close()
+
+    def _accept(self, listener):
+        while True:
+            try:
+                self.new_connections.put(listener.accept())
+            except (AuthenticationError, EOFError) as e:
+                logger.warning(f"Odrzucono połączenie workera: {e!r}")
+            except OSError:
+                return  # Listener zamknięty
+
+    def handle(self, conn, message):
+        kind = message[0]
+        if kind == 'hello':
+            worker = self.next_worker
+            self.next_worker += 1
+            self.connections[conn] = worker
+            self.ring.add(worker)
+            self.in_flight[worker] = []
+            logger.info(f"Dołączył worker {worker} ({message[1]}); workerów: {len(self.ring)}")
+            conn.send(('welcome', worker, self.settings))
+        elif kind == 'get':
+            self.waiting.add(conn)
+        elif kind == 'done':
+            self.finish_batch(self.connections[conn], message[1])
+        elif kind == 'bye':
+            # Metryki workera (pobieranie, parsowanie) trafiają do wspólnego raportu
+            metrics.merge(message[1])
+            self.drop(conn)
+
+    def drop(self, conn):
+        worker = self.connections.pop(conn, None)
+        self.waiting.discard(conn)
+        conn.close()
+        if worker is None:
+            return
+        self.ring.remove(worker)
+        batch = self.in_flight.pop(worker, [])
+        if batch:
+            # Worker zniknął w trakcie paczki - URL-e wracają do kolejek innych workerów
+            logger.warning(f"Worker {worker} rozłączył się; {len(batch)} URL-i wraca do kolejki.")
+            for url, _ in batch:
+                self.queues.setdefault(urlparse(url).netloc, deque()).appendleft(url)
+                self.queued += 1
+        self.release(worker)
+
+    def release(self, worker):
+        for host in [host for host, owner in self.leases.items() if owner == worker]:
+            del self.leases[host]
+
+    def serve_waiting(self):
+        for conn in list(self.waiting):
+            worker = self.connections.get(conn)
+            if self.stopping or self.finished():
+                self.stopping = True
+                conn.send(('stop',))
+                self.waiting.discard(conn)
+                continue
+            batch = self.take_batch(worker)
+            if batch:
+                self.in_flight[worker] = batch
+                conn.send(('batch', batch))
+                self.waiting.discard(conn)
+
+    def finished(self):
+        if self.saved_count >= self.max_pages:
+            logger.info("Osiągnięto limit MAX_PAGES. Kończę crawl rozproszony.")
+            return True
+        return not self.queued and not any(self.in_flight.values())
+
+    def take_batch(self, worker):
+        # URL-e hostów należących do workera, po kolei z każdego hosta (round-robin)
+        hosts = [host for host, urls in self.queues.items()
+                 if urls and self.leases.get(host, worker) == worker and self.ring.node_for(host) == worker]
+        batch = []
+        while hosts and len(batch) < self.batch_size:
+            for host in list(hosts):
+                urls = self.queues[host]
+                url = urls.popleft()
+                batch.append((url, url in self.start_urls))
+                self.leases[host] = worker
+                if not urls:
+                    del self.queues[host]
+                    hosts.remove(host)
+                if len(batch) >= self.batch_size:
+                    break
+        self.queued -= len(batch)
+        return batch
+
+    def finish_batch(self, worker, results):
+        self.in_flight[worker] = []
+        self.release(worker)
+        metrics.inc('distributed_batches', worker=worker)
+        for result in results:
+            self.pages += 1
+            metrics.inc('distributed_pages', worker=worker)
+            self.add_urls(result.get('links', ()))
+            if 'text' in result:
+                self.save_text(result)
+            elif result.get('skipped'):
+                self.skipped_count += 1
+
+    def save_text(self, result):
+        url, text, metadata = result['url'], result['text'], result['metadata']
+        if self.saved_count >= self.max_pages:
+            return
+        already_saved = self.storage.is_already_saved(url, metadata)
+        duplicate_of, fingerprint = (None, None) if already_saved else \
+            self.storage.find_duplicate(text, result.get('fingerprint'))
+        if already_saved or duplicate_of:
+            if duplicate_of:
+                logger.info(f"SKIP: Tekst dla linku {url} jest duplikatem zapisanego tekstu {duplicate_of}.")
+                self.duplicate_count += 1
+            else:
+                logger.info(f"SKIP: Tekst dla linku {url} został już zapisany.")
+            self.skipped_count += 1
+            # Jak w save_page: linki ze strony pominiętej zastępują ją w kolejce
+            self.add_urls(result.get('extra_links', ()))
+            return
+        if not self.storage.save(text, metadata, url, fingerprint):
+            self.skipped_count += 1
+            return
+        self.saved_count += 1
+        self.collected_links.append(url)
+
+    def report(self, duration):
+        logger.info("Crawl rozproszony zakończony.")
+        logger.info(f"Czas wykonywania programu: {duration:.2f} s ({duration / 60.0:.2f} min)")
+        logger.info(f"Ilość przetworzonych stron: {self.pages} ({self.pages / duration if duration else 0:.2f} stron/s)")
+        logger.info(f"Ilość pominiętych linków: {self.skipped_count}")
+        logger.info(f"Ilość pominiętych duplikatów treści: {self.duplicate_count}")
+        logger.info(f"Ilość nowo zapisanych tekstów do plików txt: {self.saved_count}")
+        logger.info(f"Ilość ogólnie zapisanych już tekstów: {self.storage.get_saved_texts_count()}")
+
+
+class Worker:
+    # Pobiera od koordynatora paczki URL-i swoich hostów, pobiera je i parsuje (maszyneria
+    # WebCrawler: limiter hosta, robots.txt, parsery, pula procesów) i odsyła wyniki. Teksty
+    # zapisuje koordynator; worker liczy tylko odcisk tekstu, żeby odciążyć koordynatora.
+    def __init__(self, address, authkey=None, data_dir=None, parse_workers=0):
+        self.address = address
+        self.authkey = resolve_authkey(authkey)
+        self.data_dir = data_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+        self.parse_workers = parse_workers
+        self.fingerprints = FingerprintIndex()
+
+    def run(self):
+        conn = self.connect()
+        conn.send(('hello', f'{socket.gethostname()}:{os.getpid()}'))
+        _, worker_id, settings = conn.recv()
+        crawler = WebCrawler(parse_workers=self.parse_workers,
+                             data_dir=os.path.join(self.data_dir, 'workers', str(worker_id)),
+                             start_urls=settings['start_urls'], host_aliases=settings['host_aliases'],
+                             concurrency=settings['concurrency'], host_interval=settings['host_interval'])
+        crawler.current_phase = 'worker'  # Worker nie przechodzi przez run_phase
+        logger.info(f"Worker {worker_id} połączony z koordynatorem {self.address[0]}:{self.address[1]}")
+        try:
+            while True:
+                conn.send(('get',))
+                reply = conn.recv()
+                if reply[0] == 'stop':
+                    break
+                conn.send(('done', self.process(crawler, reply[1])))
+            conn.send(('bye', metrics.to_json()))
+        finally:
+            conn.close()
+            crawler.fetcher.close()
+            crawler.robots_handler.close()
+            if crawler.http_cache:
+                crawler.http_cache.close()
+            if crawler.parse_pool:
+                crawler.parse_pool.close()
+            crawler.storage.close()
+
+    def connect(self, timeout=DIST_CONNECT_TIMEOUT):
+        # Koordynator mógł jeszcze nie zacząć nasłuchiwać (np. workerzy uruchomieni razem z nim)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(DIST_POLL_INTERVAL)
+
+    def process(self, crawler, batch):
+        results = []
+        handled = set()
+        crawler.robots_handler.prefetch([url for url, _ in batch], USER_AGENT)
+        # fetch_and_parse rozpoznaje jeden START_URL na wywołanie
+        groups = [([url], url) for url, is_start in batch if is_start]
+        groups.append(([url for url, is_start in batch if not is_start], None))
+        for urls, start_url in groups:
+            frontier = Frontier('worker')
+            frontier.extend(urls)
+            for url, document, parser, (data, data_type) in crawler.fetch_and_parse(frontier, start_url):
+                handled.add(url)
+                results.append(self.result(crawler, url, document, parser, data, data_type))
+            frontier.close()
+        # Odrzucone przez robots.txt, błędy pobierania i strony bez wyniku parsera
+        results.extend({'url': url, 'skipped': True} for url, _ in batch if url not in handled)
+        return results
+
+    def result(self, crawler, url, document, parser, data, data_type):
+        if data_type == 'start_url':
+            links = data[0]
+        elif data_type == 'fallback_urls':
+            links = data
+        elif data_type == 'text' and data:
+            text, metadata = data
+            return {
+                'url': url,
+                'text': text,
+                'metadata': metadata,
+                'fingerprint': self.fingerprints.compute(text) if crawler.storage.dedup else None,
+                'extra_links': crawler.get_additional_links_from_content(url, document, parser),
+            }
+        else:
+            return {'url': url, 'skipped': True}
+        return {'url': url, 'links': [link for link in links if not crawler.is_ignored_link(link)]}
+
+
+def run_worker(address, authkey=None, data_dir=None, parse_workers=0):
+    # Punkt wejścia procesów workerów uruchamianych lokalnie (spawn)
+    Worker(address, authkey, data_dir, parse_workers).run()
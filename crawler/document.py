@@ -0,0 +1,40 @@
+# crawler/document.py
+
+from collections import namedtuple
+from bs4 import BeautifulSoup
+
+# Link <a href> zapamiętany przed zmianami drzewa: klasy linku, jego tekst i klasy ikon <i> w środku
+Anchor = namedtuple('Anchor', ['href', 'classes', 'text', 'icons'])
+
+
+def anchor_table(root):
+    anchors = []
+    for a_tag in root.find_all('a', href=True):
+        icons = tuple(cls for i_tag in a_tag.find_all('i') for cls in i_tag.get('class', ()))
+        anchors.append(Anchor(a_tag['href'], tuple(a_tag.get('class', ())), a_tag.get_text(strip=True), icons))
+    return anchors
+
+
+def scoped_anchors(soup, link_scope=None):
+    # link_scope to id elementu, z którego zbieramy linki (None = cały dokument)
+    root = soup.find(id=link_scope) if link_scope else soup
+    return anchor_table(root) if root else []
+
+
+class ParsedDocument:
+    # Strona sparsowana raz: drzewo dla ekstrakcji tekstu i tablica linków zbudowana jednym
+    # przejściem, zanim parser zacznie usuwać elementy. Z tej samej tablicy korzysta
+    # ekstrakcja linków w parserze i szukanie dodatkowych linków na pomijanych stronach.
+    def __init__(self, content, base_url, link_scope=None):
+        self.base_url = base_url
+        self.soup = BeautifulSoup(content, 'html.parser')
+        self.anchors = scoped_anchors(self.soup, link_scope)
+
+    @classmethod
+    def from_anchors(cls, base_url, anchors):
+        # Sama tablica linków, np. zapisana w cache HTTP razem z wynikiem parsowania
+        document = cls.__new__(cls)
+        document.base_url = base_url
+        document.soup = None
+        document.anchors = list(anchors)
+        return document
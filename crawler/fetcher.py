@@ -0,0 +1,253 @@
+# crawler/fetcher.py
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from crawler.rate_limiter import HostLimiter, HostUnavailable, is_transient, parse_retry_after
+from crawler.charset import detect_encoding, is_html
+from crawler.metrics import metrics, BYTES_BUCKETS
+from modules.logger import logger
+from config import CONCURRENCY, PER_HOST_CONCURRENCY, HOST_MIN_INTERVAL, FETCH_RETRIES, LIMITER_MAX_RATE
+from config import FETCH_MAX_BYTES, FETCH_CHUNK_SIZE
+
+
+class FetchResult:
+    def __init__(self, url, status=None, text=None, error=None, elapsed=0.0, not_modified=False,
+                 retry_after=None, size=0):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.error = error
+        self.elapsed = elapsed
+        self.not_modified = not_modified  # Treść z cache (świeża lub potwierdzona przez 304)
+        self.retry_after = retry_after  # Sekundy z nagłówka Retry-After (429/503)
+        self.attempts = 1  # Wykonane dotąd żądania o ten URL
+        self.size = size  # Bajty treści pobrane z sieci
+        # Błąd przejściowy albo wstrzymany host: najwcześniejsza chwila (time.monotonic()) ponowienia.
+        # None - wynik ostateczny (sukces albo błąd, którego nie ponawiamy)
+        self.retry_at = None
+
+    @property
+    def ok(self):
+        return self.status == 200 and self.text is not None
+
+
+class ContentRejected(Exception):
+    # Odpowiedź odrzucona bez czytania całej treści (typ inny niż HTML, przekroczony rozmiar)
+    pass
+
+
+class AsyncFetcher:
+    # Silnik pobierania: wiele żądań naraz (różne hosty), ale dla każdego hosta pilnujemy limitu
+    # równoległości i tempa (HostLimiter). Po błędzie przejściowym submit() nie czeka na ponowienie,
+    # tylko zwraca wynik z retry_at - crawler odkłada URL w kolejce, a miejsce w oknie dostaje
+    # inny URL. fetch_many() (pojedyncze pobrania, np. w parserach) ponawia na miejscu.
+    # Jedna pętla asyncio w osobnym wątku obsługuje wszystkie pobrania, więc crawler może
+    # dokładać URL-e w trakcie (submit), a nie czekać na koniec całej paczki.
+    def __init__(self, transport, concurrency=CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+                 min_interval=HOST_MIN_INTERVAL, cache=None, archive=None, host_delay=None,
+                 retries=FETCH_RETRIES, max_bytes=FETCH_MAX_BYTES):
+        self.transport = transport
+        self.host_delay = host_delay  # host -> dodatkowy odstęp (s), np. Crawl-delay z robots.txt
+        self.cache = cache
+        self.archive = archive  # WarcWriter: zapis surowych odpowiedzi z sieci
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.retries = retries
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='fetch')
+        self.limiters = {}  # host -> HostLimiter (stan przetrwa między paczkami)
+        self._loop = None  # Pętla asyncio w wątku 'fetch-loop', uruchamiana przy pierwszym pobraniu
+        self._thread = None
+        self._loop_lock = threading.Lock()
+        self._global_sem = None  # Semafory tworzone w wątku pętli
+        self._host_sems = {}
+
+    def fetch(self, url):
+        return self.fetch_many([url])[url]
+
+    def fetch_many(self, urls, on_result=None):
+        results = {}
+        due = {url: 0.0 for url in dict.fromkeys(urls)}  # url -> retry_at
+        while due:
+            time.sleep(max(0.0, min(due.values()) - time.monotonic()))
+            now = time.monotonic()
+            futures = {url: self.submit(url, on_result, results[url].attempts if url in results else 0)
+                       for url, retry_at in due.items() if retry_at <= now}
+            for url, future in futures.items():
+                result = results[url] = future.result()
+                if result.retry_at is None:
+                    del due[url]
+                else:
+                    due[url] = result.retry_at
+        return results
+
+    def submit(self, url, on_result=None, attempt=0):
+        # Zwraca concurrent.futures.Future z FetchResult; attempt - liczba wcześniejszych żądań o ten URL.
+        # on_result(result) jest wołane zaraz po pobraniu strony (w wątku pętli), zanim Future dostanie wynik.
+        return asyncio.run_coroutine_threadsafe(self._fetch_and_report(url, on_result, attempt), self._ensure_loop())
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-loop', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _fetch_and_report(self, url, on_result, attempt):
+        if self._global_sem is None:
+            self._global_sem = asyncio.Semaphore(self.concurrency)
+        host = urlparse(url).netloc
+        if host not in self._host_sems:
+            self._host_sems[host] = asyncio.Semaphore(self.per_host)
+        result = await self._fetch_one(url, host, self._global_sem, self._host_sems[host], attempt)
+        if on_result:
+            on_result(result)
+        return result
+
+    async def _fetch_one(self, url, host, global_sem, host_sem, attempt):
+        if self.cache:
+            entry = self.cache.lookup(url)
+            if entry and self.cache.is_fresh(entry):
+                text = self.cache.read_body(entry)
+                if text is not None:
+                    metrics.inc('fetch_responses', host=host, status='cache')
+                    self.archive_cached(entry, text, 'http-cache')
+                    return FetchResult(url, 200, text, not_modified=True)
+
+        limiter = self.limiter(host)
+        async with host_sem:
+            if not limiter.allow():
+                # Otwarty bezpiecznik albo trwa żądanie próbne: bez żądania, URL wraca do kolejki
+                result = FetchResult(url, error=HostUnavailable(f"{host}: wstrzymany po serii błędów"))
+                result.attempts = attempt
+                result.retry_at = limiter.retry_at(attempt)
+                metrics.inc('fetch_deferred', host=host)
+                return result
+            probe = limiter.probing
+            try:
+                await limiter.acquire(self.max_rate(host))
+                async with global_sem:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self._executor, self._request, url)
+            except asyncio.CancelledError:
+                if probe:
+                    limiter.abandon_probe()
+                raise
+        limiter.record(result, self.max_rate(host), probe)
+        result.attempts = attempt + 1
+        self.record_metrics(host, result)
+        if is_transient(result) and attempt < self.retries:
+            metrics.inc('fetch_retries', host=host)
+            result.retry_at = limiter.retry_at(attempt)
+            logger.info(f"Ponowię {url} za {result.retry_at - time.monotonic():.1f} s "
+                        f"({result.error or result.status}, próba {attempt + 1})")
+        return result
+
+    def record_metrics(self, host, result):
+        status = result.status if result.error is None else type(result.error).__name__
+        metrics.inc('fetch_responses', host=host, status=status)
+        metrics.observe('fetch_seconds', result.elapsed, host=host)
+        if result.size:
+            metrics.observe('fetch_bytes', result.size, BYTES_BUCKETS, host=host)
+
+    def limiter(self, host):
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(host, self.max_rate(host))
+        return self.limiters[host]
+
+    def max_rate(self, host):
+        # Pułap tempa: HOST_MIN_INTERVAL albo Crawl-delay z robots.txt, jeśli dłuższy; bez odstępu - LIMITER_MAX_RATE
+        interval = max(self.min_interval, self.host_delay(host)) if self.host_delay else self.min_interval
+        return min(1.0 / interval, LIMITER_MAX_RATE) if interval > 0 else LIMITER_MAX_RATE
+
+    def _request(self, url):
+        started = time.monotonic()
+        entry = self.cache.lookup(url) if self.cache else None
+        try:
+            headers = self.cache.conditional_headers(entry) if self.cache else {}
+            response = self.transport.get(url, headers=headers, stream=True)
+            if response.status_code == 304 and entry:
+                response.close()
+                text = self.cache.read_body(entry)
+                if text is not None:
+                    self.cache.revalidated(entry, response.headers)
+                    self.archive_cached(entry, text, 'revalidated-304')
+                    return FetchResult(url, 200, text, elapsed=time.monotonic() - started, not_modified=True)
+                response = self.transport.get(url, stream=True)
+            with response:
+                return self._read_response(url, response, started)
+        except requests.RequestException as e:
+            return FetchResult(url, error=e, elapsed=time.monotonic() - started)
+
+    def archive_cached(self, entry, text, source):
+        # Treść z cache też trafia do archiwum, żeby --reparse odtwarzał cały korpus, a nie tylko
+        # strony pobrane w całości w tym uruchomieniu; cache trzyma tekst, więc zapisujemy go w UTF-8
+        if not self.archive:
+            return
+        headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if entry.etag:
+            headers['ETag'] = entry.etag
+        if entry.last_modified:
+            headers['Last-Modified'] = entry.last_modified
+        self.archive.write_response(entry.url, 200, 'OK', headers, text.encode('utf-8'), 'utf-8', source)
+
+    def _read_response(self, url, response, started):
+        # Treść czytana porcjami: strony nie-HTML i zbyt duże przerywamy, zanim trafią do pamięci
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code == 200 and not is_html(content_type):
+            return FetchResult(url, 200, error=ContentRejected(f"nie HTML ({content_type})"),
+                               elapsed=time.monotonic() - started)
+        declared = response.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            return FetchResult(url, response.status_code, elapsed=time.monotonic() - started,
+                               error=ContentRejected(f"za duża odpowiedź ({int(declared)} B)"))
+        chunks, size = [], 0
+        for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                return FetchResult(url, response.status_code, elapsed=time.monotonic() - started,
+                                   error=ContentRejected(f"za duża odpowiedź (ponad {self.max_bytes} B)"))
+            chunks.append(chunk)
+        body = b''.join(chunks)
+
+        encoding = detect_encoding(content_type, body) if response.status_code == 200 else None
+        if self.archive:
+            self.archive.write_response(url, response.status_code, response.reason, response.headers,
+                                        body, encoding)
+        if response.status_code == 200:
+            text = body.decode(encoding, errors='replace')
+            if self.cache:
+                self.cache.store(url, text, response.headers)
+            return FetchResult(url, 200, text, elapsed=time.monotonic() - started, size=size)
+        return FetchResult(url, response.status_code, elapsed=time.monotonic() - started, size=size,
+                           retry_after=parse_retry_after(response.headers.get('Retry-After')))
+
+    async def _cancel_pending(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._cancel_pending(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._global_sem = None
+            self._host_sems = {}
+        self._executor.shutdown(wait=False)
+
+
+def log_fetch_failure(result):
+    if result.error is not None:
+        logger.error(f"Error fetching {result.url}: {result.error}")
+    else:
+        logger.warning(f"HTTP error {result.status} while fetching {result.url}")
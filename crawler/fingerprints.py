@@ -0,0 +1,83 @@
+# crawler/fingerprints.py
+
+import hashlib
+from collections import Counter
+from crawler.text_normalizer import collapse_whitespace
+from config import SIMHASH_DISTANCE, SIMHASH_MIN_WORDS, SIMHASH_SHINGLE
+
+BANDS = 4  # SimHash dzielony na 4 pasma po 16 bitów
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def exact_hash(words):
+    return hash64(' '.join(words).encode('utf-8'))
+
+
+def simhash(words, shingle=SIMHASH_SHINGLE):
+    # SimHash z n-gramów słów. Zamiast sumować wagi bit po bicie dla każdego n-gramu, sklejamy
+    # 8-bajtowe skróty w jeden bufor i dla każdej pozycji bajtu liczymy histogram wartości
+    # (Counter po bytes działa w C); bity zliczamy potem z 256 kubełków.
+    count = max(len(words) - shingle + 1, 1)
+    digests = b''.join(hashlib.blake2b(' '.join(words[i:i + shingle]).encode('utf-8'), digest_size=8).digest()
+                       for i in range(count))
+    value = 0
+    for byte in range(8):
+        histogram = Counter(digests[byte::8])
+        for bit in range(8):
+            ones = sum(n for byte_value, n in histogram.items() if byte_value >> bit & 1)
+            if ones * 2 > count:
+                value |= 1 << (byte * 8 + bit)
+    return value
+
+
+def bands(value):
+    return [(band, value >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS)]
+
+
+class Fingerprint:
+    def __init__(self, exact, near):
+        self.exact = exact
+        self.near = near  # None dla zbyt krótkich tekstów (SimHash byłby niewiarygodny)
+
+
+class FingerprintIndex:
+    # Odciski zapisanych tekstów: dokładny skrót (identyczny tekst po normalizacji białych znaków)
+    # i SimHash (prawie identyczny: różnica najwyżej SIMHASH_DISTANCE bitów). Przy odległości
+    # mniejszej niż liczba pasm co najmniej jedno 16-bitowe pasmo jest identyczne, więc kandydatów
+    # szukamy w słownikach pasm zamiast porównywać ze wszystkimi tekstami.
+    def __init__(self, distance=SIMHASH_DISTANCE, min_words=SIMHASH_MIN_WORDS):
+        self.distance = distance
+        self.min_words = min_words
+        self.exact = {}  # skrót -> klucz tekstu
+        self.bands = {}  # (pasmo, wartość) -> lista (simhash, klucz)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def compute(self, text):
+        words = collapse_whitespace(text).split(' ')
+        near = simhash(words) if len(words) >= self.min_words else None
+        return Fingerprint(exact_hash(words), near)
+
+    def find(self, fingerprint):
+        # Klucz wcześniej zapisanego duplikatu albo None
+        if fingerprint.exact in self.exact:
+            return self.exact[fingerprint.exact]
+        if fingerprint.near is None:
+            return None
+        for band in bands(fingerprint.near):
+            for value, key in self.bands.get(band, ()):
+                if bin(value ^ fingerprint.near).count('1') <= self.distance:
+                    return key
+        return None
+
+    def add(self, key, fingerprint):
+        self.exact.setdefault(fingerprint.exact, key)
+        if fingerprint.near is not None:
+            for band in bands(fingerprint.near):
+                self.bands.setdefault(band, []).append((fingerprint.near, key))
@@ -0,0 +1,164 @@
+# crawler/frontier.py
+
+import heapq
+import itertools
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from urllib.parse import urlparse
+from crawler.seen_set import create_seen_set
+from modules.logger import logger
+from config import FRONTIER_MEMORY_LIMIT
+
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10  # Np. linki dorzucone z pomijanej strony – idą przed resztą kolejki
+
+
+class Frontier:
+    # Kolejka URL-i do odwiedzenia: osobna kolejka priorytetowa dla każdego klucza (domyślnie host),
+    # klucze obsługiwane po kolei (round-robin). Po przekroczeniu FRONTIER_MEMORY_LIMIT nowe wpisy
+    # trafiają do pliku SQLite zamiast do pamięci. Wszystkie operacje są O(log n).
+    # URL do ponowienia (defer) czeka w osobnym kopcu do swojego czasu i dopiero wtedy wraca do kolejki.
+    def __init__(self, name='frontier', memory_limit=FRONTIER_MEMORY_LIMIT, spill_dir=None):
+        self.name = name
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.queues = {}  # klucz -> kopiec (-priorytet, seq, url)
+        self.active = deque()  # klucze z niepustą kolejką, w kolejności round-robin
+        self.disk_counts = {}  # klucz -> liczba wpisów na dysku
+        self.disk_heads = {}  # klucz -> najlepszy wpis na dysku (-priorytet, seq, url, rowid)
+        self.seen = create_seen_set()  # URL-e, które już kiedyś trafiły do kolejki
+        self.delayed = []  # Kopiec (czas gotowości, seq, url, priorytet, klucz) URL-i odłożonych do ponowienia
+        self.seq = itertools.count()
+        self.in_memory = 0
+        self.on_disk = 0
+        self.db = None
+        self.db_path = None
+
+    def __len__(self):
+        return self.in_memory + self.on_disk + len(self.delayed)
+
+    def __contains__(self, url):
+        return url in self.seen
+
+    def push(self, url, priority=PRIORITY_NORMAL, key=None):
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self._enqueue(url, priority, key)
+        return True
+
+    def defer(self, url, not_before, priority=PRIORITY_NORMAL, key=None):
+        # Ponowienie URL-a, który już przeszedł przez kolejkę (np. po 429 albo przy wstrzymanym hoście):
+        # wraca do kolejki o czasie not_before (time.monotonic()), mimo że jest już w seen
+        heapq.heappush(self.delayed, (not_before, next(self.seq), url, priority, key))
+
+    def ready_in(self):
+        # Sekundy do czasu najbliższego odłożonego URL-a (None - nic nie czeka)
+        if not self.delayed:
+            return None
+        return max(0.0, self.delayed[0][0] - time.monotonic())
+
+    def _release_due(self):
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, url, priority, key = heapq.heappop(self.delayed)
+            self._enqueue(url, priority, key)
+
+    def _enqueue(self, url, priority, key):
+        if key is None:
+            key = urlparse(url).netloc
+
+        if key not in self.queues:
+            self.queues[key] = []
+        if not self.queues[key] and not self.disk_counts.get(key):
+            self.active.append(key)
+
+        item = (-priority, next(self.seq), url)
+        if self.in_memory < self.memory_limit:
+            heapq.heappush(self.queues[key], item)
+            self.in_memory += 1
+        else:
+            self._spill(key, item)
+
+    def extend(self, urls, priority=PRIORITY_NORMAL, key=None):
+        return [url for url in urls if self.push(url, priority, key)]
+
+    def pop(self):
+        item = self.pop_with_key()
+        return item[0] if item else None
+
+    def pop_with_key(self):
+        # None, gdy kolejka jest pusta albo czekają w niej tylko URL-e odłożone na później
+        self._release_due()
+        while self.active:
+            key = self.active.popleft()
+            url = self._pop_from(key)
+            if url is None:
+                continue
+            if self.queues[key] or self.disk_counts.get(key):
+                self.active.append(key)
+            return url, key
+        return None
+
+    def _pop_from(self, key):
+        heap = self.queues.get(key)
+        disk_head = self._disk_head(key)
+        if heap and (disk_head is None or heap[0] < disk_head[:3]):
+            self.in_memory -= 1
+            return heapq.heappop(heap)[2]
+        if disk_head is None:
+            return None
+        self.db.execute("DELETE FROM queue WHERE rowid = ?", (disk_head[3],))
+        self.disk_heads.pop(key, None)
+        self.disk_counts[key] -= 1
+        self.on_disk -= 1
+        return disk_head[2]
+
+    def _spill(self, key, item):
+        if self.db is None:
+            self._open_spill()
+        cursor = self.db.execute("INSERT INTO queue (key, priority, seq, url) VALUES (?, ?, ?, ?)",
+                                 (key, item[0], item[1], item[2]))
+        self.disk_counts[key] = self.disk_counts.get(key, 0) + 1
+        self.on_disk += 1
+        head = self.disk_heads.get(key)
+        if head is not None and item < head[:3]:
+            self.disk_heads[key] = item + (cursor.lastrowid,)
+
+    def _disk_head(self, key):
+        if not self.disk_counts.get(key):
+            return None
+        head = self.disk_heads.get(key)
+        if head is None:
+            row = self.db.execute("SELECT priority, seq, url, rowid FROM queue WHERE key = ? "
+                                  "ORDER BY priority, seq LIMIT 1", (key,)).fetchone()
+            head = self.disk_heads[key] = tuple(row)
+        return head
+
+    def _open_spill(self):
+        # Nazwy kolejek mają postać 'gather:wolnelektury' - ':' nie przejdzie w nazwie pliku na Windows
+        prefix = re.sub(r'[^\w.-]', '_', self.name)
+        fd, self.db_path = tempfile.mkstemp(prefix=f'{prefix}-', suffix='.sqlite3', dir=self.spill_dir)
+        os.close(fd)
+        # Plik tymczasowy: bez dziennika i fsync, trwałość zapewnia dziennik crawla
+        self.db = sqlite3.connect(self.db_path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE queue (key TEXT NOT NULL, priority INTEGER NOT NULL, "
+                        "seq INTEGER NOT NULL, url TEXT NOT NULL)")
+        self.db.execute("CREATE INDEX queue_order ON queue (key, priority, seq)")
+        logger.info(f"Kolejka {self.name} przekroczyła {self.memory_limit} URL-i w pamięci, "
+                    f"nadmiar trafia do {self.db_path}.")
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            try:
+                os.remove(self.db_path)
+            except OSError:
+                pass
@@ -0,0 +1,178 @@
+# crawler/http_cache.py
+
+import gzip
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from modules.logger import logger
+from config import HTTP_CACHE_MAX_BYTES, HTTP_CACHE_FRESHNESS
+
+
+class CacheEntry:
+    def __init__(self, url, path, etag, last_modified, stored_at, size):
+        self.url = url
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.size = size
+
+
+class HttpCache:
+    # Dyskowy cache odpowiedzi: treść w plikach .gz, indeks (ETag, Last-Modified, LRU) w SQLite.
+    def __init__(self, cache_dir, max_bytes=HTTP_CACHE_MAX_BYTES, freshness=HTTP_CACHE_FRESHNESS):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.freshness = freshness
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), check_same_thread=False,
+                                  isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                parsed_key TEXT,
+                parsed BLOB
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, path, etag, last_modified, stored_at, size FROM entries WHERE url = ?",
+                (url,)).fetchone()
+            if row:
+                self.db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return CacheEntry(*row) if row else None
+
+    def max_age(self, url):
+        # Najdłuższy pasujący sufiks hosta wygrywa, np. 'wikipedia.org' pasuje do 'pl.wikipedia.org'
+        host = urlparse(url).hostname or ''
+        best, best_len = 0, -1
+        for suffix, seconds in self.freshness.items():
+            if (host == suffix or host.endswith('.' + suffix)) and len(suffix) > best_len:
+                best, best_len = seconds, len(suffix)
+        return best
+
+    def is_fresh(self, entry):
+        return time.time() - entry.stored_at < self.max_age(entry.url)
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def read_body(self, entry):
+        try:
+            with gzip.open(entry.path, 'rt', encoding='utf-8') as file:
+                return file.read()
+        except (OSError, EOFError) as e:
+            logger.warning(f"Uszkodzony wpis cache dla {entry.url}: {e}")
+            self.delete(entry.url)
+            return None
+
+    def store(self, url, text, headers):
+        if 'no-store' in headers.get('Cache-Control', ''):
+            return
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        path = os.path.join(self.bodies_dir, digest[:2], digest + '.gz')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        body = gzip.compress(text.encode('utf-8'), compresslevel=6)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(body)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self.lock:
+            old = self.db.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (url, path, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, path, headers.get('ETag'), headers.get('Last-Modified'), now, now, len(body)))
+            self.total_size += len(body) - (old[0] if old else 0)
+        if self.total_size > self.max_bytes:
+            self.evict()
+
+    def revalidated(self, entry, headers):
+        # Odpowiedź 304: treść bez zmian, odświeżamy tylko czas i walidatory
+        with self.lock:
+            self.db.execute(
+                "UPDATE entries SET stored_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), headers.get('ETag'), headers.get('Last-Modified'), entry.url))
+
+    def load_parsed(self, url, key):
+        with self.lock:
+            row = self.db.execute("SELECT parsed FROM entries WHERE url = ? AND parsed_key = ?",
+                                  (url, key)).fetchone()
+        if not row or row[0] is None:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Nie udało się odczytać zapisanego wyniku parsowania dla {url}: {e}")
+            return None
+
+    def store_parsed(self, url, key, result):
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.db.execute("UPDATE entries SET parsed_key = ?, parsed = ? WHERE url = ?", (key, blob, url))
+
+    def delete(self, url):
+        with self.lock:
+            row = self.db.execute("SELECT path, size FROM entries WHERE url = ?", (url,)).fetchone()
+            if not row:
+                return
+            self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self.total_size -= row[1]
+        self._remove_file(row[0])
+
+    def evict(self):
+        # LRU: usuwamy najdawniej używane wpisy, aż zejdziemy poniżej 90% limitu
+        target = self.max_bytes * 0.9
+        removed = 0
+        with self.lock:
+            while self.total_size > target:
+                rows = self.db.execute(
+                    "SELECT url, path, size FROM entries ORDER BY accessed_at LIMIT 100").fetchall()
+                if not rows:
+                    break
+                for url, path, size in rows:
+                    self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                    self.total_size -= size
+                    self._remove_file(path)
+                    removed += 1
+                    if self.total_size <= target:
+                        break
+        logger.debug(f"Usunięto {removed} wpisów z cache HTTP (rozmiar: {self.total_size} B).")
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def close(self):
+        with self.lock:
+            self.db.close()
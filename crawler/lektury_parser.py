@@ -2,34 +2,82 @@
 
 
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
 import logging
+from bs4 import CData, NavigableString, Tag
 from crawler.parser_base import ParserBase
+from crawler.document import ParsedDocument
+from crawler.link_scanner import scan_links
+from crawler.text_normalizer import collapse_whitespace, drop_dots_lines, split_sentences, strip_footnote_refs
 
 logger = logging.getLogger('WebCrawler')
 
+ONLINE_BUTTON = re.compile(r'l-button.*media.*full')
+
+# Reguły czyszczenia treści lektury (LekturyParser.remove_unwanted_elements)
+UNWANTED_PHRASES = ("Informacja o zmianach we", "Spis treści")  # Usuwamy p/div zaczynające się od nich
+EDITORIAL_FOOTNOTE = '[przypis edytorski]'
+# <div id="themes">, <div id="nota_red">, <div id="wltoc">, <div id="settings">, <div id="info">
+UNWANTED_IDS = {'themes', 'nota_red', 'wltoc', 'settings', 'info'}
+MAIN_STRING_TYPES = {NavigableString, CData}  # Rodzaje tekstu, które zwraca get_text()
+# Długość zapamiętanego początku i końca tekstu węzła: starcza na frazy i szukanie znacznika
+# przypisu na styku sąsiednich fragmentów
+TEXT_PROBE = max(max(map(len, UNWANTED_PHRASES)), len(EDITORIAL_FOOTNOTE) - 1)
+
+
+class _TextSummary:
+    # Skrót tekstu węzła (jak get_text(strip=True)): długość, początek, koniec
+    # i czy zawiera EDITORIAL_FOOTNOTE. Łączenie skrótów dzieci kosztuje O(TEXT_PROBE).
+    __slots__ = ('length', 'prefix', 'suffix', 'contains')
+
+    def __init__(self, length, prefix, suffix, contains):
+        self.length = length
+        self.prefix = prefix
+        self.suffix = suffix
+        self.contains = contains
+
+    @classmethod
+    def of(cls, text):
+        return cls(len(text), text[:TEXT_PROBE], text[-TEXT_PROBE:], EDITORIAL_FOOTNOTE in text)
+
+    @classmethod
+    def join(cls, parts):
+        if len(parts) == 1:
+            return parts[0]
+        length, prefix, suffix, contains = 0, '', '', False
+        for part in parts:
+            if not part.length:
+                continue
+            contains = contains or part.contains or EDITORIAL_FOOTNOTE in suffix + part.prefix
+            if len(prefix) < TEXT_PROBE:
+                prefix = (prefix + part.prefix)[:TEXT_PROBE]
+            suffix = (suffix + part.suffix)[-TEXT_PROBE:]
+            length += part.length
+        return cls(length, prefix, suffix, contains)
+
+
 class LekturyParser(ParserBase):
     def parse(self, content, base_url, is_start_url):
-        soup = BeautifulSoup(content, 'html.parser')
+        document = self.document(content, base_url)
+        soup = document.soup
 
         if is_start_url:
             logger.info(f"Identified as START_URL: {base_url}")
             # Najpierw próbujemy wyciągnąć linki /katalog/lektura/
-            katalog_links = self.extract_katalog_links(soup, base_url)
+            katalog_links = self.extract_katalog_links(document, base_url)
             if katalog_links:
                 return katalog_links, 'fallback_urls'
             else:
                 # Jeśli brak, próbujemy wyciągnąć ogólne linki katalogowe
-                all_katalog_links = self.extract_all_katalog_links(soup, base_url)
+                all_katalog_links = self.extract_all_katalog_links(document, base_url)
                 if all_katalog_links:
                     return all_katalog_links, 'fallback_urls'
                 else:
                     logger.warning(f"No related links found on START_URL: {base_url}")
                     return None, None
         else:
-            # Sprawdzamy czy mamy treść lektury (.html)
-            book_text_div = soup.find('div', id='book-text')
+            # Sprawdzamy czy mamy treść lektury (.html); strony katalogu nie mają drzewa (soup is None)
+            book_text_div = soup.find('div', id='book-text') if soup else None
             if book_text_div:
                 # Strona z treścią
                 logger.info(f"Identified as content page: {base_url}")
@@ -37,32 +85,54 @@ class LekturyParser(ParserBase):
                 return (text, metadata), 'text'
             else:
                 # Próba wyciągnięcia linków "czytaj online" (strony .html) ze stron /katalog/lektura/tytul/
-                online_links = self.extract_online_links(soup, base_url)
+                online_links = self.extract_online_links(document, base_url)
                 if online_links:
                     return online_links, 'fallback_urls'
 
                 # Próba wyciągnięcia linków katalogowych do /katalog/lektura/
-                katalog_links = self.extract_katalog_links(soup, base_url)
+                katalog_links = self.extract_katalog_links(document, base_url)
                 if katalog_links:
                     return katalog_links, 'fallback_urls'
 
                 # Ostatnia próba: ogólne linki katalogowe
-                all_katalog_links = self.extract_all_katalog_links(soup, base_url)
+                all_katalog_links = self.extract_all_katalog_links(document, base_url)
                 if all_katalog_links:
                     return all_katalog_links, 'fallback_urls'
 
                 logger.warning(f"No fallback links found for {base_url}")
                 return None, None
 
+    def document(self, content, base_url):
+        # Strony katalogu to same linki: zbiera je skaner strumieniowy, bez budowania drzewa.
+        # Pełne drzewo budujemy dopiero, gdy skaner natrafi na treść lektury (<div id="book-text">).
+        if isinstance(content, ParsedDocument):
+            return content
+        anchors, has_book_text = scan_links(content, stop_at=('div', 'book-text'))
+        if has_book_text:
+            return ParsedDocument(content, base_url)
+        return ParsedDocument.from_anchors(base_url, anchors)
+
+    def canonicalize_url(self, url):
+        # W katalogu: bez parametrów zapytania, ścieżki bez rozszerzenia zawsze z '/' na końcu
+        parts = urlsplit(super().canonicalize_url(url))
+        path, query = parts.path, parts.query
+        if path.startswith('/katalog/'):
+            query = ''
+            if not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+                path += '/'
+        return urlunsplit((parts.scheme, parts.netloc, path, query, ''))
+
     def extract_katalog_links(self, soup, base_url):
         related_links = []
+        base_url = self.canonicalize_url(base_url)
+        base_netloc = urlparse(base_url).netloc
         # Szukamy linków do /katalog/lektura/... bez .html
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
+        # Ten sam href powtarza się na stronie wielokrotnie; wynik i tak jest zbiorem
+        for href in dict.fromkeys(anchor.href for anchor in self.anchors(soup)):
             if '/katalog/lektura/' in href:
-                absolute_url = urljoin(base_url, href)
+                absolute_url = self.canonicalize_url(urljoin(base_url, href))
                 parsed_url = urlparse(absolute_url)
-                if parsed_url.netloc == urlparse(base_url).netloc:
+                if parsed_url.netloc == base_netloc:
                     if not parsed_url.path.endswith('.html'):
                         related_links.append(absolute_url)
         # Usuwamy duplikaty, jeśli wystąpią
@@ -72,12 +142,13 @@ class LekturyParser(ParserBase):
         # Zwracamy wszelkie linki zawierające '/katalog/' bez względu na .html
         # przyda się do głębszej eksploracji katalogu
         related_links = []
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
+        base_url = self.canonicalize_url(base_url)
+        base_netloc = urlparse(base_url).netloc
+        for href in dict.fromkeys(anchor.href for anchor in self.anchors(soup)):
             if '/katalog/' in href:
-                absolute_url = urljoin(base_url, href)
+                absolute_url = self.canonicalize_url(urljoin(base_url, href))
                 parsed_url = urlparse(absolute_url)
-                if parsed_url.netloc == urlparse(base_url).netloc:
+                if parsed_url.netloc == base_netloc:
                     if not parsed_url.path.endswith('.html'):
                         related_links.append(absolute_url)
         return list(set(related_links))
@@ -85,17 +156,26 @@ class LekturyParser(ParserBase):
     def extract_online_links(self, soup, base_url):
         # Ekstrahuje linki "czytaj online" do .html ze stron /katalog/lektura/tytul/
         online_links = []
-        for a_tag in soup.find_all('a', href=True, class_=re.compile(r'l-button.*media.*full')):
-            link_text = a_tag.get_text(strip=True).lower()
-            if 'czytaj online' in link_text or a_tag.find('i', class_='icon-eye'):
-                href = a_tag['href']
+        for anchor in self.anchors(soup):
+            if not self.is_online_button(anchor.classes):
+                continue
+            link_text = anchor.text.lower()
+            if 'czytaj online' in link_text or 'icon-eye' in anchor.icons:
+                href = anchor.href
                 absolute_url = urljoin(base_url, href)
                 parsed_url = urlparse(absolute_url)
                 if not parsed_url.path.endswith('.html'):
-                    absolute_url = absolute_url.rstrip('/') + '.html'
-                online_links.append(absolute_url)
+                    absolute_url = parsed_url._replace(path=parsed_url.path.rstrip('/') + '.html',
+                                                       query='', fragment='').geturl()
+                online_links.append(self.canonicalize_url(absolute_url))
         return list(set(online_links))
 
+    def is_online_button(self, classes):
+        # Jak class_=regex w BeautifulSoup: najpierw każda klasa osobno, potem cały atrybut
+        if any(ONLINE_BUTTON.search(cls) for cls in classes):
+            return True
+        return len(classes) > 1 and ONLINE_BUTTON.search(' '.join(classes)) is not None
+
     def extract_content(self, soup, base_url):
         book_text_div = soup.find('div', id='book-text')
         if not book_text_div:
@@ -110,44 +190,80 @@ class LekturyParser(ParserBase):
         return text.strip(), metadata
 
     def remove_unwanted_elements(self, book_text_div):
-        # Usuwamy elementy typu 'table_of_contents', 'editorial', footnotes, puste elementy
-        for toc in book_text_div.find_all(class_='table_of_contents'):
-            toc.decompose()
-
-        for editorial_note in book_text_div.find_all('div', class_='editorial'):
-            editorial_note.decompose()
-
-        unwanted_phrases = [
-            "Informacja o zmianach we",
-            "Spis treści",
-        ]
-        for p in book_text_div.find_all(['p', 'div']):
-            text = p.get_text(strip=True)
-            if any(text.startswith(phrase) for phrase in unwanted_phrases):
-                p.decompose()
-
-        for footnote in book_text_div.find_all('div', class_='footnotes'):
-            footnote.decompose()
-
-        for ed_footnote in book_text_div.find_all(['p', 'div']):
-            text = ed_footnote.get_text(strip=True)
-            if '[przypis edytorski]' in text:
-                ed_footnote.decompose()
-
-        for element in book_text_div.find_all():
-            if not element.get_text(strip=True):
-                element.decompose()
-
-        # Usuwamy elementy theme-begin
-        for theme_begin in book_text_div.find_all('a', class_='theme-begin'):
-            theme_begin.decompose()
-
-        # Usuwamy dodatkowe elementy, takie jak:
-        # <div id="themes">, <div id="nota_red">, <div id="wltoc">, <div id="settings">, <div id="info">
-        unwanted_ids = ['themes', 'nota_red', 'wltoc', 'settings', 'info']
-        for uid in unwanted_ids:
-            for div_to_remove in book_text_div.find_all('div', id=uid):
-                div_to_remove.decompose()
+        # Usuwamy elementy typu 'table_of_contents', 'editorial', footnotes, puste elementy,
+        # theme-begin i dodatkowe div-y (UNWANTED_IDS). Reguły tekstowe dawniej wołały
+        # get_text() dla każdego elementu osobno; teraz tekst każdego węzła liczymy raz, od liści
+        # w górę, jako skrót (_TextSummary) w trzech stanach drzewa - tak jak widziały go kolejne
+        # etapy: po etapach 1-2 (frazy), po 1-4 ('[przypis edytorski]') i po 1-5 (puste elementy).
+        records = {}  # id(węzeł) -> (etap usunięcia lub None, tekst po 1-2, po 1-4, rodzaje tekstu po 1-5)
+        removed = []  # (numer pierwszego i ostatniego węzła poddrzewa, węzeł) w kolejności post-order
+        order = 0
+        stack = [(book_text_div, None)]
+        while stack:
+            node, first = stack.pop()
+            if first is None:
+                stack.append((node, order))
+                order += 1
+                stack.extend((child, None) for child in node.contents if isinstance(child, Tag))
+                continue
+
+            text12, text1234, kinds = [], [], set()
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    stage, child12, child1234, child_kinds = records.pop(id(child))
+                    if stage is None or stage > 2:
+                        text12.append(child12)
+                    if stage is None or stage > 4:
+                        text1234.append(child1234)
+                    if stage is None or stage > 5:
+                        kinds |= child_kinds
+                elif isinstance(child, NavigableString):
+                    stripped = child.strip()
+                    if stripped:
+                        kinds.add(type(child))
+                        if type(child) in MAIN_STRING_TYPES:
+                            summary = _TextSummary.of(stripped)
+                            text12.append(summary)
+                            text1234.append(summary)
+            text12, text1234 = _TextSummary.join(text12), _TextSummary.join(text1234)
+
+            if node is book_text_div:
+                break
+            stage = self.removal_stage(node, text12, text1234, kinds)
+            if stage is not None:
+                removed.append((first, order - 1, node))
+            records[id(node)] = (stage, text12, text1234, kinds)
+
+        # Odwrócona kolejność post-order: przodek przed potomkami, a poddrzewo to ciągły zakres
+        # numerów - potomków usuniętych razem z przodkiem pomijamy
+        skip_first, skip_last = 0, -1
+        for first, last, node in reversed(removed):
+            if skip_first <= first <= skip_last:
+                continue
+            node.decompose()
+            skip_first, skip_last = first, last
+
+    def removal_stage(self, node, text12, text1234, kinds):
+        # Numer pierwszego etapu dawnej, wieloprzebiegowej implementacji, który usuwa węzeł
+        name = node.name
+        classes = node.get('class') or ()
+        if 'table_of_contents' in classes:
+            return 1
+        if name == 'div' and 'editorial' in classes:
+            return 2
+        if name in ('p', 'div') and text12.prefix.startswith(UNWANTED_PHRASES):
+            return 3
+        if name == 'div' and 'footnotes' in classes:
+            return 4
+        if name in ('p', 'div') and text1234.contains:
+            return 5
+        if kinds.isdisjoint(node.interesting_string_types or MAIN_STRING_TYPES):
+            return 6
+        if name == 'a' and 'theme-begin' in classes:
+            return 7
+        if name == 'div' and node.get('id') in UNWANTED_IDS:
+            return 8
+        return None
 
     def extract_metadata(self, soup, base_url):
         metadata = {}
@@ -181,7 +297,7 @@ class LekturyParser(ParserBase):
 
     def clean_text(self, text):
         # Usuwanie przypisów typu [1], [2], [123]
-        text = re.sub(r'\[\d+\]', '', text)
+        text = strip_footnote_refs(text)
 
         # Znajdź pierwsze wystąpienie <p class="paragraph" i przytnij tekst, by zaczynał się od niego
         start_index = text.find('<p class="paragraph"')
@@ -189,10 +305,7 @@ class LekturyParser(ParserBase):
             text = text[start_index:]
 
         # Usuwanie linii zawierających tylko kropki
-        text = re.sub(r'^[.]+\s*$', '', text, flags=re.MULTILINE)
+        text = drop_dots_lines(text)
 
         # Usuwanie nadmiarowych spacji i formatowanie zdań
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = text.replace('. ', '.\n')
-
-        return text
+        return split_sentences(collapse_whitespace(text))
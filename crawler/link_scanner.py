@@ -0,0 +1,86 @@
+# crawler/link_scanner.py
+
+from html.parser import HTMLParser
+from bs4.builder import HTMLTreeBuilder
+from crawler.document import Anchor
+
+VOID_TAGS = HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS  # Te same elementy bez zamknięcia co w BeautifulSoup
+RAW_TEXT_TAGS = {'script', 'style'}  # Ich zawartość nie wchodzi do get_text()
+
+
+class _StopScan(Exception):
+    pass
+
+
+class LinkScanner(HTMLParser):
+    # Zbiera linki <a href> z tokenizera HTML bez budowania drzewa. Zamykanie znaczników
+    # odwzorowuje BeautifulSoup ('html.parser'), więc tekst i ikony linków są takie same
+    # jak w anchor_table(). Skanowanie kończy się na elemencie stop_at = (tag, id).
+    def __init__(self, stop_at=None):
+        super().__init__(convert_charrefs=True)
+        self.stop_at = stop_at
+        self.stopped = False
+        self.anchors = []
+        self.stack = []  # Otwarte znaczniki
+        self.open_anchors = []  # Otwarte linki: (pozycja na stosie, indeks w anchors, href, klasy, tekst, ikony)
+        self.raw_text = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.stop_at and tag == self.stop_at[0] and attrs.get('id') == self.stop_at[1]:
+            self.stopped = True
+            raise _StopScan()
+
+        classes = tuple((attrs.get('class') or '').split())
+        if tag == 'i' and classes:
+            for anchor in self.open_anchors:
+                anchor[5].extend(classes)
+        if tag in VOID_TAGS:
+            return
+
+        if tag == 'a' and 'href' in attrs:
+            # Miejsce w wyniku rezerwujemy przy otwarciu, aby zachować kolejność dokumentu
+            self.open_anchors.append((len(self.stack), len(self.anchors), attrs['href'] or '', classes, [], []))
+            self.anchors.append(None)
+        if tag in RAW_TEXT_TAGS:
+            self.raw_text += 1
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        # Jak w BeautifulSoup: zamykamy do ostatniego otwartego znacznika o tej nazwie,
+        # zamknięcie bez pasującego otwarcia jest ignorowane
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth] == tag:
+                self._close_to(depth)
+                return
+
+    def _close_to(self, depth):
+        for name in self.stack[depth:]:
+            if name in RAW_TEXT_TAGS:
+                self.raw_text -= 1
+        del self.stack[depth:]
+        while self.open_anchors and self.open_anchors[-1][0] >= depth:
+            _, index, href, classes, text, icons = self.open_anchors.pop()
+            self.anchors[index] = Anchor(href, classes, ''.join(text), tuple(icons))
+
+    def handle_data(self, data):
+        if self.open_anchors and not self.raw_text:
+            data = data.strip()
+            if data:
+                for anchor in self.open_anchors:
+                    anchor[4].append(data)
+
+    def close(self):
+        super().close()
+        self._close_to(0)
+
+
+def scan_links(content, stop_at=None):
+    # Zwraca (linki w kolejności dokumentu, czy znaleziono element stop_at)
+    scanner = LinkScanner(stop_at)
+    try:
+        scanner.feed(content)
+        scanner.close()
+    except _StopScan:
+        scanner._close_to(0)
+    return scanner.anchors, scanner.stopped
@@ -0,0 +1,142 @@
+# crawler/manifest.py
+
+import sqlite3
+import time
+from modules.logger import logger
+from config import MANIFEST_BATCH_SIZE
+
+
+def to_signed(value):
+    # SQLite przechowuje INTEGER jako 64 bity ze znakiem
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    if value is None:
+        return None
+    return value + (1 << 64) if value < 0 else value
+
+
+class Manifest:
+    # Rejestr zapisanych tekstów i zebranych linków w SQLite. Statystyki i sprawdzanie duplikatów
+    # to zapytania po kluczu głównym, więc przy starcie niczego nie wczytujemy do pamięci.
+    # Zmiany idą w transakcjach zatwierdzanych co MANIFEST_BATCH_SIZE wpisów (i przy flush()).
+    # Zapytania na tym samym połączeniu widzą też wpisy jeszcze niezatwierdzone.
+    def __init__(self, path, batch_size=MANIFEST_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = 0
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.created = not self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'texts'").fetchone()
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS texts (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                saved_at REAL NOT NULL
+            )""")
+        # status: 'collected' (zebrany link) lub 'saved' (tekst zapisany); extracted - link jest w extracted_links.txt
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                extracted INTEGER NOT NULL DEFAULT 0,
+                added_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS links_status ON links (status)")
+        # Odciski treści zapisanych tekstów (crawler/fingerprints.py); near = NULL dla krótkich tekstów
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                key TEXT PRIMARY KEY,
+                exact INTEGER NOT NULL,
+                near INTEGER
+            )""")
+
+    def _begin(self, count=1):
+        if not self.db.in_transaction:
+            self.db.execute("BEGIN")
+        self.pending += count
+
+    def _maybe_commit(self):
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.db.in_transaction:
+            self.db.execute("COMMIT")
+        self.pending = 0
+
+    def has_text(self, key):
+        return self.db.execute("SELECT 1 FROM texts WHERE key = ?", (key,)).fetchone() is not None
+
+    def add_text(self, key, url, fingerprint=None):
+        now = time.time()
+        self._begin()
+        self.db.execute("INSERT OR REPLACE INTO texts VALUES (?, ?, ?)", (key, url, now))
+        if fingerprint is not None:
+            self.db.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                            (key, to_signed(fingerprint.exact), to_signed(fingerprint.near)))
+        if url:
+            self.db.execute("""
+                INSERT INTO links (url, status, added_at) VALUES (?, 'saved', ?)
+                ON CONFLICT (url) DO UPDATE SET status = 'saved'""", (url, now))
+        self._maybe_commit()
+
+    def add_extracted_links(self, links):
+        # Zwraca linki, których jeszcze nie było w extracted_links.txt (w kolejności wejścia)
+        new_links = []
+        now = time.time()
+        self._begin(len(links))
+        for link in dict.fromkeys(links):
+            row = self.db.execute("SELECT extracted FROM links WHERE url = ?", (link,)).fetchone()
+            if row is None:
+                self.db.execute("INSERT INTO links VALUES (?, 'collected', 1, ?)", (link, now))
+            elif not row[0]:
+                self.db.execute("UPDATE links SET extracted = 1 WHERE url = ?", (link,))
+            else:
+                continue
+            new_links.append(link)
+        self._maybe_commit()
+        return new_links
+
+    def add_collected_links(self, links):
+        self._begin(len(links))
+        self.db.executemany("INSERT OR IGNORE INTO links (url, status, added_at) VALUES (?, 'collected', ?)",
+                            [(link, time.time()) for link in links])
+        self._maybe_commit()
+
+    def fingerprints(self):
+        for key, exact, near in self.db.execute("SELECT key, exact, near FROM fingerprints"):
+            yield key, to_unsigned(exact), to_unsigned(near)
+
+    def texts_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+
+    def links_count(self, status=None):
+        if status is None:
+            return self.db.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM links WHERE status = ?", (status,)).fetchone()[0]
+
+    def import_existing(self, text_keys, extracted_links, fingerprints=()):
+        # Jednorazowo przy tworzeniu manifestu: teksty i linki zapisane przed jego wprowadzeniem
+        # oraz odciski tych tekstów - pary (klucz, Fingerprint)
+        text_keys, extracted_links = list(text_keys), list(extracted_links)
+        fingerprints = [(key, to_signed(fingerprint.exact), to_signed(fingerprint.near))
+                        for key, fingerprint in fingerprints]
+        now = time.time()
+        self._begin(len(text_keys) + len(extracted_links) + len(fingerprints))
+        self.db.executemany("INSERT OR IGNORE INTO texts VALUES (?, NULL, ?)", [(key, now) for key in text_keys])
+        self.db.executemany("INSERT OR IGNORE INTO links VALUES (?, 'collected', 1, ?)",
+                            [(link, now) for link in extracted_links])
+        self.db.executemany("INSERT OR IGNORE INTO fingerprints VALUES (?, ?, ?)", fingerprints)
+        self.flush()
+        logger.info(f"Utworzono manifest {self.path}: {len(text_keys)} tekstów "
+                    f"({len(fingerprints)} z odciskiem treści), {len(extracted_links)} linków.")
+
+    def close(self):
+        self.flush()
+        self.db.close()
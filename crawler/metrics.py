@@ -0,0 +1,270 @@
+# crawler/metrics.py
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules.logger import logger
+from config import METRICS_FLUSH_INTERVAL, METRICS_PORT, METRICS_HISTORY
+
+PREFIX = 'crawler_'
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Ostatni kubełek: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    # Rejestr metryk procesu: liczniki, wartości chwilowe (gauge) i histogramy z etykietami.
+    # Aktualizacje przychodzą z wątku głównego, pętli asyncio i wątków pobierania, stąd blokada.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}  # nazwa -> {etykiety -> wartość}
+        self.gauges = {}
+        self.histograms = {}  # nazwa -> {etykiety -> _Histogram}
+        self.history = deque(maxlen=METRICS_HISTORY)  # Próbki wartości chwilowych w czasie
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def value(self, name, **labels):
+        with self.lock:
+            return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def merge(self, snapshot):
+        # Dolicza liczniki i histogramy z innego procesu (wynik to_json()), np. od workerów
+        with self.lock:
+            for name, entries in snapshot['counters'].items():
+                series = self.counters.setdefault(name, {})
+                for entry in entries:
+                    key = _label_key(entry['labels'])
+                    series[key] = series.get(key, 0) + entry['value']
+            for name, entries in snapshot['histograms'].items():
+                series = self.histograms.setdefault(name, {})
+                for entry in entries:
+                    key = _label_key(entry['labels'])
+                    if key not in series:
+                        series[key] = _Histogram(tuple(float(bound) for bound in entry['buckets'] if bound != '+Inf'))
+                    hist = series[key]
+                    previous = 0
+                    for i, cumulative in enumerate(entry['buckets'].values()):
+                        hist.counts[i] += cumulative - previous
+                        previous = cumulative
+                    hist.sum += entry['sum']
+                    hist.count += entry['count']
+
+    def total(self, name):
+        # Suma licznika po wszystkich etykietach
+        with self.lock:
+            return sum(self.counters.get(name, {}).values())
+
+    def quantile(self, name, q):
+        # Szacowany kwantyl histogramu (wszystkie etykiety razem) z interpolacją liniową
+        # wewnątrz kubełka, jak histogram_quantile w Prometheusie
+        with self.lock:
+            series = list(self.histograms.get(name, {}).values())
+            if not series or not sum(hist.count for hist in series):
+                return None
+            buckets = series[0].buckets
+            counts = [sum(hist.counts[i] for hist in series) for i in range(len(buckets) + 1)]
+        rank = q * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if i == len(buckets):
+                    return buckets[-1]  # Powyżej ostatniego kubełka znamy tylko dolną granicę
+                lower = buckets[i - 1] if i else 0.0
+                return lower + (buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return buckets[-1]
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = _Histogram(buckets)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def sample(self):
+        # Zapamiętuje bieżące wartości chwilowe (np. rozmiar kolejek) jako punkt szeregu czasowego
+        with self.lock:
+            point = {'t': round(time.time() - self.started, 1)}
+            for name, series in self.gauges.items():
+                for key, value in series.items():
+                    point[name + _format_labels(key)] = value
+            self.history.append(point)
+
+    def to_json(self):
+        with self.lock:
+            histograms = {}
+            for name, series in self.histograms.items():
+                histograms[name] = [{
+                    'labels': dict(key),
+                    'count': hist.count,
+                    'sum': round(hist.sum, 6),
+                    'mean': round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                    'buckets': {str(bound): count for bound, count in hist.cumulative()},
+                } for key, hist in series.items()]
+            return {
+                'generated_at': time.time(),
+                'uptime': round(time.time() - self.started, 3),
+                'counters': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                             for name, series in self.counters.items()},
+                'gauges': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                           for name, series in self.gauges.items()},
+                'histograms': histograms,
+                'history': list(self.history),
+            }
+
+    def to_openmetrics(self):
+        lines = []
+        with self.lock:
+            for kind, registry in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, series in sorted(registry.items()):
+                    full = PREFIX + name
+                    lines.append(f'# TYPE {full} {kind}')
+                    suffix = '_total' if kind == 'counter' else ''
+                    for key, value in series.items():
+                        lines.append(f'{full}{suffix}{_format_labels(key)} {value}')
+            for name, series in sorted(self.histograms.items()):
+                full = PREFIX + name
+                lines.append(f'# TYPE {full} histogram')
+                for key, hist in series.items():
+                    for bound, count in hist.cumulative():
+                        lines.append(f'{full}_bucket{_format_labels(key, [("le", bound)])} {count}')
+                    lines.append(f'{full}_sum{_format_labels(key)} {hist.sum}')
+                    lines.append(f'{full}_count{_format_labels(key)} {hist.count}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class MetricsExporter:
+    # Co METRICS_FLUSH_INTERVAL sekund zapisuje metryki do data/metrics.json i data/metrics.prom
+    # (zapis przez plik tymczasowy, więc czytelnik nigdy nie widzi połowy pliku). Opcjonalnie
+    # wystawia je pod http://127.0.0.1:METRICS_PORT/metrics (OpenMetrics) i /metrics.json.
+    def __init__(self, data_dir, registry=metrics, interval=METRICS_FLUSH_INTERVAL, port=METRICS_PORT):
+        self.registry = registry
+        self.json_path = os.path.join(data_dir, 'metrics.json')
+        self.text_path = os.path.join(data_dir, 'metrics.prom')
+        self.interval = interval
+        self.port = port
+        self.stopped = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='metrics', daemon=True)
+        self.thread.start()
+        if self.port:
+            self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self._handler())
+            threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+            logger.info(f"Metryki dostępne pod http://127.0.0.1:{self.port}/metrics")
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry.to_openmetrics().encode('utf-8')
+                    content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(registry.to_json(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        self.registry.sample()
+        try:
+            self._write(self.json_path, json.dumps(self.registry.to_json(), ensure_ascii=False, indent=1))
+            self._write(self.text_path, self.registry.to_openmetrics())
+        except IOError as e:
+            logger.error(f"Błąd podczas zapisu metryk: {e}")
+
+    def _write(self, path, text):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.flush()
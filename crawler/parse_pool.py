@@ -0,0 +1,54 @@
+# crawler/parse_pool.py
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from modules.logger import logger
+from config import PARSE_WORKERS
+
+_parsers = {}  # Parsery w procesie roboczym: id parsera w procesie głównym -> kopia parsera
+
+
+def _init_worker(parsers):
+    _parsers.update(parsers)
+
+
+def _parse(parser_id, content, url, is_start_url):
+    parser = _parsers[parser_id]
+    started = time.perf_counter()
+    document = parser.document(content, url)
+    parse_result = parser.parse(document, url, is_start_url=is_start_url)
+    return parse_result, document.anchors, time.perf_counter() - started
+
+
+class ParsePool:
+    # Pula procesów parsujących: strona trafia do parsowania zaraz po pobraniu, a pętla pobierania
+    # w tym czasie pobiera kolejne strony. W toku jest co najwyżej okno CONCURRENCY stron, więc pamięć
+    # rośnie najwyżej o tyle HTML-i. Parsery są kopiowane do procesów raz, przy starcie puli.
+    def __init__(self, parsers, workers=PARSE_WORKERS):
+        self.parsers = parsers  # Słownik parserów crawlera; nowe wpisy też trafiają do puli
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.started_with = set()
+
+    def _start(self):
+        unique = {id(parser): parser for parser in self.parsers.values()}
+        # spawn zamiast fork: proces główny ma już działające wątki pobierania
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker, initargs=(unique,))
+        self.started_with = set(unique)
+        logger.info(f"Uruchomiono {self.workers} procesów parsujących.")
+
+    def submit(self, parser, content, url, is_start_url):
+        # Future z wynikiem (parse_result, linki dokumentu, czas parsowania w s)
+        if self.executor is None or id(parser) not in self.started_with:
+            self.close()
+            self._start()
+        return self.executor.submit(_parse, id(parser), content, url, is_start_url)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
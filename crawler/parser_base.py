@@ -1,25 +1,46 @@
 # crawler/parser_base.py
 
-import requests
-from urllib.parse import urlparse
-from modules.logger import logger
+from crawler.canonical import canonicalize_url
+from crawler.document import ParsedDocument, scoped_anchors
+from crawler.fetcher import AsyncFetcher, log_fetch_failure
+from crawler.transport import HttpTransport
 
 class ParserBase:
-    def __init__(self, user_agent):
+    cache_version = 3  # Zwiększ po zmianie wyniku parse(), aby unieważnić zapisane wyniki w cache HTTP
+    link_scope = None  # id elementu, z którego parser zbiera linki (None = cały dokument)
+
+    def __init__(self, user_agent, fetcher=None):
         self.headers = {'User-Agent': user_agent}
+        self.fetcher = fetcher or AsyncFetcher(HttpTransport(user_agent))
+
+    def __getstate__(self):
+        # Kopia dla procesów parsujących: bez fetchera (sesja HTTP i wątki nie przechodzą przez pickle)
+        state = self.__dict__.copy()
+        state['fetcher'] = None
+        return state
 
     def fetch(self, url):
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                response.encoding = response.apparent_encoding
-                return response.text
-            else:
-                logger.warning(f"HTTP error {response.status_code} while fetching {url}")
-                return None
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {url}: {e}")
-            return None
+        result = self.fetcher.fetch(url)
+        if result.ok:
+            return result.text
+        log_fetch_failure(result)
+        return None
+
+    def canonicalize_url(self, url):
+        # Klasy potomne dokładają reguły specyficzne dla serwisu
+        return canonicalize_url(url)
+
+    def document(self, content, base_url):
+        # parse() przyjmuje surowy HTML albo gotowy ParsedDocument
+        if isinstance(content, ParsedDocument):
+            return content
+        return ParsedDocument(content, base_url, self.link_scope)
+
+    def anchors(self, source):
+        # Tablica linków z ParsedDocument; dla zwykłego drzewa – jedno przejście po link_scope
+        if isinstance(source, ParsedDocument):
+            return source.anchors
+        return scoped_anchors(source, self.link_scope)
 
     def parse(self, content, base_url, is_start_url):
         raise NotImplementedError("Metoda parse musi być zaimplementowana przez klasę potomną.")
@@ -0,0 +1,222 @@
+# crawler/profiler.py
+
+import cProfile
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from crawler.metrics import metrics
+from modules.logger import logger
+from config import PROFILE_TOP_N, PROFILE_MIN_SECONDS
+
+OWN_TRACES = (tracemalloc.Filter(False, tracemalloc.__file__),)  # Bez alokacji samego tracemalloc
+
+
+def profile_stats(profile):
+    # {funkcja: (wywołania pierwotne, wywołania, czas własny, czas łączny, wywołujący)}; także dla pustego profilu
+    profile.create_stats()
+    return profile.stats
+
+
+def frame_label(func):
+    # (plik, linia, nazwa) -> etykieta ramki; ';' rozdziela ramki w formacie collapsed
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ',')  # Funkcje wbudowane, np. <method 'poll' of 'select.epoll' objects>
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ',')
+
+
+def collapsed_stacks(stats, prefix=(), min_seconds=PROFILE_MIN_SECONDS):
+    # cProfile zna tylko krawędzie wywołujący -> wywoływany, więc stosy odtwarzamy, dzieląc czas
+    # funkcji między wywołujących proporcjonalnie do czasu z danej krawędzi (jak flameprof).
+    # Wynik: {'ramka;ramka;...': mikrosekundy} - format collapsed dla flamegraph.pl/speedscope.
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    stacks = {}
+
+    def walk(func, stack, share):
+        _, _, own, total, _ = stats[func]
+        stack = stack + (frame_label(func),)
+        if own * share >= min_seconds:
+            key = ';'.join(stack)
+            stacks[key] = stacks.get(key, 0) + int(own * share * 1e6)
+        for child, edge_total in children.get(func, ()):
+            child_total = stats[child][3]
+            child_share = share * edge_total / child_total if child_total else 0.0
+            # Rekurencję ucinamy na pierwszym powtórzeniu funkcji w stosie
+            if child_total * child_share >= min_seconds and frame_label(child) not in stack:
+                walk(child, stack, child_share)
+
+    for func, (_, _, _, total, callers) in stats.items():
+        # Korzeniem jest też część czasu bez wywołującego: po ponownym włączeniu profilu (po parserze)
+        # cProfile nie zna ramek, które były już na stosie, np. wznawianego generatora fetch_and_parse
+        attributed = sum(edge[3] for caller, edge in callers.items() if caller in stats)
+        if total and total - attributed >= min_seconds:
+            walk(func, tuple(prefix), (total - attributed) / total)
+    return stacks
+
+
+def hot_functions(stats, limit):
+    # Najdroższe funkcje według czasu własnego: (etykieta, wywołania, czas własny, czas łączny)
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [(frame_label(func), entry[1], entry[2], entry[3]) for func, entry in rows]
+
+
+class PhaseProfile:
+    def __init__(self, name):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = 0
+        self.allocations = []  # tracemalloc.StatisticDiff względem początku fazy
+
+
+class ParserProfile:
+    def __init__(self, phase, label):
+        self.phase = phase
+        self.label = label  # np. 'LekturyParser.parse'
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self.wall = 0.0
+        self.peak_memory = 0  # Największy szczyt tracemalloc ponad stan sprzed wywołania
+        self.retained_memory = 0  # Suma pamięci zaalokowanej w wywołaniach i niezwolnionej po nich
+
+
+class Profiler:
+    # Tryb --profile: cProfile i tracemalloc dla każdej fazy crawla i osobny cProfile dla wywołań
+    # parserów (na czas parsowania profil fazy jest wyłączany, żeby czas nie liczył się podwójnie)
+    # wraz ze szczytem pamięci tracemalloc każdego wywołania.
+    # Profilowany jest tylko wątek główny: czekanie na sieć widać jako czas w pętli asyncio.
+    # Bez --profile crawler nie tworzy Profilera, więc pomiary nic nie kosztują.
+    def __init__(self, out_dir, top_n=PROFILE_TOP_N):
+        self.out_dir = out_dir
+        self.top_n = top_n
+        self.phases = []
+        self.parsers = {}  # (faza, etykieta) -> ParserProfile
+        self.current = None
+
+    @contextmanager
+    def phase(self, name):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot().filter_traces(OWN_TRACES)
+        profile = PhaseProfile(name)
+        self.current = profile
+        wall, cpu = time.perf_counter(), time.process_time()
+        profile.profile.enable()
+        try:
+            yield
+        finally:
+            profile.profile.disable()
+            profile.wall = time.perf_counter() - wall
+            profile.cpu = time.process_time() - cpu
+            profile.peak_memory = max(profile.peak_memory, tracemalloc.get_traced_memory()[1])
+            after = tracemalloc.take_snapshot().filter_traces(OWN_TRACES)
+            profile.allocations = after.compare_to(before, 'lineno')[:self.top_n]
+            self.phases.append(profile)
+            self.current = None
+
+    @contextmanager
+    def parser_call(self, parser, method):
+        phase = self.current
+        key = (phase.name if phase else '-', f"{type(parser).__name__}.{method}")
+        if key not in self.parsers:
+            self.parsers[key] = ParserProfile(*key)
+        profile = self.parsers[key]
+        if phase:
+            phase.profile.disable()
+        # Szczyt mierzymy osobno dla wywołania; szczyt fazy sprzed wywołania zachowujemy w profilu fazy
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            memory, peak = tracemalloc.get_traced_memory()
+            if phase:
+                phase.peak_memory = max(phase.peak_memory, peak)
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        profile.profile.enable()
+        try:
+            yield
+        finally:
+            profile.profile.disable()
+            profile.wall += time.perf_counter() - started
+            profile.calls += 1
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                profile.peak_memory = max(profile.peak_memory, peak - memory)
+                profile.retained_memory += current - memory
+            if phase:
+                phase.profile.enable()
+
+    def write_reports(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        all_stacks = {}
+        for phase in self.phases:
+            stats = profile_stats(phase.profile)
+            stacks = collapsed_stacks(stats, (phase.name,))
+            self._write_collapsed(self._path(phase.name, '.collapsed'), stacks)
+            phase.profile.dump_stats(self._path(phase.name, '.pstats'))
+            all_stacks.update(stacks)
+        for profile in self.parsers.values():
+            stats = profile_stats(profile.profile)
+            # W połączonym pliku parsowanie jest gałęzią swojej fazy
+            stacks = collapsed_stacks(stats, (profile.phase, profile.label))
+            self._write_collapsed(self._path(f"{profile.phase}-{profile.label}", '.collapsed'), stacks)
+            for key, value in stacks.items():
+                all_stacks[key] = all_stacks.get(key, 0) + value
+        self._write_collapsed(os.path.join(self.out_dir, 'all.collapsed'), all_stacks)
+
+        summary = self.summary()
+        with open(os.path.join(self.out_dir, 'summary.txt'), 'w', encoding='utf-8') as file:
+            file.write(summary)
+        logger.info(f"Raport profilowania zapisano w {self.out_dir}:\n{summary}")
+
+    def summary(self):
+        lines = ['Fazy:', f"{'faza':<28}{'czas [s]':>10}{'CPU [s]':>10}{'strony':>8}{'strony/s':>10}"
+                          f"{'szczyt pamięci [MB]':>22}"]
+        for phase in self.phases:
+            pages = metrics.value('phase_pages', phase=phase.name)
+            lines.append(f"{phase.name:<28}{phase.wall:>10.2f}{phase.cpu:>10.2f}{pages:>8}"
+                         f"{pages / phase.wall if phase.wall else 0:>10.2f}{phase.peak_memory / 2 ** 20:>22.1f}")
+
+        lines += ['', 'Parsery:', f"{'faza':<28}{'wywołanie':<28}{'liczba':>8}{'czas [s]':>10}{'śr. [ms]':>10}"
+                              f"{'szczyt [KiB]':>14}{'przyrost [KiB]':>16}"]
+        for profile in self.parsers.values():
+            lines.append(f"{profile.phase:<28}{profile.label:<28}{profile.calls:>8}{profile.wall:>10.2f}"
+                         f"{profile.wall / profile.calls * 1000 if profile.calls else 0:>10.2f}"
+                         f"{profile.peak_memory / 1024:>14.1f}{profile.retained_memory / 1024:>16.1f}")
+
+        for phase in self.phases:
+            lines += ['', f"Najdroższe funkcje (czas własny) - {phase.name}:"]
+            lines += self._hot_lines(profile_stats(phase.profile))
+            lines += ['', f"Alokacje pamięci (przyrost w fazie) - {phase.name}:"]
+            for diff in phase.allocations:
+                frame = diff.traceback[0]
+                lines.append(f"  {diff.size_diff / 1024:>10.1f} KiB {diff.count_diff:>8} bloków  "
+                             f"{frame.filename}:{frame.lineno}")
+        for profile in self.parsers.values():
+            lines += ['', f"Najdroższe funkcje (czas własny) - {profile.phase} / {profile.label}:"]
+            lines += self._hot_lines(profile_stats(profile.profile))
+            lines.append(f"  Pamięć: szczyt wywołania {profile.peak_memory / 1024:.1f} KiB, "
+                         f"niezwolnione po {profile.calls} wywołaniach {profile.retained_memory / 1024:.1f} KiB")
+        return '\n'.join(lines) + '\n'
+
+    def _hot_lines(self, stats):
+        return [f"  {own:>9.3f} s {total:>9.3f} s {calls:>9}  {label}"
+                for label, calls, own, total in hot_functions(stats, self.top_n)]
+
+    def _path(self, name, suffix):
+        return os.path.join(self.out_dir, name.replace(':', '-') + suffix)
+
+    def _write_collapsed(self, path, stacks):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, micros in sorted(stacks.items()):
+                if micros:
+                    file.write(f"{stack} {micros}\n")
+
+    def close(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,126 @@
+# crawler/rate_limiter.py
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from modules.logger import logger
+from config import (LIMITER_MIN_RATE, LIMITER_MAX_RATE, LIMITER_INCREASE, LIMITER_DECREASE, LIMITER_DECREASE_INTERVAL,
+                    LIMITER_SLOW_RESPONSE, RETRY_BASE_DELAY, RETRY_MAX_DELAY, BREAKER_FAILURES, BREAKER_COOLDOWN)
+import requests
+
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}  # Błędy, po których warto spróbować ponownie
+OVERLOAD_STATUSES = {429, 503}  # Serwer wprost prosi o zwolnienie
+
+
+def parse_retry_after(value):
+    # Retry-After: liczba sekund albo data HTTP; None, gdy nagłówka nie da się odczytać
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(result):
+    if result.error is not None:
+        return isinstance(result.error, (requests.Timeout, requests.ConnectionError))
+    return result.status in TRANSIENT_STATUSES
+
+
+class HostLimiter:
+    # Limiter jednego hosta: kubełek tokenów (pojemność 1, więc równe odstępy między startami żądań),
+    # którego tempo dostosowuje AIMD - rośnie o LIMITER_INCREASE pułapu po każdej szybkiej udanej
+    # odpowiedzi i spada LIMITER_DECREASE razy po 429/503, timeoucie lub wolnej odpowiedzi, ale
+    # najwyżej raz na LIMITER_DECREASE_INTERVAL: pojedyncze błędy przejściowe nie zbijają tempa do
+    # minimum, a stałe przeciążenie i tak szybko je obniża.
+    # Retry-After wstrzymuje cały host, a seria błędów otwiera bezpiecznik (circuit breaker).
+    def __init__(self, host, max_rate):
+        self.host = host
+        self.rate = min(max_rate, LIMITER_MAX_RATE)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = None  # Chwila ostatniego zwolnienia
+        self.failures = 0  # Kolejne błędy przejściowe
+        self.open_until = 0.0  # 0 - bezpiecznik zamknięty
+        self.probing = False  # W toku jest żądanie próbne (half-open)
+        self.cooldown = BREAKER_COOLDOWN
+
+    def allow(self):
+        # Zamknięty bezpiecznik przepuszcza wszystko, otwarty - nic do końca przerwy. Potem (half-open)
+        # przepuszczamy dokładnie jedno żądanie próbne; jego wynik zamyka bezpiecznik albo otwiera
+        # go na dłużej, a do tego czasu pozostałe żądania są wstrzymane. Po True wartość probing
+        # mówi, czy to żądanie jest próbne.
+        if not self.open_until:
+            return True
+        if self.probing or time.monotonic() < self.open_until:
+            return False
+        self.probing = True
+        return True
+
+    def abandon_probe(self):
+        # Żądanie próbne przerwane bez wyniku (anulowane) - następne może spróbować ponownie
+        self.probing = False
+
+    async def acquire(self, max_rate):
+        while True:
+            now = time.monotonic()
+            # Pułap mógł się zmienić (np. poznaliśmy Crawl-delay)
+            self.rate = min(self.rate, max_rate)
+            self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(self.paused_until - now, (1.0 - self.tokens) / self.rate)
+            if wait <= 0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep(wait)
+
+    def record(self, result, max_rate, probe=False):
+        # probe: wynik żądania próbnego (half-open)
+        now = time.monotonic()
+        if result.retry_after is not None:
+            self.paused_until = max(self.paused_until, now + min(result.retry_after, RETRY_MAX_DELAY))
+
+        overloaded = (result.status in OVERLOAD_STATUSES or isinstance(result.error, requests.Timeout)
+                      or result.elapsed > LIMITER_SLOW_RESPONSE)
+        if overloaded:
+            if self.decreased_at is None or now - self.decreased_at >= LIMITER_DECREASE_INTERVAL:
+                # Pułap bez HOST_MIN_INTERVAL jest skończony (LIMITER_MAX_RATE), więc jest od czego zwalniać
+                self.rate = max(LIMITER_MIN_RATE, min(self.rate, LIMITER_MAX_RATE) * LIMITER_DECREASE)
+                self.decreased_at = now
+                logger.debug(f"Limiter {self.host}: zwalniam do {self.rate:.2f} req/s")
+        elif result.status is not None and result.status < 500:
+            ceiling = min(max_rate, LIMITER_MAX_RATE)
+            self.rate = min(ceiling, self.rate + LIMITER_INCREASE * ceiling)
+
+        if probe:
+            self.probing = False
+        if is_transient(result):
+            self.failures += 1
+            # Nieudana próba w stanie half-open od razu otwiera bezpiecznik ponownie
+            if probe or self.failures >= BREAKER_FAILURES:
+                self.open_until = now + self.cooldown
+                logger.warning(f"Host {self.host} nie odpowiada poprawnie ({self.failures} błędów z rzędu), "
+                               f"wstrzymuję żądania na {self.cooldown:.0f} s.")
+                self.cooldown = min(self.cooldown * 2, BREAKER_COOLDOWN * 16)
+        elif result.status is not None:
+            if self.open_until:
+                logger.info(f"Host {self.host} znowu odpowiada, wznawiam żądania.")
+            self.failures = 0
+            self.open_until = 0.0
+            self.cooldown = BREAKER_COOLDOWN
+
+    def retry_at(self, attempt):
+        # Najwcześniejsza chwila (time.monotonic()) ponowienia: wykładniczy backoff z losowym rozrzutem,
+        # ale nie wcześniej, niż każe Retry-After i niż skończy się przerwa bezpiecznika
+        backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5)
+        return max(time.monotonic() + backoff, self.paused_until, self.open_until)
+
+
+class HostUnavailable(Exception):
+    pass
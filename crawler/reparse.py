@@ -0,0 +1,78 @@
+# crawler/reparse.py
+
+from collections import deque
+from urllib.parse import urlparse
+from crawler.archive import iter_archive
+from crawler.fingerprints import FingerprintIndex
+from modules.logger import logger
+
+
+def reparse_archive(crawler, archive_dir):
+    # Odtwarza korpus z archiwum odpowiedzi bez sieci: rekordy przechodzą przez parsery crawlera
+    # (pulą procesów, jeśli jest) i trafiają do Storage. Teksty są nadpisywane nowym wynikiem,
+    # duplikaty wykrywamy tylko między tekstami z tego przebiegu.
+    storage = crawler.storage
+    storage.fingerprint_index = FingerprintIndex()
+    pool = crawler.parse_pool
+    window = pool.workers * 4 if pool else 0  # Najwyżej tyle rekordów czeka naraz w puli
+    in_flight = deque()
+    stats = {'records': 0, 'saved': 0, 'duplicates': 0, 'skipped': 0}
+
+    def finish(url, parse_result):
+        data, data_type = parse_result or (None, None)
+        if data_type != 'text' or not data:
+            stats['skipped'] += 1
+            return
+        text, metadata = data
+        key = storage.generate_filename(url, metadata)
+        duplicate_of, fingerprint = storage.find_duplicate(text)
+        # Ten sam klucz to nowsza wersja tej samej strony - nadpisujemy
+        if duplicate_of and duplicate_of != key:
+            logger.info(f"SKIP: Tekst dla linku {url} jest duplikatem zapisanego tekstu {duplicate_of}.")
+            stats['duplicates'] += 1
+            return
+        if storage.save(text, metadata, url, fingerprint):
+            stats['saved'] += 1
+        else:
+            stats['skipped'] += 1
+
+    def failed(url, error):
+        # Uszkodzony rekord albo błąd parsera nie przerywa przebiegu - rekord jest pomijany
+        logger.error(f"Błąd parsowania rekordu {url} z archiwum: {error!r}")
+        stats['skipped'] += 1
+
+    def finish_future(url, future):
+        try:
+            parse_result = future.result()[0]
+        except Exception as e:
+            failed(url, e)
+            return
+        finish(url, parse_result)
+
+    for record in iter_archive(archive_dir):
+        stats['records'] += 1
+        parser = crawler.get_parser(urlparse(record.url).netloc)
+        if record.status != 200 or not parser:
+            stats['skipped'] += 1
+            continue
+        try:
+            if pool:
+                in_flight.append((record.url, pool.submit(parser, record.text, record.url, False)))
+            else:
+                document = parser.document(record.text, record.url)
+                parse_result = parser.parse(document, record.url, is_start_url=False)
+        except Exception as e:
+            failed(record.url, e)
+            continue
+        if not pool:
+            finish(record.url, parse_result)
+        elif len(in_flight) >= window:
+            finish_future(*in_flight.popleft())
+    while in_flight:
+        finish_future(*in_flight.popleft())
+
+    storage.flush()
+    logger.info(f"Ponowne parsowanie archiwum {archive_dir}: {stats['records']} rekordów, "
+                f"zapisano {stats['saved']} tekstów, duplikatów {stats['duplicates']}, "
+                f"pominięto {stats['skipped']}.")
+    return stats
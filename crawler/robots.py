@@ -1,31 +1,224 @@
 # crawler/robots.py
 
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
+import asyncio
+import re
+import sqlite3
+import time
+from urllib.parse import urlsplit, quote, unquote
+from crawler.metrics import metrics
 from modules.logger import logger
+from config import ROBOTS_TTL, ROBOTS_TIMEOUT, ROBOTS_MAX_CRAWL_DELAY
 import requests
 
+SAFE_PATH_CHARS = "/?=&;:@!$,+*%~'()"  # Znaki, których nie kodujemy przy porównywaniu ścieżek
+
+
+def normalize_path(path):
+    # Ta sama postać dla reguł i URL-i: %-kodowanie wielkimi literami, polskie znaki zakodowane
+    return quote(unquote(path), safe=SAFE_PATH_CHARS)
+
+
+class RobotsRules:
+    # Reguły jednej grupy User-agent przygotowane do szybkiego dopasowania (RFC 9309): wygrywa
+    # najdłuższa pasująca reguła, przy remisie Allow. Reguły bez '*' i '$' sprawdzamy przez
+    # startswith, pozostałe przez skompilowany regex.
+    def __init__(self, rules=(), crawl_delay=None, allow_all=False, disallow_all=False):
+        self.allow_all = allow_all
+        self.disallow_all = disallow_all
+        self.crawl_delay = crawl_delay
+        compiled = []
+        for allow, path in rules:
+            path = normalize_path(path)
+            if '*' in path or path.endswith('$'):
+                anchored = path.endswith('$')
+                pattern = '.*'.join(re.escape(part) for part in path.rstrip('$').split('*'))
+                matcher = re.compile(pattern + ('$' if anchored else '')).match
+            else:
+                matcher = path
+            compiled.append((len(path), allow, matcher))
+        # Od najdłuższej; przy tej samej długości Allow przed Disallow
+        compiled.sort(key=lambda rule: (-rule[0], not rule[1]))
+        self.rules = [(allow, matcher) for _, allow, matcher in compiled]
+
+    def allows(self, path):
+        if self.allow_all:
+            return True
+        if self.disallow_all:
+            return False
+        path = normalize_path(path)
+        for allow, matcher in self.rules:
+            if path.startswith(matcher) if isinstance(matcher, str) else matcher(path):
+                return allow
+        return True
+
+
+def parse_robots(text, user_agent):
+    # Wybiera grupę z najdłuższym tokenem User-agent zawartym w naszym (bez wielkości liter),
+    # a w razie braku grupę '*'. Request-rate n/s liczymy jako opóźnienie s/n.
+    agent = user_agent.split('/')[0].lower()
+    groups = []  # (tokeny, reguły, crawl_delay)
+    current = None
+    last_was_agent = False
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+        if field == 'user-agent':
+            if not last_was_agent:
+                current = ([], [], [None])
+                groups.append(current)
+            current[0].append(value.lower())
+            last_was_agent = True
+            continue
+        last_was_agent = False
+        if current is None:
+            continue
+        if field in ('allow', 'disallow'):
+            if value:
+                current[1].append((field == 'allow', value))
+        elif field == 'crawl-delay':
+            try:
+                current[2][0] = max(current[2][0] or 0.0, float(value))
+            except ValueError:
+                pass
+        elif field == 'request-rate':
+            match = re.match(r'(\d+)\s*/\s*(\d+(?:\.\d+)?)\s*([smh]?)', value)
+            if match and int(match.group(1)):
+                seconds = float(match.group(2)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(3)]
+                current[2][0] = max(current[2][0] or 0.0, seconds / int(match.group(1)))
+
+    best, best_len = None, -1
+    for tokens, rules, delay in groups:
+        for token in tokens:
+            if token != '*' and token in agent and len(token) > best_len:
+                best, best_len = (rules, delay), len(token)
+    if best is None:
+        # Kilka grup '*' łączymy, jak w RFC 9309
+        matching = [(rules, delay) for tokens, rules, delay in groups if '*' in tokens]
+        if not matching:
+            return RobotsRules()
+        delays = [delay[0] for _, delay in matching if delay[0] is not None]
+        return RobotsRules([rule for rules, _ in matching for rule in rules], max(delays) if delays else None)
+    return RobotsRules(best[0], best[1][0])
+
+
+def rules_from_response(status, text, user_agent):
+    # Jak RobotFileParser.read(): 401/403 - zakaz, pozostałe 4xx - brak ograniczeń.
+    # Błędy serwera (5xx) obsługuje RobotsHandler.store tak jak błędy sieci.
+    if status in (401, 403):
+        return RobotsRules(disallow_all=True)
+    if 400 <= status < 500:
+        return RobotsRules(allow_all=True)
+    return parse_robots(text, user_agent)
+
+
 class RobotsHandler:
-    def __init__(self):
-        self.parsers = {}
+    # robots.txt per host: pamięć -> dyskowy cache (SQLite, ważny ROBOTS_TTL) -> pobranie z timeoutem.
+    # Pobieranie dla wielu nowych hostów naraz idzie równolegle (prefetch).
+    def __init__(self, transport, cache_path=None, ttl=ROBOTS_TTL, timeout=ROBOTS_TIMEOUT,
+                 max_delay=ROBOTS_MAX_CRAWL_DELAY):
+        self.transport = transport
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_delay = max_delay
+        self.rules = {}  # 'scheme://host' -> RobotsRules albo None (robots.txt niedostępny)
+        self.delays = {}  # host -> Crawl-delay (s) dla harmonogramu pobierania
+        self.db = None
+        if cache_path:
+            self.db = sqlite3.connect(cache_path, isolation_level=None)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS robots (
+                    base_url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )""")
 
     def can_fetch(self, url, user_agent):
-        parsed_url = urlparse(url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        if base_url not in self.parsers:
-            robots_url = urljoin(base_url, '/robots.txt')
-            rp = RobotFileParser()
-            try:
-                rp.set_url(robots_url)
-                rp.read()
-                self.parsers[base_url] = rp
-                logger.info(f"Fetched robots.txt from {robots_url}")
-            except Exception as e:
-                logger.error(f"Failed to fetch robots.txt from {robots_url}: {e}")
-                self.parsers[base_url] = None
-
-        rp = self.parsers.get(base_url)
-        if rp:
-            return rp.can_fetch(user_agent, url)
-        else:
+        with metrics.timer('robots_lookup_seconds'):
+            parts = urlsplit(url)
+            base_url = f"{parts.scheme}://{parts.netloc}"
+            if base_url not in self.rules:
+                self.load(base_url, user_agent)
+            rules = self.rules[base_url]
+            if rules is None:
+                return True
+            return rules.allows(parts.path + ('?' + parts.query if parts.query else '') or '/')
+
+    def crawl_delay(self, host):
+        return self.delays.get(host, 0.0)
+
+    def prefetch(self, urls, user_agent):
+        # Pobiera równolegle robots.txt hostów, których jeszcze nie znamy (i nie ma ich w cache)
+        base_urls = dict.fromkeys(f"{parts.scheme}://{parts.netloc}" for parts in map(urlsplit, urls))
+        missing = [base_url for base_url in base_urls if not self.load_cached(base_url, user_agent)]
+        if not missing:
+            return
+        responses = asyncio.run(self._fetch_all(missing))
+        for base_url, response in zip(missing, responses):
+            self.store(base_url, response, user_agent)
+
+    async def _fetch_all(self, base_urls):
+        return await asyncio.gather(*(asyncio.to_thread(self.fetch, base_url) for base_url in base_urls))
+
+    def fetch(self, base_url):
+        # (status, treść) albo wyjątek requests; wywoływane też z wątków
+        metrics.inc('robots_fetches')
+        try:
+            response = self.transport.get(base_url + '/robots.txt', timeout=self.timeout)
+            return response.status_code, response.text
+        except requests.RequestException as e:
+            return e
+
+    def load(self, base_url, user_agent):
+        if not self.load_cached(base_url, user_agent):
+            self.store(base_url, self.fetch(base_url), user_agent)
+
+    def load_cached(self, base_url, user_agent):
+        if base_url in self.rules:
             return True
+        if self.db is None:
+            return False
+        row = self.db.execute("SELECT status, body, fetched_at FROM robots WHERE base_url = ?",
+                              (base_url,)).fetchone()
+        # Wiersze 5xx mogły zostać zapisane przez starsze wersje - pobieramy robots.txt ponownie
+        if not row or row[0] >= 500 or time.time() - row[2] > self.ttl:
+            return False
+        self.set_rules(base_url, rules_from_response(row[0], row[1], user_agent))
+        return True
+
+    def store(self, base_url, response, user_agent):
+        robots_url = base_url + '/robots.txt'
+        if isinstance(response, Exception):
+            # Bez zapisu na dysk: przy następnym uruchomieniu spróbujemy ponownie
+            logger.error(f"Failed to fetch robots.txt from {robots_url}: {response}")
+            self.rules[base_url] = None
+            return
+        status, text = response
+        if status >= 500:
+            # Przejściowy błąd serwera nie może zablokować hosta na ROBOTS_TTL: bez ograniczeń
+            # i bez zapisu na dysk, jak przy błędzie sieci
+            logger.warning(f"robots.txt z {robots_url} zwrócił {status}; brak ograniczeń, bez zapisu w cache")
+            self.rules[base_url] = None
+            return
+        logger.info(f"Fetched robots.txt from {robots_url}")
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO robots VALUES (?, ?, ?, ?)",
+                            (base_url, status, text if status == 200 else '', time.time()))
+        self.set_rules(base_url, rules_from_response(status, text, user_agent))
+
+    def set_rules(self, base_url, rules):
+        self.rules[base_url] = rules
+        if rules.crawl_delay:
+            host = urlsplit(base_url).netloc
+            delay = min(rules.crawl_delay, self.max_delay)
+            if delay != self.delays.get(host):
+                logger.info(f"Crawl-delay dla {host}: {delay:g} s")
+            self.delays[host] = delay
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,281 @@
+# crawler/seen_set.py
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+from modules.logger import logger
+from config import SEEN_SET_BACKEND, SEEN_SET_CAPACITY, SEEN_SET_FPR
+
+MAX_LOAD = 0.6  # Maksymalne zapełnienie tablicy w HashSeenSet przed powiększeniem
+
+
+def url_hash(url):
+    # 64-bitowy skrót; 0 oznacza pusty slot, więc go omijamy
+    value = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class _Buffer:
+    # Bufor bajtów w pamięci albo zmapowany z pliku (mmap)
+    def __init__(self, size, path=None):
+        self.path = path
+        if path is None:
+            self.mm = bytearray(size)
+            return
+        exists = os.path.exists(path) and os.path.getsize(path) == size
+        with open(path, 'r+b' if exists else 'w+b') as file:
+            if not exists:
+                file.truncate(size)
+            self.mm = mmap.mmap(file.fileno(), size)
+
+    def flush(self):
+        if self.path is not None:
+            self.mm.flush()
+
+    def close(self):
+        if self.path is not None:
+            self.mm.flush()
+            self.mm.close()
+
+
+class _PersistentMixin:
+    def _load_meta(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        if meta.get('backend') != self.backend:
+            logger.warning(f"Zbiór {self.path} ma inny typ ({meta.get('backend')}), tworzę go od nowa.")
+            return None
+        return meta
+
+    def _save_meta(self):
+        if self.path is None:
+            return
+        meta = self._meta()
+        meta['backend'] = self.backend
+        meta['user'] = self.meta
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def flush(self):
+        for buffer in self._buffers():
+            buffer.flush()
+        self._save_meta()
+
+    def close(self):
+        self._save_meta()
+        for buffer in self._buffers():
+            buffer.close()
+
+
+class HashSeenSet(_PersistentMixin):
+    # Tablica 64-bitowych skrótów z adresowaniem otwartym: ~13 B na URL zamiast 100+ B w set().
+    # Fałszywe trafienie wymaga kolizji 64-bitowych skrótów, więc w praktyce nie występuje.
+    backend = 'hash'
+
+    def __init__(self, capacity=SEEN_SET_CAPACITY, path=None):
+        self.path = path
+        self.meta = {}  # Dodatkowe dane użytkownika zapisywane razem ze zbiorem
+        self.count = 0
+        slots = self._slots_for(capacity)
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            saved = self._load_meta()
+            if saved:
+                slots, self.count, self.meta = saved['slots'], saved['count'], saved.get('user', {})
+                if not os.path.exists(self._table_path(slots)):
+                    logger.warning(f"Brak pliku tablicy {self._table_path(slots)}, zbiór {path} zaczyna od zera.")
+                    self.count = 0
+        self._map(slots)
+
+    def _slots_for(self, capacity):
+        slots = 1024
+        while slots * MAX_LOAD < capacity:
+            slots *= 2
+        return slots
+
+    def _table_path(self, slots):
+        return os.path.join(self.path, f'table-{slots}.bin') if self.path else None
+
+    def _map(self, slots):
+        self.slots = slots
+        self.mask = slots - 1
+        self.buffer = _Buffer(slots * 8, self._table_path(slots))
+        self.table = memoryview(self.buffer.mm).cast('Q')
+
+    def _buffers(self):
+        return [self.buffer]
+
+    def _meta(self):
+        return {'slots': self.slots, 'count': self.count}
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, url):
+        value = url_hash(url)
+        table, mask = self.table, self.mask
+        i = value & mask
+        while True:
+            slot = table[i]
+            if slot == 0:
+                return False
+            if slot == value:
+                return True
+            i = (i + 1) & mask
+
+    def add(self, url):
+        value = url_hash(url)
+        table, mask = self.table, self.mask
+        i = value & mask
+        while True:
+            slot = table[i]
+            if slot == value:
+                return False
+            if slot == 0:
+                break
+            i = (i + 1) & mask
+        table[i] = value
+        self.count += 1
+        if self.count > self.slots * MAX_LOAD:
+            self._grow()
+        return True
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def _grow(self):
+        old_table, old_buffer = self.table, self.buffer
+        old_path = self._table_path(self.slots)
+        self._map(self.slots * 2)
+        table, mask = self.table, self.mask
+        for value in old_table:
+            if value:
+                i = value & mask
+                while table[i]:
+                    i = (i + 1) & mask
+                table[i] = value
+        # Najpierw nowa tablica i meta.json, dopiero potem usuwamy starą: po awarii w dowolnym
+        # momencie meta.json wskazuje istniejący, kompletny plik
+        self.buffer.flush()
+        self._save_meta()
+        old_table.release()
+        old_buffer.close()
+        if old_path:
+            os.remove(old_path)
+
+    def close(self):
+        self.table.release()
+        super().close()
+
+
+class BloomSeenSet(_PersistentMixin):
+    # Skalowalny filtr Blooma: każdy kolejny etap ma 2x większą pojemność i 2x mniejszy
+    # dopuszczalny odsetek fałszywych trafień, więc łącznie nie przekraczamy SEEN_SET_FPR.
+    backend = 'bloom'
+
+    def __init__(self, capacity=SEEN_SET_CAPACITY, fpr=SEEN_SET_FPR, path=None):
+        self.path = path
+        self.meta = {}
+        self.capacity = capacity
+        self.fpr = fpr
+        self.stages = []  # Lista słowników: capacity, bits, hashes, count, buffer
+        saved = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            saved = self._load_meta()
+        if saved:
+            self.capacity, self.fpr, self.meta = saved['capacity'], saved['fpr'], saved.get('user', {})
+            for stage in saved['stages']:
+                self._add_stage(stage['capacity'], stage['bits'], stage['hashes'], stage['count'])
+        else:
+            self._new_stage()
+
+    def _new_stage(self):
+        index = len(self.stages)
+        capacity = self.capacity * (2 ** index)
+        fpr = self.fpr * (0.5 ** (index + 1))
+        bits = max(64, int(math.ceil(-capacity * math.log(fpr) / (math.log(2) ** 2))))
+        hashes = max(1, int(round(bits / capacity * math.log(2))))
+        self._add_stage(capacity, bits, hashes, 0)
+        self._save_meta()
+
+    def _add_stage(self, capacity, bits, hashes, count):
+        path = os.path.join(self.path, f'stage-{len(self.stages)}.bin') if self.path else None
+        self.stages.append({
+            'capacity': capacity,
+            'bits': bits,
+            'hashes': hashes,
+            'count': count,
+            'buffer': _Buffer((bits + 7) // 8, path),
+        })
+
+    def _buffers(self):
+        return [stage['buffer'] for stage in self.stages]
+
+    def _meta(self):
+        return {
+            'capacity': self.capacity,
+            'fpr': self.fpr,
+            'stages': [{key: stage[key] for key in ('capacity', 'bits', 'hashes', 'count')}
+                       for stage in self.stages],
+        }
+
+    def _hashes(self, url):
+        # Podwójne haszowanie: k pozycji z dwóch 64-bitowych wartości, jeden skrót na URL
+        return struct.unpack('<QQ', hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest())
+
+    def _in_stage(self, h1, h2, stage):
+        data, bits = stage['buffer'].mm, stage['bits']
+        for i in range(stage['hashes']):
+            pos = (h1 + i * h2) % bits
+            if not data[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return sum(stage['count'] for stage in self.stages)
+
+    def __contains__(self, url):
+        h1, h2 = self._hashes(url)
+        return any(self._in_stage(h1, h2, stage) for stage in self.stages)
+
+    def add(self, url):
+        h1, h2 = self._hashes(url)
+        if any(self._in_stage(h1, h2, stage) for stage in self.stages):
+            return False
+        stage = self.stages[-1]
+        if stage['count'] >= stage['capacity']:
+            self._new_stage()
+            stage = self.stages[-1]
+        data, bits = stage['buffer'].mm, stage['bits']
+        for i in range(stage['hashes']):
+            pos = (h1 + i * h2) % bits
+            data[pos >> 3] |= 1 << (pos & 7)
+        stage['count'] += 1
+        return True
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+
+def create_seen_set(path=None, backend=SEEN_SET_BACKEND, capacity=SEEN_SET_CAPACITY):
+    # 'exact' to zwykły set() (bez zapisu na dysk), 'hash' i 'bloom' mogą być trwałe (mmap)
+    if backend == 'hash':
+        return HashSeenSet(capacity, path=path)
+    if backend == 'bloom':
+        return BloomSeenSet(capacity, path=path)
+    return set()
+
+
+def is_persistent(seen_set):
+    return getattr(seen_set, 'path', None) is not None
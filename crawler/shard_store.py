@@ -0,0 +1,194 @@
+# crawler/shard_store.py
+
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from modules.logger import logger
+from config import SHARD_MAX_BYTES, SHARD_COMPRESSION
+
+# Nagłówek rekordu: sygnatura, długość klucza, długość treści, flagi. Rekord zawiera też klucz,
+# więc po utracie indeksu da się go odtworzyć, czytając shardy od początku.
+RECORD_HEADER = struct.Struct('<4sHIB')
+RECORD_MAGIC = b'WCR1'
+FLAG_COMPRESSED = 1
+
+
+class ShardStore:
+    # Teksty dopisywane do plików-shardów o ograniczonym rozmiarze zamiast jednego pliku na stronę.
+    # Indeks (klucz -> shard, offset, długość) w SQLite: sprawdzenie i odczyt rekordu bez skanowania.
+    def __init__(self, store_dir, max_bytes=SHARD_MAX_BYTES, compress=SHARD_COMPRESSION):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.lock = threading.Lock()
+
+        index_path = os.path.join(store_dir, 'index.sqlite3')
+        rebuild = not os.path.exists(index_path) and self.shard_names()
+        self.db = sqlite3.connect(index_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT PRIMARY KEY,
+                shard INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                flags INTEGER NOT NULL
+            )""")
+        if rebuild:
+            self.rebuild_index()
+
+        names = self.shard_names()
+        self.shard = int(names[-1][6:11]) if names else 0
+        self.file = None
+        self._check_index()
+        self._recover_tail()
+
+    def _check_index(self):
+        # Wpisy wskazujące poza koniec sharda (np. shard bez fsync z poprzednich wersji) są usuwane:
+        # taki tekst i tak trzeba zapisać ponownie
+        for shard, end in self.db.execute("SELECT shard, MAX(offset + length) FROM records GROUP BY shard").fetchall():
+            path = self.shard_path(shard)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if end > size:
+                removed = self.db.execute("DELETE FROM records WHERE shard = ? AND offset + length > ?",
+                                          (shard, size)).rowcount
+                logger.warning(f"Indeks {self.store_dir} wskazywał poza koniec {path}; usunięto {removed} wpisów.")
+
+    def _recover_tail(self):
+        # Rekordy za ostatnim zaindeksowanym (zapisane, ale bez wpisu w indeksie) dopisujemy do indeksu,
+        # a niepełny rekord na końcu (przerwany zapis) obcinamy przed dopisywaniem
+        path = self.shard_path(self.shard)
+        if not os.path.exists(path):
+            return
+        end = self.db.execute("SELECT COALESCE(MAX(offset + length), 0) FROM records WHERE shard = ?",
+                              (self.shard,)).fetchone()[0]
+        if os.path.getsize(path) <= end:
+            return
+        self.db.execute("BEGIN")
+        records = self._scan(self.shard, end)
+        for key, offset, length, flags in records:
+            self.db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                            (key, self.shard, offset, length, flags))
+            end = offset + length
+        self.db.execute("COMMIT")
+        if os.path.getsize(path) > end:
+            logger.warning(f"Obcinam niepełną końcówkę {path} ({os.path.getsize(path) - end} B).")
+            with open(path, 'r+b') as file:
+                file.truncate(end)
+
+    def shard_names(self):
+        return sorted(name for name in os.listdir(self.store_dir)
+                      if name.startswith('shard-') and name.endswith('.dat'))
+
+    def shard_path(self, shard):
+        return os.path.join(self.store_dir, f'shard-{shard:05d}.dat')
+
+    def _open_for_append(self, size):
+        # Dopisujemy do bieżącego sharda, dopóki rekord mieści się w limicie (pusty shard przyjmie każdy)
+        if self.file is None:
+            self.file = open(self.shard_path(self.shard), 'ab')
+        if self.file.tell() and self.file.tell() + size > self.max_bytes:
+            self.file.close()
+            self.shard += 1
+            self.file = open(self.shard_path(self.shard), 'ab')
+        return self.file
+
+    def write(self, key, text):
+        body = text.encode('utf-8')
+        flags = 0
+        if self.compress:
+            body = zlib.compress(body)
+            flags |= FLAG_COMPRESSED
+        key_bytes = key.encode('utf-8')
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(key_bytes), len(body), flags)
+        with self.lock:
+            file = self._open_for_append(len(header) + len(key_bytes) + len(body))
+            offset = file.tell() + len(header) + len(key_bytes)
+            file.write(header + key_bytes + body)
+            file.flush()
+            # Rekord trafia na dysk przed wpisem do indeksu, więc indeks nigdy nie wskazuje za koniec sharda
+            os.fsync(file.fileno())
+            # Nadpisanie klucza zostawia stary rekord w shardzie jako martwy, indeks wskazuje nowy
+            self.db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                            (key, self.shard, offset, len(body), flags))
+        return self.shard_path(self.shard)
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM records WHERE key = ?", (key,)).fetchone() is not None
+
+    def read(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT shard, offset, length, flags FROM records WHERE key = ?",
+                                  (key,)).fetchone()
+        return self._read_record(*row) if row else None
+
+    def _read_record(self, shard, offset, length, flags):
+        with open(self.shard_path(shard), 'rb') as file:
+            file.seek(offset)
+            body = file.read(length)
+        if flags & FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+        return body.decode('utf-8')
+
+    def keys(self):
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT key FROM records ORDER BY shard, offset")]
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def _scan(self, shard, start=0):
+        # Kolejne rekordy sharda od pozycji start: (klucz, offset treści, długość, flagi);
+        # niepełny rekord na końcu (przerwany zapis) kończy odczyt
+        path = self.shard_path(shard)
+        size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            file.seek(start)
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                magic, key_length, length, flags = RECORD_HEADER.unpack(header)
+                key_bytes = file.read(key_length)
+                offset = file.tell()
+                file.seek(length, os.SEEK_CUR)
+                if magic != RECORD_MAGIC or len(key_bytes) < key_length or file.tell() > size:
+                    logger.warning(f"Uszkodzony rekord w {path} (offset {offset}), pomijam resztę sharda.")
+                    return
+                yield key_bytes.decode('utf-8'), offset, length, flags
+
+    def rebuild_index(self):
+        # Odtwarza indeks z shardów; niepełny rekord na końcu (przerwany zapis) jest pomijany
+        self.db.execute("BEGIN")
+        for name in self.shard_names():
+            shard = int(name[6:11])
+            for key, offset, length, flags in self._scan(shard):
+                self.db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                                (key, shard, offset, length, flags))
+        self.db.execute("COMMIT")
+        count = self.db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        logger.info(f"Odtworzono indeks {self.store_dir}: {count} rekordów.")
+
+    def export_files(self, out_dir):
+        # Eksport do dawnego układu: jeden plik <klucz>.txt na tekst
+        os.makedirs(out_dir, exist_ok=True)
+        with self.lock:
+            rows = self.db.execute("SELECT key, shard, offset, length, flags FROM records").fetchall()
+        for key, *location in rows:
+            with open(os.path.join(out_dir, key + '.txt'), 'w', encoding='utf-8') as file:
+                file.write(self._read_record(*location))
+        logger.info(f"Wyeksportowano {len(rows)} tekstów do {out_dir}.")
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.db.close()
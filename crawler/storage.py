@@ -2,30 +2,105 @@
 
 import os
 import re
+import sqlite3
 from urllib.parse import urlparse, unquote
+from crawler.text_normalizer import printable_lines
+from crawler.shard_store import ShardStore
+from crawler.manifest import Manifest
+from crawler.fingerprints import Fingerprint, FingerprintIndex
+from crawler.metrics import metrics
 from modules.logger import logger
+from config import STORAGE_BACKEND, CONTENT_DEDUP
+
+
+LINK_FILES = ('extracted_links.txt', 'all_collected_links.txt')  # Pliki z linkami, nie teksty
+
+
+class FileTextStore:
+    # Dawny układ: jeden plik <klucz>.txt na tekst w katalogu danych
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def path(self, key):
+        return os.path.join(self.data_dir, key + '.txt')
+
+    def write(self, key, text):
+        file_path = self.path(key)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return file_path
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def read(self, key):
+        with open(self.path(key), 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def keys(self):
+        return [name[:-4] for name in os.listdir(self.data_dir)
+                if name.endswith('.txt') and name not in LINK_FILES]
+
+
+def create_text_store(data_dir, backend=STORAGE_BACKEND):
+    if backend == 'shards':
+        return ShardStore(os.path.join(data_dir, 'corpus'))
+    return FileTextStore(data_dir)
+
 
 class Storage:
-    def __init__(self):
+    def __init__(self, backend=STORAGE_BACKEND, data_dir=None):
         project_dir = os.path.dirname(os.path.dirname(__file__))
-        self.data_dir = os.path.join(project_dir, 'data')
+        self.data_dir = data_dir or os.path.join(project_dir, 'data')
         os.makedirs(self.data_dir, exist_ok=True)
+        self.backend = backend
+        self.texts = create_text_store(self.data_dir, backend)
         self.links_file = os.path.join(self.data_dir, 'extracted_links.txt')
-        self.saved_links = set()
-
-        # Wczytaj istniejące linki, aby uniknąć duplikatów
-        if os.path.exists(self.links_file):
-            with open(self.links_file, 'r', encoding='utf-8') as file:
-                for line in file:
-                    self.saved_links.add(line.strip())
+        self.manifest = Manifest(os.path.join(self.data_dir, 'manifest.sqlite3'))
+        self.dedup = CONTENT_DEDUP
+        if self.manifest.created:
+            keys = self.texts.keys()
+            fingerprints = self.stored_fingerprints(keys) if self.dedup else ()
+            self.manifest.import_existing(keys, self.read_links_file(), fingerprints)
+        self.fingerprint_index = None  # Wczytywany z manifestu przy pierwszym sprawdzeniu
+
+    def find_duplicate(self, text, fingerprint=None):
+        # Zwraca (klucz wcześniej zapisanego duplikatu albo None, odcisk tekstu dla save());
+        # odcisk może być policzony wcześniej, np. przez workera crawla rozproszonego
+        if not self.dedup:
+            return None, None
+        if self.fingerprint_index is None:
+            self.fingerprint_index = FingerprintIndex()
+            for key, exact, near in self.manifest.fingerprints():
+                self.fingerprint_index.add(key, Fingerprint(exact, near))
+        if fingerprint is None:
+            fingerprint = self.fingerprint_index.compute(text)
+        return self.fingerprint_index.find(fingerprint), fingerprint
+
+    def stored_fingerprints(self, keys):
+        # Odciski tekstów zapisanych przed manifestem, żeby wykrywanie duplikatów obejmowało też je;
+        # liczone z treści bez nagłówka z metadanymi (jak w save())
+        index = FingerprintIndex()
+        for key in keys:
+            try:
+                stored = self.texts.read(key)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Nie udało się odczytać tekstu {key} do wykrywania duplikatów: {e}")
+                continue
+            if stored is not None:
+                yield key, index.compute(stored.split('\n\n', 1)[-1])
+
+    def read_links_file(self):
+        if not os.path.exists(self.links_file):
+            return []
+        with open(self.links_file, 'r', encoding='utf-8') as file:
+            return [line.strip() for line in file if line.strip()]
 
-    def save(self, text, metadata, base_url):
-        text = ''.join(c for c in text if c.isprintable() or c == '\n')
-        lines = [line.rstrip() for line in text.splitlines()]
-        text = '\n'.join(lines)
+    def save(self, text, metadata, base_url, fingerprint=None):
+        # True, gdy tekst trafił do magazynu i manifestu; błąd zapisu jest logowany, a crawl idzie dalej
+        text = printable_lines(text)
 
         filename = self.generate_filename(base_url, metadata)
-        file_path = os.path.join(self.data_dir, filename + '.txt')
 
         metadata_lines = [
             f"URL: {metadata.get('URL', '')}",
@@ -42,14 +117,22 @@ class Storage:
         full_text = metadata_text + '\n\n' + text
 
         try:
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(full_text)
+            with metrics.timer('storage_write_seconds', backend=self.backend):
+                file_path = self.texts.write(filename, full_text)
+            # Wpis do manifestu po zapisie tekstu: po awarii najwyżej zapiszemy tekst drugi raz.
+            # Manifest jest zatwierdzany przed zrzutem dziennika crawla (CrawlJournal.before_flush),
+            # więc URL oznaczony jako przetworzony nie zniknie z manifestu przy wznowieniu.
+            self.manifest.add_text(filename, base_url, fingerprint)
+            if fingerprint is not None and self.fingerprint_index is not None:
+                self.fingerprint_index.add(filename, fingerprint)
             logger.info(f"Dodano tekst do {file_path}.")
-        except IOError as e:
-            logger.error(f"Błąd podczas zapisu do pliku {file_path}: {e}")
+            return True
+        except (IOError, sqlite3.Error) as e:
+            logger.error(f"Błąd podczas zapisu tekstu {filename}: {e}")
+            return False
 
     def save_links(self, links):
-        unique_links = [link for link in links if link not in self.saved_links]
+        unique_links = self.manifest.add_extracted_links(links)
         if not unique_links:
             logger.info("Brak nowych linków do zapisania.")
             return unique_links
@@ -58,7 +141,7 @@ class Storage:
             with open(self.links_file, 'a', encoding='utf-8') as file:
                 for link in unique_links:
                     file.write(link + '\n')
-                    self.saved_links.add(link)
+            self.manifest.flush()
             logger.info(f"Zapisano {len(unique_links)} linków do {self.links_file}.")
             return unique_links
         except IOError as e:
@@ -74,6 +157,22 @@ class Storage:
             logger.info(f"Zapisano {len(links)} linków do {all_links_file}.")
         except IOError as e:
             logger.error(f"Błąd podczas zapisu linków do {all_links_file}: {e}")
+        self.manifest.add_collected_links(links)
+        self.manifest.flush()
+
+    def get_saved_texts_count(self):
+        return self.manifest.texts_count()
+
+    def get_all_collected_links_count(self):
+        return self.manifest.links_count()
+
+    def flush(self):
+        self.manifest.flush()
+
+    def close(self):
+        self.manifest.close()
+        if isinstance(self.texts, ShardStore):
+            self.texts.close()
 
     def generate_filename(self, base_url, metadata):
         parsed_url = urlparse(base_url)
@@ -103,6 +202,4 @@ class Storage:
         return re.sub(r'[^\w\-_ąćęłńóśźżĄĆĘŁŃÓŚŹŻ]', '', name)
 
     def is_already_saved(self, base_url, metadata):
-        filename = self.generate_filename(base_url, metadata)
-        file_path = os.path.join(self.data_dir, filename + '.txt')
-        return os.path.exists(file_path)
+        return self.manifest.has_text(self.generate_filename(base_url, metadata))
@@ -0,0 +1,52 @@
+# crawler/text_normalizer.py
+
+import re
+
+FOOTNOTE_REF = re.compile(r'\[\d+\]')  # Odnośniki do przypisów: [1], [2], [123]
+DOTS_LINE = re.compile(r'^[.]+\s*$', re.MULTILINE)  # Linie zawierające tylko kropki
+
+
+class _PrintableTable(dict):
+    # Tablica dla str.translate: znak niedrukowalny -> None (usunięcie), drukowalny -> on sam.
+    # Wypełniana leniwie, więc każdy znak sprawdzamy isprintable() raz na cały proces.
+    def __missing__(self, code):
+        value = code if chr(code).isprintable() else None
+        self[code] = value
+        return value
+
+
+PRINTABLE = _PrintableTable()
+
+
+def printable_lines(text):
+    # Usuwa znaki niedrukowalne (poza '\n') i białe znaki z końca linii. Wynik jak dla
+    # ''.join(c for c in text if c.isprintable() or c == '\n') + rstrip() każdej linii,
+    # ale linie w całości drukowalne (prawie wszystkie) przechodzą bez rozbierania na znaki.
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if not line.isprintable():
+            lines[i] = line.translate(PRINTABLE)
+    if lines[-1] == '':
+        lines.pop()  # Jak splitlines(): bez pustej linii po ostatnim '\n'
+    return '\n'.join([line.rstrip() for line in lines])
+
+
+def collapse_whitespace(text):
+    # To samo co re.sub(r'\s+', ' ', text).strip() - str.split() i \s uznają za białe te same znaki
+    return ' '.join(text.split())
+
+
+def strip_footnote_refs(text):
+    return FOOTNOTE_REF.sub('', text) if '[' in text else text
+
+
+def drop_dots_lines(text):
+    # Regex tylko wtedy, gdy jakaś linia w ogóle zaczyna się od kropki
+    if text.startswith('.') or '\n.' in text:
+        return DOTS_LINE.sub('', text)
+    return text
+
+
+def split_sentences(text):
+    # Każde zdanie w osobnej linii
+    return text.replace('. ', '.\n')
@@ -0,0 +1,92 @@
+# crawler/transport.py
+
+import socket
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3.util.connection as urllib3_connection
+from modules.logger import logger
+from config import REQUEST_TIMEOUT, POOL_CONNECTIONS, POOL_MAXSIZE, DNS_CACHE_TTL
+
+
+class DnsCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}  # (host, port) -> (czas wygaśnięcia, lista adresów IP)
+        self.lock = threading.Lock()
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        infos = socket.getaddrinfo(host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self.lock:
+            self.entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self.lock:
+            self.entries.pop((host, port), None)
+
+
+_dns_cache = None
+_original_create_connection = urllib3_connection.create_connection
+
+
+def _cached_create_connection(address, *args, **kwargs):
+    # urllib3 łączy się po adresie IP z cache, a nazwa hosta (SNI, certyfikat) zostaje bez zmian
+    host, port = address
+    try:
+        addresses = _dns_cache.resolve(host.strip('[]'), port)
+    except OSError:
+        return _original_create_connection(address, *args, **kwargs)
+
+    error = None
+    for ip in addresses:
+        try:
+            return _original_create_connection((ip, port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    _dns_cache.forget(host.strip('[]'), port)
+    raise error
+
+
+def install_dns_cache(ttl=DNS_CACHE_TTL):
+    global _dns_cache
+    if _dns_cache is None:
+        _dns_cache = DnsCache(ttl)
+        urllib3_connection.create_connection = _cached_create_connection
+    return _dns_cache
+
+
+class HttpTransport:
+    # Jedna sesja HTTP dla crawlera, parserów i robots.txt: keep-alive, pula połączeń
+    # per host, wspólne nagłówki i jednolity timeout.
+    def __init__(self, user_agent, timeout=REQUEST_TIMEOUT, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, dns_ttl=DNS_CACHE_TTL):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': user_agent})
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if dns_ttl:
+            install_dns_cache(dns_ttl)
+
+    @property
+    def user_agent(self):
+        return self.session.headers['User-Agent']
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+        logger.debug("Zamknięto sesję HTTP.")
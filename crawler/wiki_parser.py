@@ -1,22 +1,39 @@
 import re
-from bs4 import BeautifulSoup, Comment
-from urllib.parse import urlparse, urljoin
+from bs4 import Comment, Tag
+from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit, parse_qs, quote
 import logging
 from crawler.parser_base import ParserBase
+from crawler.canonical import normalize_path
+from crawler.text_normalizer import collapse_whitespace
 
 logger = logging.getLogger('WebCrawler')
 
-class WikiParser(ParserBase):
-    def parse(self, content, base_url, is_start_url):
-        soup = BeautifulSoup(content, 'html.parser')
+MOBILE_HOST = re.compile(r'^([a-z\-]+)\.m\.(wikipedia\.org)$')
+
+# Reguły czyszczenia artykułu (WikiParser.remove_unwanted_elements)
+HEADING_TAGS = ('h2', 'h3', 'h4', 'h5', 'h6')
+PRUNE_TAGS = {'script', 'style'}
+PRUNE_TAG_CLASSES = {('sup', 'reference')}
+PRUNE_CLASSES = {
+    'navbox', 'vertical-navbox', 'infobox', 'metadata', 'ambox',
+    'hatnote', 'mbox-small', 'sistersitebox', 'thumb', 'gallery',
+    'reflist', 'portal', 'noprint', 'stub', 'mw-editsection', 'toc'
+}
+# Nagłówki sekcji usuwanych razem z treścią aż do następnego nagłówka
+PRUNE_SECTIONS = {
+    'Przypisy', 'Bibliografia', 'Linki zewnętrzne', 'Uwagi',
+    'Zobacz też', 'Źródła', 'Literatura', 'Galeria', 'Nagrody'
+}
+# (znacznik, id) - usuwany jest tylko pierwszy taki element, w tej kolejności
+PRUNE_FIRST_BY_ID = [('div', 'catlinks'), ('footer', 'footer'), ('div', 'siteNotice')]
 
-        # Usuwanie skryptów, stylów i komentarzy
-        for element in soup(["script", "style"]):
-            element.decompose()
+class WikiParser(ParserBase):
+    link_scope = 'mw-content-text'  # Linki do innych artykułów bierzemy tylko z treści
 
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
+    def parse(self, content, base_url, is_start_url):
+        soup = self.document(content, base_url).soup
 
+        # Usuwanie skryptów, stylów, komentarzy i zbędnych elementów (jedno przejście)
         self.remove_unwanted_elements(soup)
 
         if is_start_url:
@@ -45,44 +62,56 @@ class WikiParser(ParserBase):
             return (text, metadata), 'text'
 
     def remove_unwanted_elements(self, soup):
-        for ref in soup.find_all('sup', class_='reference'):
-            ref.decompose()
-
-        unwanted_classes = [
-            'navbox', 'vertical-navbox', 'infobox', 'metadata', 'ambox',
-            'hatnote', 'mbox-small', 'sistersitebox', 'thumb', 'gallery',
-            'reflist', 'portal', 'noprint', 'stub', 'mw-editsection', 'toc'
-        ]
-        for class_name in unwanted_classes:
-            for element in soup.find_all(class_=class_name):
-                element.decompose()
-
-        unwanted_sections = [
-            'Przypisy', 'Bibliografia', 'Linki zewnętrzne', 'Uwagi',
-            'Zobacz też', 'Źródła', 'Literatura', 'Galeria', 'Nagrody'
-        ]
-        for heading in soup.find_all(['h2', 'h3', 'h4', 'h5', 'h6']):
+        # Reguły PRUNE_* stosowane w jednym przejściu po drzewie (w kolejności dokumentu);
+        # usunięte poddrzewa nie są odwiedzane. Sekcje pod nagłówkami i elementy po id zależą
+        # od tego, co zostało w drzewie, więc obsługujemy je po przejściu - wynik jest taki sam
+        # jak przy dawnych osobnych przebiegach find_all() dla każdej reguły.
+        headings = []
+        by_id = {rule: [] for rule in PRUNE_FIRST_BY_ID}
+        stack = [soup]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Tag):
+                if isinstance(node, Comment):
+                    node.extract()
+                continue
+
+            name = node.name
+            classes = node.get('class') or ()
+            if name in PRUNE_TAGS or classes and (not PRUNE_CLASSES.isdisjoint(classes)
+                                                  or any((name, cls) in PRUNE_TAG_CLASSES for cls in classes)):
+                node.decompose()
+                continue
+
+            if name in HEADING_TAGS:
+                headings.append(node)
+            element_id = node.get('id')
+            if element_id and (name, element_id) in by_id:
+                by_id[(name, element_id)].append(node)
+            stack.extend(reversed(node.contents))
+
+        for heading in headings:
+            if heading.decomposed:
+                continue  # W sekcji usuniętej przy wcześniejszym nagłówku
             heading_text = heading.get_text().strip()
             heading_text = re.sub(r'\[.*?\]', '', heading_text)
-            if heading_text in unwanted_sections:
+            if heading_text in PRUNE_SECTIONS:
                 next_node = heading.find_next_sibling()
-                while next_node and not next_node.name in ['h2', 'h3', 'h4', 'h5', 'h6']:
+                while next_node and not next_node.name in HEADING_TAGS:
                     to_remove = next_node
                     next_node = next_node.find_next_sibling()
                     to_remove.decompose()
                 heading.decompose()
 
-        if catlinks := soup.find('div', id='catlinks'):
-            catlinks.decompose()
-        if footer := soup.find('footer', id='footer'):
-            footer.decompose()
-        if siteNotice := soup.find('div', id='siteNotice'):
-            siteNotice.decompose()
+        # Tylko pierwszy element o danym id, który został w drzewie
+        for rule in PRUNE_FIRST_BY_ID:
+            for element in by_id[rule]:
+                if not element.decomposed:
+                    element.decompose()
+                    break
 
     def extract_data(self, content_div, base_url, soup):
-        def clean_text(text):
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text
+        clean_text = collapse_whitespace
 
         metadata = {}
 
@@ -122,18 +151,18 @@ class WikiParser(ParserBase):
         metadata['Content-Type'] = 'Artykuł'
 
         text_elements = content_div.find_all(['p', 'h2', 'h3', 'h4', 'h5', 'h6'], recursive=True)
-        content_text = ''
+        parts = []  # Sklejamy raz na końcu zamiast += dla każdego akapitu
         for element in text_elements:
-            if element.name in ['h2', 'h3', 'h4', 'h5', 'h6']:
+            if element.name in HEADING_TAGS:
                 heading_text = clean_text(element.get_text())
                 if heading_text:
-                    content_text += f"\n\n### {heading_text}\n\n"
+                    parts.append(f"\n\n### {heading_text}\n\n")
             elif element.name == 'p':
                 paragraph_text = clean_text(element.get_text())
                 if paragraph_text:
-                    content_text += f"{paragraph_text}\n\n"
+                    parts.append(f"{paragraph_text}\n\n")
 
-        content_text = content_text.strip()
+        content_text = ''.join(parts).strip()
 
         return content_text, metadata
 
@@ -148,15 +177,38 @@ class WikiParser(ParserBase):
 
     def extract_related_links(self, soup, base_url):
         related_links = []
-        # Przykładowa logika: zbierz wszystkie linki z treści artykułu
-        content_div = soup.find('div', id='mw-content-text')
-        if content_div:
-            for a_tag in content_div.find_all('a', href=True):
-                href = a_tag['href']
-                if href.startswith('/wiki/') and self.is_valid_url(urljoin(base_url, href), base_url):
-                    absolute_url = urljoin(base_url, href)
+        canonical_base = self.canonicalize_url(base_url)
+        # Przykładowa logika: zbierz wszystkie linki z treści artykułu (link_scope)
+        for anchor in self.anchors(soup):
+            href = anchor.href
+            if href.startswith('/wiki/'):
+                absolute_url = self.canonicalize_url(urljoin(canonical_base, href))
+                if self.is_valid_url(absolute_url, canonical_base):
                     related_links.append(absolute_url)
-        return related_links
+        # Różne warianty tego samego artykułu po kanonizacji są jednym linkiem
+        return list(dict.fromkeys(related_links))
+
+    def canonicalize_url(self, url):
+        # pl.m.wikipedia.org -> pl.wikipedia.org, /w/index.php?title=X -> /wiki/X,
+        # bez ?oldid= i innych parametrów, spacje jako '_', pierwsza litera tytułu wielka
+        parts = urlsplit(super().canonicalize_url(url))
+        host = MOBILE_HOST.sub(r'\1.\2', parts.netloc)
+        path, query = parts.path, parts.query
+
+        if path == '/w/index.php' and query:
+            params = parse_qs(query)
+            title = params.get('title', [''])[0]
+            if title and params.get('action', ['view'])[0] == 'view':
+                path = normalize_path('/wiki/' + quote(title.replace(' ', '_'), safe="/:@!$&'()*+,;=~"))
+
+        if path.startswith('/wiki/'):
+            query = ''
+            title = path[len('/wiki/'):].replace(' ', '_')
+            if title and len(title[0].upper()) == 1:
+                title = title[0].upper() + title[1:]
+            path = '/wiki/' + title
+
+        return urlunsplit((parts.scheme, host, path, query, ''))
 
     def is_valid_url(self, url, base_url):
         parsed_base = urlparse(base_url)
@@ -1,8 +1,65 @@
-# main.py
+ # main.py
 
+import argparse
+import multiprocessing
 from crawler.crawler import WebCrawler
-from config import START_URLS, MAX_PAGES, EXTRACTED_PAGES_MAX
+from crawler.storage import Storage
+from crawler.distributed import Coordinator, parse_address, run_worker
+from config import START_URLS, MAX_PAGES, EXTRACTED_PAGES_MAX, PARSE_WORKERS, METRICS_PORT, DIST_AUTHKEY_ENV
 
 if __name__ == "__main__":
-    crawler = WebCrawler()
-    crawler.start_crawling()
+    arg_parser = argparse.ArgumentParser(description="WebCrawler dla WolneLektury i Wikipedii.")
+    arg_parser.add_argument('--resume', action='store_true',
+                            help="wznów przerwany crawl z dziennika data/crawl_journal.jsonl")
+    arg_parser.add_argument('--parse-workers', type=int, metavar='N',
+                            help="liczba procesów parsujących (0 = parsowanie w głównym procesie; "
+                                 "domyślnie PARSE_WORKERS, a przy --reparse liczba rdzeni CPU)")
+    arg_parser.add_argument('--export-shards', metavar='KATALOG',
+                            help="wyeksportuj teksty z data/corpus do osobnych plików .txt i zakończ")
+    arg_parser.add_argument('--reparse', nargs='?', const='', metavar='KATALOG',
+                            help="zamiast crawla przeparsuj archiwum odpowiedzi (domyślnie data/archive)")
+    arg_parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, metavar='PORT',
+                            help="wystaw metryki crawla pod http://127.0.0.1:PORT/metrics")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="profiluj fazy crawla i parsery (cProfile, tracemalloc); raport w data/profile")
+    arg_parser.add_argument('--coordinator', metavar='[HOST:]PORT',
+                            help="uruchom koordynatora crawla rozproszonego (workerzy łączą się przez --worker)")
+    arg_parser.add_argument('--local-workers', type=int, default=0, metavar='N',
+                            help="z --coordinator: uruchom też N workerów na tej maszynie")
+    arg_parser.add_argument('--worker', metavar='HOST:PORT',
+                            help="uruchom workera crawla rozproszonego połączonego z koordynatorem")
+    arg_parser.add_argument('--authkey', metavar='SEKRET',
+                            help=f"wspólny sekret koordynatora i workerów (domyślnie ze zmiennej {DIST_AUTHKEY_ENV}; "
+                                 "bez niego koordynator słucha tylko na 127.0.0.1)")
+    args = arg_parser.parse_args()
+
+    if args.export_shards:
+        Storage(backend='shards').texts.export_files(args.export_shards)
+    elif args.coordinator:
+        address = parse_address(args.coordinator)
+        try:
+            coordinator = Coordinator(address, authkey=args.authkey)
+        except ValueError as e:
+            arg_parser.error(str(e))
+        # Workerzy łączą się z adresem, na którym słucha koordynator (0.0.0.0 - przez localhost)
+        worker_address = ('127.0.0.1' if address[0] == '0.0.0.0' else address[0], address[1])
+        workers = [multiprocessing.get_context('spawn').Process(
+            target=run_worker, args=(worker_address, coordinator.authkey),
+            kwargs={'parse_workers': args.parse_workers or 0})
+            for _ in range(args.local_workers)]
+        for worker in workers:
+            worker.start()
+        coordinator.run()
+        for worker in workers:
+            worker.join()
+    elif args.worker:
+        run_worker(parse_address(args.worker), args.authkey, parse_workers=args.parse_workers or 0)
+    elif args.reparse is not None:
+        # Parsowanie offline to praca czysto obliczeniowa - domyślnie wszystkie rdzenie
+        crawler = WebCrawler(parse_workers=args.parse_workers)
+        crawler.reparse(args.reparse or None)
+    else:
+        parse_workers = PARSE_WORKERS if args.parse_workers is None else args.parse_workers
+        crawler = WebCrawler(resume=args.resume, parse_workers=parse_workers,
+                             metrics_port=args.metrics_port, profile=args.profile)
+        crawler.start_crawling()